@@ -0,0 +1,182 @@
+import argparse
+import os
+import random
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'util.py'))
+
+from utils_file_handler import atomic_write  # noqa: E402
+
+# SYNTHETIC SALES DATA #
+
+# Writes a sales file in the same format as util.py/sales_data.txt, at any size, with the same kinds of mess:
+# - thousands separators in prices ('1,916') and quantities
+# - commas inside product names ('Mouse,Wireless', 'Laptop,Premium')
+# - zero quantities and negative prices
+# - bad ID prefixes ('X611', also on product and customer IDs) and missing customer IDs / regions
+# - rows with the wrong number of fields and empty lines
+# The same (rows, seed) always produces the same bytes, so benchmark runs are comparable.
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+REGIONS = ['North', 'South', 'East', 'West']
+
+# the catalog of the sample file: (name, name variant with a comma, price range)
+BASE_PRODUCTS = [
+    ('Laptop', 'Laptop,Premium', 20000, 90000),
+    ('Mouse', 'Mouse,Wireless', 300, 1200),
+    ('Keyboard', 'Keyboard,Mechanical', 800, 3500),
+    ('Monitor', 'Monitor,LED', 6000, 25000),
+    ('Webcam', 'Webcam,HD', 1500, 5000),
+    ('Headphones', 'Headphones,Wireless', 1000, 8000),
+    ('USB Cable', 'USB Cable,Type-C', 100, 500),
+    ('External Hard Drive', 'External Hard Drive,1TB', 3000, 9000),
+    ('Wireless Mouse', 'Wireless Mouse,Ergonomic', 400, 2000),
+    ('Laptop Charger', 'Laptop Charger,65W', 1000, 3500),
+]
+
+# share of rows that get each kind of problem (override any of them with mess={...} / --mess name=rate)
+MESS_RATES = {
+    'thousands_separator': 0.30,  # of the numbers >= 1000
+    'comma_in_name': 0.08,
+    'zero_quantity': 0.02,
+    'negative_price': 0.02,
+    'bad_id_prefix': 0.03,  # TransactionID
+    'bad_product_prefix': 0.01,
+    'bad_customer_prefix': 0.01,
+    'missing_customer': 0.02,
+    'missing_region': 0.01,
+    'wrong_field_count': 0.005,
+    'empty_line': 0.002,
+}
+
+SIZES = {'1M': 1_000_000, '10M': 10_000_000, '100M': 100_000_000}
+BATCH_ROWS = 10000
+
+
+def parse_rows(text):
+    # '1M' / '10M' / '100M' / '250000' / '1_000_000' -> int
+    text = str(text).upper().replace('_', '')
+    if text in SIZES:
+        return SIZES[text]
+    if text.endswith('K'):
+        return int(float(text[:-1]) * 1000)
+    if text.endswith('M'):
+        return int(float(text[:-1]) * 1_000_000)
+    return int(text)
+
+
+def build_catalog(products):
+    # the 10 sample products first (P101-P110), then numbered variants so the product dimension grows too
+    catalog = []
+    for i in range(products):
+        name, comma_name, low, high = BASE_PRODUCTS[i % len(BASE_PRODUCTS)]
+        series = i // len(BASE_PRODUCTS)
+        if series:
+            name, comma_name = f"{name} {series}", f"{comma_name} {series}"
+        catalog.append((f"P{101 + i}", name, comma_name, low, high))
+    return catalog
+
+
+def mess_rates(mess=None):
+    # MESS_RATES with the given overrides; an unknown name is an error, not a silent no-op
+    unknown = set(mess or ()) - set(MESS_RATES)
+    if unknown:
+        raise ValueError(f"Unknown mess rate(s): {', '.join(sorted(unknown))} (use {', '.join(MESS_RATES)})")
+    return dict(MESS_RATES, **(mess or {}))
+
+
+def _number(value, rng, rates=MESS_RATES):
+    # integer with a thousands separator some of the time, as in the sample file
+    if value >= 1000 and rng.random() < rates['thousands_separator']:
+        return f"{value:,}"
+    return str(value)
+
+
+def generate_lines(rows, seed=42, products=None, customers=None, start=date(2024, 1, 1), days=365, mess=None):
+    """
+    Yields the data lines (without the header and without '\\n'). Every row is one line,
+    except the 'empty_line' rows which are blank. mess overrides some of MESS_RATES, e.g. {'zero_quantity': 0.1}.
+    """
+    rates = mess_rates(mess)
+    rng = random.Random(seed)
+    catalog = build_catalog(products or max(len(BASE_PRODUCTS), min(rows // 1000, 10000)))
+    customers = customers or max(30, rows // 50)
+    first_day = start.toordinal()
+    date_strings = [date.fromordinal(first_day + d).isoformat() for d in range(days)]
+
+    for n in range(1, rows + 1):
+        r = rng.random
+        if r() < rates['empty_line']:
+            yield ""
+            continue
+        product_id, name, comma_name, low, high = catalog[int(rng.paretovariate(1.3)) % len(catalog)]
+        if r() < rates['bad_product_prefix']:
+            product_id = 'X' + product_id[1:]
+        quantity = 0 if r() < rates['zero_quantity'] else rng.randint(1, 10)
+        price = rng.randint(low, high)
+        if r() < rates['negative_price']:
+            price = -price
+        customer_prefix = 'X' if r() < rates['bad_customer_prefix'] else 'C'
+        fields = [
+            ('X' if r() < rates['bad_id_prefix'] else 'T') + f"{n:06d}",
+            date_strings[rng.randrange(days)],
+            product_id,
+            comma_name if r() < rates['comma_in_name'] else name,
+            _number(quantity, rng, rates),
+            _number(price, rng, rates) if price >= 0 else str(price),
+            "" if r() < rates['missing_customer'] else f"{customer_prefix}{rng.randint(1, customers):06d}",
+            "" if r() < rates['missing_region'] else REGIONS[rng.randrange(4)],
+        ]
+        if r() < rates['wrong_field_count']:
+            if r() < 0.5:
+                fields.pop()
+            else:
+                fields.append('EXTRA')
+        yield "|".join(fields)
+
+
+def write_sales_file(filename, rows, seed=42, **options):
+    """
+    Writes a synthetic sales file (header + rows lines). Returns the filename.
+    """
+    with atomic_write(filename, newline='\n', buffering=1024 * 1024) as f:
+        f.write(HEADER + "\n")
+        batch = []
+        for line in generate_lines(rows, seed, **options):
+            batch.append(line)
+            if len(batch) >= BATCH_ROWS:
+                f.write("\n".join(batch) + "\n")
+                batch = []
+        if batch:
+            f.write("\n".join(batch) + "\n")
+    return filename
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic sales_data.txt")
+    parser.add_argument('rows', help="number of rows, e.g. 250000, 1M, 10M, 100M")
+    parser.add_argument('-o', '--output', help="output file (default benchmarks/data/sales_<rows>_<seed>.txt)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--products', type=int, help="number of distinct products")
+    parser.add_argument('--customers', type=int, help="number of distinct customers")
+    parser.add_argument('--days', type=int, default=365, help="days of data starting 2024-01-01")
+    parser.add_argument('--mess', action='append', default=[], metavar='NAME=RATE',
+                        help=f"override a mess rate, e.g. --mess bad_product_prefix=0.05 ({', '.join(MESS_RATES)})")
+    args = parser.parse_args()
+    mess = {}
+    try:
+        for item in args.mess:
+            name, _, rate = item.partition('=')
+            mess[name] = float(rate)
+        mess_rates(mess)  # fail on a typo before writing anything
+    except ValueError as e:
+        parser.error(str(e))
+
+    rows = parse_rows(args.rows)
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                                         f"sales_{rows}_{args.seed}.txt")
+    write_sales_file(output, rows, args.seed, products=args.products, customers=args.customers, days=args.days,
+                     mess=mess)
+    print(f"Wrote {rows:,} rows to {output}", file=sys.stderr)
@@ -0,0 +1,201 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# PIPELINE BENCHMARKS #
+
+# Times (and memory-profiles with tracemalloc) every stage of the pipeline on a synthetic file:
+# read -> parse -> validate/filter -> each analysis -> enrich -> report.
+# Results are written as JSON so runs of different versions can be compared with --compare.
+#
+# usage: python benchmarks/run_benchmarks.py 1M
+#        python benchmarks/run_benchmarks.py 1M --compare benchmarks/results/<older run>.json
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'util.py'))
+sys.path.insert(0, str(BENCH_DIR))
+
+from generate_sales_data import parse_rows, write_sales_file, build_catalog  # noqa: E402
+from utils_file_handler import read_sales_data, parse_transactions, validate_and_filter  # noqa: E402
+import utils_data_processor as processor  # noqa: E402
+from utils_api_handler import enrich_sales_data  # noqa: E402
+from output_working_file import generate_sales_report  # noqa: E402
+from utils_memo import configure_memo  # noqa: E402
+
+ANALYSES = ['calculate_total_revenue', 'region_wise_sales', 'top_selling_products', 'customer_analysis',
+            'daily_sales_trend', 'find_peak_sales_day', 'low_performing_products']
+
+
+def synthetic_product_mapping(products):
+    # create_product_mapping()-style mapping without the network; every 10th product is "unknown" to the API
+    mapping = {}
+    for product_id, name, comma_name, low, high in build_catalog(products):
+        numeric_id = int(product_id[1:])
+        if numeric_id % 10 == 0:
+            continue
+        mapping[numeric_id] = {'title': name, 'category': 'electronics', 'brand': name.split()[0],
+                               'rating': round(3 + (numeric_id % 20) / 10, 2)}
+    return mapping
+
+
+def pipeline_stages(sales_file, work_dir):
+    """
+    [(stage name, function(state) -> result), ...] in pipeline order.
+    Each stage reads what earlier stages left in `state`.
+    """
+    def read(state):
+        state['raw_lines'] = read_sales_data(sales_file)
+        return state['raw_lines']
+
+    def parse(state):
+        state['transactions'] = parse_transactions(state['raw_lines'])
+        return state['transactions']
+
+    def validate(state):
+        state['valid'], invalid_count, summary = validate_and_filter(state['transactions'])
+        return state['valid']
+
+    def analysis(name):
+        return lambda state: getattr(processor, name)(state['valid'])
+
+    def enrich(state):
+        mapping = synthetic_product_mapping(len({trx['ProductID'] for trx in state['valid']}))
+        # enrich_sales_data() adds the API_* keys in place, so it gets copies
+        state['enriched'] = enrich_sales_data([dict(trx) for trx in state['valid']], mapping,
+                                              os.path.join(work_dir, 'enriched_sales_data.txt'))
+        return state['enriched']
+
+    def report(state):
+        return generate_sales_report(state['valid'], state['enriched'], os.path.join(work_dir, 'sales_report.txt'))
+
+    stages = [('read_sales_data', read), ('parse_transactions', parse), ('validate_and_filter', validate)]
+    stages += [(name, analysis(name)) for name in ANALYSES]
+    stages += [('enrich_sales_data', enrich), ('generate_sales_report', report)]
+    return stages
+
+
+def measure(stage, state, repeat, memory):
+    # best of `repeat` timed runs, then (optionally) one more run under tracemalloc for the peak
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = stage(state)
+        timings.append(time.perf_counter() - start)
+    entry = {'seconds': min(timings), 'runs': timings}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        stage(state)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        entry['peak_bytes'] = peak
+    try:
+        entry['output_rows'] = len(result)
+    except TypeError:
+        pass
+    return entry
+
+
+def max_rss_bytes():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024  # bytes on macOS, KiB on Linux
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(rows, seed=42, repeat=1, memory=True, data_dir=None, stages=None):
+    """
+    Generates (or reuses) the synthetic file for (rows, seed) and benchmarks every stage.
+    Returns the results dict that is written as JSON.
+    """
+    # the analyses can be memoized (utils_memo, SALES_MEMO=1); repeated runs must time the work, not cache hits
+    configure_memo(enabled=False)
+    data_dir = Path(data_dir or BENCH_DIR / 'data')
+    sales_file = data_dir / f"sales_{rows}_{seed}.txt"
+    if not sales_file.exists():
+        print(f"Generating {rows:,} rows into {sales_file} ...")
+        write_sales_file(str(sales_file), rows, seed)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rows': rows,
+            'seed': seed,
+            'file_bytes': sales_file.stat().st_size,
+            'repeat': repeat,
+            'memory_profiled': memory,
+        },
+        'stages': {},
+    }
+    state = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, stage in pipeline_stages(str(sales_file), work_dir):
+            if stages and name not in stages and name not in ('read_sales_data', 'parse_transactions',
+                                                              'validate_and_filter', 'enrich_sales_data'):
+                continue  # the read/parse/validate/enrich stages always run, later stages need their output
+            entry = measure(stage, state, repeat, memory)
+            results['stages'][name] = entry
+            peak = f"  peak {entry['peak_bytes'] / 2 ** 20:,.1f} MiB" if memory else ""
+            print(f"{name:<25} {entry['seconds']:>10.3f} s{peak}")
+    results['meta']['max_rss_bytes'] = max_rss_bytes()
+    return results
+
+
+def compare(results, baseline):
+    # prints this run next to an older one (ratio > 1 means slower than the baseline)
+    print(f"\n{'stage':<25} {'baseline s':>12} {'now s':>10} {'ratio':>7}")
+    for name, entry in results['stages'].items():
+        old = baseline['stages'].get(name)
+        if old is None:
+            continue
+        ratio = entry['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        print(f"{name:<25} {old['seconds']:>12.3f} {entry['seconds']:>10.3f} {ratio:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the sales pipeline")
+    parser.add_argument('rows', nargs='?', default='1M', help="number of rows, e.g. 100000, 1M, 10M, 100M")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=1, help="timed runs per stage (the best is kept)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run (much faster)")
+    parser.add_argument('--stages', nargs='*', help="only these analysis/report stages")
+    parser.add_argument('--data-dir', help="where synthetic files are generated (default benchmarks/data)")
+    parser.add_argument('-o', '--output', help="results JSON (default benchmarks/results/<commit>_<rows>.json)")
+    parser.add_argument('--compare', help="an earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    rows = parse_rows(args.rows)
+    results = run_benchmarks(rows, args.seed, args.repeat, not args.no_memory, args.data_dir, args.stages)
+
+    output = Path(args.output or BENCH_DIR / 'results' / f"{results['meta']['git_commit'] or 'local'}_{rows}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
@@ -1,14 +1,56 @@
+import argparse
+import sys
+from pathlib import Path
+
+# the pipeline modules live in util.py/ and import each other by name
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'util.py'))
+
+from utils_file_handler import read_sales_data, parse_transactions, validate_and_filter, FilterIndex
+import utils_data_processor as processor
+from utils_api_handler import fetch_all_products, create_product_mapping, enrich_sales_data, save_enriched_data
+from output_working_file import generate_sales_report
+from utils_aggregator import aggregate_transactions
+from utils_instrumentation import get_tracer, enable_tracing
+from utils_scheduler import Stage, run_stages, exclusive_output
+from sales_daemon import serve, DEFAULT_PORT
 
 # FLOW: main execution function
 
+SALES_FILE = str(Path(__file__).resolve().parent / 'sales_data.txt')
+ENRICHED_FILE = 'data/enriched_sales_data.txt'
+REPORT_FILE = 'output/sales_report.txt'
+
+ANALYSES = ['calculate_total_revenue', 'region_wise_sales', 'top_selling_products', 'customer_analysis',
+            'daily_sales_trend', 'find_peak_sales_day', 'low_performing_products']
 
-def filter_data():
+
+def filter_data(index):
+    # asks for the filter criteria; blank answers mean no filter
     print("Filtering data based on user input...")
+    region = input(f"Region ({', '.join(index.regions())}, blank for all): ").strip() or None
+    min_amount = input("Minimum amount (blank for none): ").strip()
+    max_amount = input("Maximum amount (blank for none): ").strip()
+    return {
+        'region': region,
+        'min_amount': float(min_amount.replace(',', '')) if min_amount else None,
+        'max_amount': float(max_amount.replace(',', '')) if max_amount else None,
+    }
+
+
+def show_filter_options(index):
+    # the regions and the amount range the user can filter on
+    available_regions = index.regions()
+    low, high = index.amount_range()
+    if available_regions:
+        print(f"Available regions: {', '.join(available_regions)}")
+    if low is not None:
+        print(f"Transaction amount range: ₹{low:,.0f} – ₹{high:,.0f}")
+
+
+def main(sales_file=SALES_FILE, interactive=True):
+    tracer = get_tracer()  # a no-op unless main1.py was started with --trace
+    criteria = {}
 
-def main():
-    available_regions = ["North", "South", "East", "West"]
-    transaction_amount_range = "₹1,000 – ₹5,00,000"
-    
     for workflow_step in range(1, 13):
         try:
             # print welcom message
@@ -18,51 +60,176 @@ def main():
             # read sales data file
             elif workflow_step == 2:
                 print("Reading sales data file...")
+                with tracer.stage('read_sales_data') as record:
+                    raw_lines = read_sales_data(sales_file)
+                    record.rows_out = len(raw_lines)
+                print(f"✓ Successfully read {len(raw_lines)} transactions")
                 # parse and clean transactions
             elif workflow_step == 3:
                 print("Parsing and cleaning data...")
+                with tracer.stage('parse_transactions', len(raw_lines)) as record:
+                    transactions = parse_transactions(raw_lines)
+                    index = FilterIndex(transactions)  # validated once, reused by the filter and step 5
+                    record.rows_out = len(transactions)
+                print(f"✓ Parsed {len(transactions)} records")
             # display filter options to user
             elif workflow_step == 4:
                 print("Displaying filter options...")
-                if available_regions:
-                    print(f"Available regions: {', '.join(available_regions)}")
-                if transaction_amount_range:
-                    print(f"Transaction amount range: {transaction_amount_range}")
-                user_input = input("Do you want to filter data? (y/n): ")
+                show_filter_options(index)
+                try:
+                    user_input = input("Do you want to filter data? (y/n): ") if interactive else "n"
+                except EOFError:  # no terminal (e.g. a scheduled run) -> no filter
+                    user_input = "n"
                 if user_input.lower() == "y":
-                    filter_data()
+                    criteria = filter_data(index)
             # validate transactions
             elif workflow_step == 5:
                 print("Validating transactions...")
+                with tracer.stage('validate_and_filter', len(transactions)) as record:
+                    valid_transactions, invalid_count, summary = validate_and_filter(transactions, index=index, **criteria)
+                    record.rows_out = len(valid_transactions)
             # display validation summary
             elif workflow_step == 6:
                 print("Displaying validation summary...")
+                print(f"✓ Valid: {summary['final_count']} | Invalid: {invalid_count}")
+                for rule, stats in index.report['rules'].items():
+                    if stats['rejected']:
+                        print(f"  - {rule}: {stats['rejected']}")
             # perform all data analyses
             elif workflow_step == 7:
                 print("Performing data analyses...")
+                with tracer.stage('aggregate', len(valid_transactions)):
+                    aggregate = aggregate_transactions(valid_transactions)  # one pass, shared by every analysis
+                with tracer.stage('analyses', len(valid_transactions)):
+                    analysis_results = {name: tracer.wrap(getattr(processor, name))(aggregate)
+                                        for name in ANALYSES}
+                print("✓ Analysis complete")
             # fetch products from API
             elif workflow_step == 8:
                 print("Fetching products from API...")
+                with tracer.stage('fetch_products') as record:
+                    api_products = fetch_all_products()
+                    product_mapping = create_product_mapping(api_products)
+                    record.rows_out = len(api_products)
+                print(f"✓ Fetched {len(api_products)} products")
             # enrich sales data with API info
             elif workflow_step == 9:
                 print("Enriching sales data...")
+                with tracer.stage('enrich_sales_data', len(valid_transactions)) as record:
+                    enriched_transactions = enrich_sales_data(valid_transactions, product_mapping, output_file=None)
+                    record.rows_out = len(enriched_transactions)
+                matched = sum(1 for trx in enriched_transactions if trx.get('API_Match'))
+                print(f"✓ Enriched {matched}/{len(enriched_transactions)} transactions")
             # save enriched data to file
             elif workflow_step == 10:
                 print("Saving enriched data...")
+                with tracer.stage('save_enriched_data', len(enriched_transactions)):
+                    save_enriched_data(enriched_transactions, ENRICHED_FILE)
             # generate comprehensive report
             elif workflow_step == 11:
                 print("Generating report...")
+                with tracer.stage('generate_sales_report', len(valid_transactions)):
+                    generate_sales_report(aggregate, enriched_transactions, REPORT_FILE)
             # print success message with file locations
             elif workflow_step == 12:
                 print("Process complete!")
+                print(f"✓ Enriched data: {ENRICHED_FILE}")
+                print(f"✓ Report: {REPORT_FILE}")
         except Exception as e:
             print(f"An error occurred at step {workflow_step}: {str(e)}")
             break
     print("========================================")
-    
+
+
+def main_concurrent(sales_file=SALES_FILE, interactive=True, workers=4):
+    """
+    The same workflow as a dependency graph (see utils_scheduler): the catalog fetch starts at
+    time zero next to the file reading, the analyses run side by side from ONE shared aggregate,
+    and the report starts as soon as the aggregate and the enrichment are ready.
+    """
+    print("WELCOME TO THE SALES ANALYTICS SYSTEM")
+
+    def fetch_products():
+        return create_product_mapping(fetch_all_products())
+
+    def parse(raw_lines):
+        return FilterIndex(parse_transactions(raw_lines))  # index.transactions are the parsed rows
+
+    def ask_filter(index):
+        with exclusive_output():  # the other stages keep running but wait with their output
+            show_filter_options(index)
+            try:
+                user_input = input("Do you want to filter data? (y/n): ") if interactive else "n"
+            except EOFError:
+                user_input = "n"
+            return filter_data(index) if user_input.lower() == "y" else {}
+
+    def validate(index, criteria):
+        valid_transactions, invalid_count, summary = validate_and_filter(index.transactions, index=index,
+                                                                         **criteria)
+        print(f"✓ Valid: {summary['final_count']} | Invalid: {invalid_count}")
+        return valid_transactions
+
+    def save(enriched_transactions):
+        save_enriched_data(enriched_transactions, ENRICHED_FILE)
+        return ENRICHED_FILE
+
+    def report(aggregate, enriched_transactions):
+        generate_sales_report(aggregate, enriched_transactions, REPORT_FILE)
+        return REPORT_FILE
+
+    stages = [
+        Stage('fetch_products', fetch_products),
+        Stage('read_sales_data', lambda: read_sales_data(sales_file)),
+        Stage('parse_transactions', parse, ['read_sales_data']),
+        Stage('filter_options', ask_filter, ['parse_transactions']),
+        Stage('validate_and_filter', validate, ['parse_transactions', 'filter_options']),
+        Stage('aggregate', aggregate_transactions, ['validate_and_filter']),
+        Stage('enrich_sales_data', lambda valid, mapping: enrich_sales_data(valid, mapping, output_file=None),
+              ['validate_and_filter', 'fetch_products']),
+        Stage('save_enriched_data', save, ['enrich_sales_data']),
+        Stage('generate_sales_report', report, ['aggregate', 'enrich_sales_data']),
+    ]
+    stages += [Stage(name, getattr(processor, name), ['aggregate']) for name in ANALYSES]
+    try:
+        run_stages(stages, max_workers=workers)
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+    else:
+        print("Process complete!")
+        print(f"✓ Enriched data: {ENRICHED_FILE}")
+        print(f"✓ Report: {REPORT_FILE}")
+    print("========================================")
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Sales analytics workflow")
+    parser.add_argument('sales_file', nargs='?', default=SALES_FILE)
+    parser.add_argument('--trace', nargs='?', const='output/trace.json', metavar='FILE',
+                        help="record per-stage time/CPU/memory/rows/bytes and write a JSON trace (default output/trace.json)")
+    parser.add_argument('--no-memory', action='store_true', help="with --trace: skip tracemalloc (lower overhead)")
+    parser.add_argument('--no-input', action='store_true', help="don't ask for filters")
+    parser.add_argument('--concurrent', nargs='?', type=int, const=4, metavar='WORKERS',
+                        help="run the workflow as a dependency graph on a thread pool (default 4 workers)")
+    parser.add_argument('--serve', nargs='?', type=int, const=DEFAULT_PORT, metavar='PORT',
+                        help=f"load once and answer the analyses over HTTP/JSON (default port {DEFAULT_PORT})")
+    args = parser.parse_args()
+
+    def run():
+        if args.concurrent:
+            main_concurrent(args.sales_file, interactive=not args.no_input, workers=args.concurrent)
+        else:
+            main(args.sales_file, interactive=not args.no_input)
+
+    if args.serve:
+        serve(args.sales_file, port=args.serve)
+    elif args.trace:
+        tracer = enable_tracing(memory=not args.no_memory, verbose=True)
+        with tracer.stage('main'):
+            run()
+        print(f"Trace written to {tracer.write(args.trace)}")
+    else:
+        run()
 
 
 
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# the pipeline modules live in util.py/ and import each other by name; the data generator is in benchmarks/
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'util.py'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+
+@pytest.fixture(autouse=True)
+def no_memo():
+    # the memo is opt-in, but SALES_MEMO=1 in the environment must not turn it on here;
+    # every test computes for real unless it configures a memo itself (tests/test_memo.py)
+    from utils_memo import configure_memo
+    configure_memo(enabled=False)
+    yield
+    configure_memo(enabled=False)
+
+
+def write_sales_file(path, lines, header=HEADER):
+    path.write_text("\n".join([header] + list(lines)) + "\n", encoding='utf-8')
+    return str(path)
+
+
+def _same(left, right):
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(_same(left[key], right[key]) for key in left)
+    if isinstance(left, float):
+        return left == pytest.approx(right, rel=1e-9)
+    if isinstance(left, list):
+        return sorted(map(repr, left)) == sorted(map(repr, right))
+    return left == right
+
+
+def assert_same_aggregate(left, right):
+    # float sums may differ in the last bits when partials are merged in another order
+    assert _same(left.to_state(), right.to_state())
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from utils_file_handler import atomic_write
+
+
+def test_replaces_the_target_when_done(tmp_path):
+    target = tmp_path / 'nested' / 'out.txt'
+    with atomic_write(str(target)) as f:
+        f.write("new")
+        assert not target.exists()  # nothing visible until the block ends
+    assert target.read_text(encoding='utf-8') == "new"
+    assert os.listdir(target.parent) == ['out.txt']
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    target = tmp_path / 'out.bin'
+    target.write_bytes(b"old")
+    with pytest.raises(ValueError):
+        with atomic_write(str(target), 'wb') as f:
+            f.write(b"half")
+            raise ValueError("disk gone")
+    assert target.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ['out.bin']
+
+
+def test_nested_writers_use_separate_temp_files(tmp_path):
+    target = str(tmp_path / 'state.json')
+    with atomic_write(target) as outer:
+        with atomic_write(target) as inner:
+            assert inner.name != outer.name
+            inner.write("inner")
+        outer.write("outer")
+    assert open(target, encoding='utf-8').read() == "outer"
@@ -0,0 +1,65 @@
+import pytest
+
+from utils_file_handler import (split_byte_ranges, plan_byte_ranges, parse_transactions_parallel,
+                                read_sales_data, parse_transactions)
+
+from conftest import HEADER
+
+LINES = [
+    "T001|2024-12-01|P101|Laptop|1|45000|C001|North",
+    "T002|2024-12-01|P102|Mouse|2|500|C002|South",
+    "",  # blank line
+    "T003|2024-12-02|P103|Keyboard|1|1,500|C003|East",
+    "T004|2024-12-02|P104|Webcam|3|2500|C004|West",
+    "T005|2024-12-03|P101|Laptop|1|45000|C001|North",
+]
+
+
+def test_split_covers_the_buffer_without_gaps_or_overlap():
+    buffer = b"aaa\nbb\n\ncccc\nd\n"
+    for chunk_bytes in range(1, len(buffer) + 2):
+        ranges = split_byte_ranges(buffer, 0, chunk_bytes)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(buffer)
+        assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+        assert all(start < end for start, end in ranges)
+        assert all(buffer[end - 1:end] == b'\n' for start, end in ranges)  # every range ends on a line break
+
+
+def test_range_ending_exactly_on_a_newline_is_not_extended():
+    buffer = b"abc\ndef\n"
+    assert split_byte_ranges(buffer, 0, 4) == [(0, 4), (4, 8)]
+
+
+def test_last_range_without_a_newline_runs_to_the_end():
+    buffer = b"abc\ndef"
+    assert split_byte_ranges(buffer, 0, 2) == [(0, 4), (4, 7)]
+    assert split_byte_ranges(buffer, 4, 100) == [(4, 7)]
+
+
+def test_plan_skips_the_header(tmp_path):
+    path = tmp_path / 'sales.txt'
+    path.write_bytes((HEADER + "\n" + "\n".join(LINES) + "\n").encode('utf-8'))
+    encoding, ranges = plan_byte_ranges(str(path), chunk_bytes=10)
+    assert ranges[0][0] == len(HEADER) + 1
+    assert ranges[-1][1] == path.stat().st_size
+
+
+def test_plan_of_missing_or_header_only_file(tmp_path):
+    assert plan_byte_ranges(str(tmp_path / 'missing.txt')) == (None, [])
+    path = tmp_path / 'header.txt'
+    path.write_bytes(HEADER.encode('utf-8'))
+    assert plan_byte_ranges(str(path))[1] == []
+
+
+@pytest.mark.parametrize('newline', ["\n", "\r\n"])
+@pytest.mark.parametrize('trailing', [True, False])
+@pytest.mark.parametrize('chunk_bytes', [1, 7, 48, 10_000])
+def test_parallel_parse_matches_serial(tmp_path, newline, trailing, chunk_bytes):
+    text = newline.join([HEADER] + LINES) + (newline if trailing else "")
+    path = tmp_path / 'sales.txt'
+    path.write_bytes(text.encode('utf-8'))
+    serial = parse_transactions(read_sales_data(str(path)), columnar=True)
+    parallel = parse_transactions_parallel(str(path), workers=2, chunk_bytes=chunk_bytes)
+    assert parallel.to_dicts() == serial.to_dicts()
+    assert [row['TransactionID'] for row in parallel.to_dicts()] == ['T001', 'T002', 'T003', 'T004', 'T005']
+    assert {row['Region'] for row in parallel.to_dicts()} == {'North', 'South', 'East', 'West'}  # no stray \r
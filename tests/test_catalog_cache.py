@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+import utils_catalog_cache
+from utils_catalog_cache import CatalogCache, configure_catalog_cache
+from utils_api_handler import download_catalog, fetch_all_products
+
+PRODUCTS = [{'id': n, 'title': f"Product {n}", 'category': 'test', 'brand': 'Acme', 'rating': 4.0}
+            for n in range(1, 26)]
+ETAG = '"v1"'
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    # stand-in for the product API: pages of at most 10 products, ETag + 304 on the first page
+    requests = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: int(values[-1]) for key, values in parse_qs(url.query).items()}
+        self.requests.append((url.path, params.get('skip', 0), self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        skip, limit = params.get('skip', 0), min(params.get('limit', 30), 10)
+        body = json.dumps({'products': PRODUCTS[skip:skip + limit], 'total': len(PRODUCTS),
+                           'skip': skip, 'limit': limit}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', ETAG)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    handler = type('Handler', (CatalogHandler,), {'requests': []})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/products"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def requests_made(server):
+    return server.RequestHandlerClass.requests
+
+
+def test_download_follows_the_server_page_size(server):
+    result = download_catalog(server.url)
+    assert result['products'] == PRODUCTS
+    assert result['etag'] == ETAG
+    assert sorted(skip for path, skip, etag in requests_made(server)) == [0, 10, 20]
+
+
+def test_memory_hit_downloads_once(server, tmp_path):
+    cache = CatalogCache(cache_dir=str(tmp_path))
+    assert cache.get(server.url, download_catalog) == PRODUCTS
+    count = len(requests_made(server))
+    assert cache.get(server.url, download_catalog) == PRODUCTS
+    assert len(requests_made(server)) == count
+
+
+def test_disk_snapshot_serves_a_new_cache(server, tmp_path):
+    CatalogCache(cache_dir=str(tmp_path)).get(server.url, download_catalog)
+    count = len(requests_made(server))
+    fresh = CatalogCache(cache_dir=str(tmp_path))  # like the next run of a script
+    assert fresh.get(server.url, download_catalog) == PRODUCTS
+    assert len(requests_made(server)) == count
+
+
+def test_stale_entry_is_revalidated_with_a_304(server, tmp_path):
+    cache = CatalogCache(cache_dir=str(tmp_path), ttl=0)
+    cache.get(server.url, download_catalog)
+    count = len(requests_made(server))
+    assert cache.get(server.url, download_catalog) == PRODUCTS
+    assert requests_made(server)[count:] == [('/products', 0, ETAG)]  # one conditional GET, no pages
+
+
+def test_invalidate_drops_memory_and_disk(server, tmp_path):
+    cache = CatalogCache(cache_dir=str(tmp_path))
+    cache.get(server.url, download_catalog)
+    cache.invalidate(server.url)
+    assert not os.path.exists(cache.snapshot_path(server.url))
+    count = len(requests_made(server))
+    assert cache.get(server.url, download_catalog) == PRODUCTS
+    assert len(requests_made(server)) == count + 3
+    assert requests_made(server)[count][2] is None  # unconditional again
+
+
+def test_failed_refresh_keeps_the_cached_copy(tmp_path):
+    cache = CatalogCache(cache_dir=str(tmp_path), ttl=0)
+    cache.get('http://catalog', lambda url, etag, last_modified: {
+        'not_modified': False, 'products': PRODUCTS, 'etag': None, 'last_modified': None})
+
+    def broken(url, etag, last_modified):
+        raise ConnectionError("down")
+    assert cache.get('http://catalog', broken) == PRODUCTS
+
+
+def test_fetch_all_products_uses_the_shared_cache(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(utils_catalog_cache, '_default_cache', None)
+    configure_catalog_cache(cache_dir=str(tmp_path))
+    base_url = server.url[:-len('/products')]
+    assert fetch_all_products(base_url=base_url) == PRODUCTS
+    count = len(requests_made(server))
+    assert fetch_all_products(base_url=base_url) == PRODUCTS
+    assert len(requests_made(server)) == count
+
+
+def test_unwritable_cache_dir_still_returns_the_download(server, tmp_path, capsys):
+    blocker = tmp_path / 'not_a_dir'
+    blocker.write_text("")
+    cache = CatalogCache(cache_dir=str(blocker / 'cache'))
+    assert cache.get(server.url, download_catalog) == PRODUCTS
+    assert "Could not save the catalog snapshot" in capsys.readouterr().out
+    count = len(requests_made(server))
+    assert cache.get(server.url, download_catalog) == PRODUCTS  # still served from memory
+    assert len(requests_made(server)) == count
+
+
+def test_background_refresh_survives_an_unwritable_cache_dir(server, tmp_path):
+    cache = CatalogCache(cache_dir=str(tmp_path), ttl=0, stale_while_revalidate=True)
+    cache.get(server.url, download_catalog)
+    blocker = tmp_path / 'not_a_dir'
+    blocker.write_text("")
+    cache.cache_dir = str(blocker / 'cache')
+    assert cache.get(server.url, download_catalog) == PRODUCTS  # stale copy, refresh in the background
+    for _ in range(200):
+        if not cache._refreshing:
+            break
+        threading.Event().wait(0.01)
+    assert not cache._refreshing
@@ -0,0 +1,39 @@
+import pytest
+
+from generate_sales_data import write_sales_file as generate_sales_file
+from utils_file_handler import read_sales_data, parse_transactions, validate_and_filter
+from utils_aggregator import aggregate_transactions
+from utils_chunked import aggregate_file_chunked, iter_chunks
+
+from conftest import assert_same_aggregate
+
+
+@pytest.fixture(scope='module')
+def sales_file(tmp_path_factory):
+    return generate_sales_file(str(tmp_path_factory.mktemp('chunked') / 'sales.txt'), 5000, seed=7)
+
+
+def test_chunks_cover_every_line(sales_file):
+    chunks = list(iter_chunks(sales_file, 700))
+    assert all(len(chunk) == 700 for chunk in chunks[:-1])
+    assert sum(chunks, []) == read_sales_data(sales_file)
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+@pytest.mark.parametrize('criteria', [{}, {'region': 'North'}, {'min_amount': 1000, 'max_amount': 50000}])
+def test_chunked_equals_in_memory(sales_file, columnar, criteria):
+    aggregate, summary = aggregate_file_chunked(sales_file, 700, columnar=columnar, **criteria)
+    transactions = parse_transactions(read_sales_data(sales_file), columnar=columnar)
+    valid, invalid_count, expected_summary = validate_and_filter(transactions, **criteria)
+    assert_same_aggregate(aggregate, aggregate_transactions(valid))
+    assert summary['chunks'] == 8
+    assert summary['invalid'] == invalid_count
+    for key in ('total_input', 'filtered_by_region', 'filtered_by_amount', 'final_count'):
+        assert summary[key] == expected_summary[key]
+
+
+@pytest.mark.parametrize('distinct', ['exact', 'hll'])
+def test_chunk_size_does_not_change_the_result(sales_file, distinct):
+    small, _ = aggregate_file_chunked(sales_file, 97, distinct=distinct)
+    large, _ = aggregate_file_chunked(sales_file, 100_000, distinct=distinct)
+    assert_same_aggregate(small, large)
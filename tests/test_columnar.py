@@ -0,0 +1,112 @@
+import pytest
+
+import utils_data_processor as processor
+from utils_file_handler import read_sales_data, parse_transactions, validate_and_filter
+from utils_transaction_table import table_from_dicts
+
+from conftest import write_sales_file
+
+# a little of every kind of mess the parsers have to cope with
+MALFORMED = [
+    "T001|2024-12-01|P101|Laptop|1|100.0|C001|North",
+    "T002|2024-13-45|P102|Mouse|1|100.0|C002|South",  # impossible date
+    "T003|not a date|P101|Laptop|2|50.0|C001|North",
+    "T004|2024-12-02|P103|Laptop,Premium|1,000|1,500|C003|East",  # thousands separators, comma in the name
+    "T005|2024-12-02|P104|Webcam|0|2500|C004|West",  # zero quantity
+    "X006|2024-12-03|P101|Laptop|1|-10|C005|North",  # bad id, negative price
+    "T007|2024-12-03|P102|Mouse|two|100|C001|North",  # bad number -> skipped by both parsers
+    "T008|2024-12-03|P102|Mouse|1|100|C001",  # wrong field count -> skipped by both parsers
+    "",
+    "T009|2024-12-03|P105|USB Cable|3|150|C002|",  # no region
+]
+
+ANALYSES = ['calculate_total_revenue', 'region_wise_sales', 'top_selling_products', 'customer_analysis',
+            'daily_sales_trend', 'find_peak_sales_day', 'low_performing_products', 'sales_by_period']
+
+
+def normalise(result):
+    # customer_analysis lists products from a set; compare them without their order
+    if isinstance(result, dict):
+        return {key: normalise(value) for key, value in result.items()}
+    if isinstance(result, list) and all(isinstance(item, str) for item in result):
+        return sorted(result)
+    return result
+
+
+@pytest.fixture
+def parsed(tmp_path):
+    raw_lines = read_sales_data(write_sales_file(tmp_path / 'sales.txt', MALFORMED))
+    return parse_transactions(raw_lines), parse_transactions(raw_lines, columnar=True)
+
+
+def test_both_parsers_keep_the_same_rows(parsed):
+    rows, table = parsed
+    assert len(rows) == len(table) == 7
+    assert [trx['TransactionID'] for trx in rows] == table.values('TransactionID').tolist()
+    # a date that does not parse is kept, without a day
+    assert rows[1]['DateOrdinal'] is None and table.row(1)['DateOrdinal'] is None
+
+
+@pytest.mark.parametrize('name', ANALYSES)
+def test_analyses_match_on_malformed_input(parsed, name):
+    rows, table = parsed
+    analysis = getattr(processor, name)
+    assert normalise(analysis(rows)) == normalise(analysis(table))
+
+
+def test_revenue_counts_rows_with_bad_dates(parsed):
+    rows, table = parsed
+    total = 100.0 + 100.0 + 100.0 + 1_500_000.0 + 0 - 10.0 + 450.0
+    assert processor.calculate_total_revenue(rows) == processor.calculate_total_revenue(table) == total
+
+
+@pytest.mark.parametrize('criteria', [{}, {'region': 'North'}, {'min_amount': 150}, {'region': 'East', 'max_amount': 10}])
+def test_validate_and_filter_matches(parsed, criteria):
+    rows, table = parsed
+    valid_rows, invalid_rows, summary_rows = validate_and_filter(rows, **criteria)
+    valid_table, invalid_table, summary_table = validate_and_filter(table, **criteria)
+    assert invalid_rows == invalid_table == 2
+    assert summary_rows == summary_table
+    assert [trx['TransactionID'] for trx in valid_rows] == valid_table.values('TransactionID').tolist()
+
+
+@pytest.mark.parametrize('extension', ['npz', 'parquet'])
+def test_binary_save_of_dicts_with_bad_dates(parsed, tmp_path, extension):
+    from utils_api_handler import save_enriched_data
+    from utils_transaction_table import load_table
+
+    if extension == 'parquet':
+        pytest.importorskip('pyarrow')
+    rows, table = parsed
+    filename = str(tmp_path / f"enriched.{extension}")
+    save_enriched_data(rows, filename)
+    loaded = load_table(filename)
+    assert loaded.to_dicts() == table.to_dicts() == table_from_dicts(rows).to_dicts()
+
+
+def test_cube_from_dicts_matches_table(parsed):
+    from utils_cube import build_cube
+
+    rows, table = parsed
+    from_rows, from_table = build_cube(rows), build_cube(table)
+    assert from_rows.query(by='region') == from_table.query(by='region')
+    assert from_rows.query(by='day') == from_table.query(by='day')
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_cube_matches_the_analyses_on_invalid_input(parsed, columnar):
+    from utils_cube import build_cube
+
+    rows, table = parsed
+    cube = build_cube(table if columnar else rows)
+    valid, invalid_count, summary = validate_and_filter(rows)
+    assert invalid_count > 0  # the zero quantity, the bad id and the negative price
+    dated = [trx for trx in valid if trx.get('DateOrdinal')]
+    assert cube.query()['transactions'] == len(dated)
+    assert cube.query()['revenue'] == processor.calculate_total_revenue(dated)
+    by_day = {day: {'revenue': stats['revenue'], 'transactions': stats['transaction_count']}
+              for day, stats in processor.daily_sales_trend(valid).items()}
+    assert {day: {'revenue': cell['revenue'], 'transactions': cell['transactions']}
+            for day, cell in cube.query(by='day').items()} == by_day
+    assert {region: cell['revenue'] for region, cell in cube.query(by='region').items()} == \
+        {region: stats['total_sales'] for region, stats in processor.region_wise_sales(dated).items()}
@@ -0,0 +1,59 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import sales_daemon
+from sales_daemon import make_server
+
+from conftest import write_sales_file
+
+LINES = [
+    "T001|2024-12-01|P101|Laptop|1|45000|C001|North",
+    "T002|2024-12-01|P102|Mouse|2|500|C002|South",
+    "T003|2024-12-02|P103|Keyboard|1|1500|C001|East",
+]
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = make_server(write_sales_file(tmp_path / 'sales.txt', LINES), port=0, enrich=False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path):
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_query_and_reload_bump_the_generation(server):
+    assert get(server, '/calculate_total_revenue') == (200, 47500.0)
+    dataset, generation = server.service.current
+    server.service.reload()
+    assert server.service.current[1] == generation + 1
+    assert server.service.current[0] is not dataset
+    assert get(server, '/status')[1]['generation'] == generation + 1
+
+
+def test_unknown_query_is_404(server):
+    status, body = get(server, '/no_such_query')
+    assert status == 404
+    assert 'Unknown query' in body['error']
+
+
+def test_key_error_inside_an_analysis_is_500(server, monkeypatch):
+    def broken(aggregate, params):
+        return {}['missing']
+    monkeypatch.setitem(sales_daemon.QUERIES, 'region_wise_sales', broken)
+    status, body = get(server, '/region_wise_sales')
+    assert status == 500
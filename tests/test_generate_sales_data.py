@@ -0,0 +1,15 @@
+import pytest
+
+from generate_sales_data import write_sales_file as generate_sales_file
+from utils_file_handler import read_sales_data, parse_transactions, validate_batch
+
+
+def test_generator_breaks_every_validation_rule(tmp_path):
+    filename = generate_sales_file(str(tmp_path / 'messy.txt'), 3000, seed=3,
+                                   mess={'bad_product_prefix': 0.05, 'bad_customer_prefix': 0.05})
+    valid, report = validate_batch(parse_transactions(read_sales_data(filename)))
+    broken = {rule for rule, stats in report['rules'].items() if stats['rejected']}
+    assert {'bad_transaction_id', 'bad_product_id', 'bad_customer_id', 'non_positive_quantity',
+            'non_positive_price'} <= broken
+    with pytest.raises(ValueError, match="Unknown mess rate"):
+        generate_sales_file(str(tmp_path / 'typo.txt'), 10, mess={'bad_prodcut_prefix': 0.1})
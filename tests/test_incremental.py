@@ -0,0 +1,109 @@
+import os
+
+from utils_file_handler import read_sales_data, parse_transactions, validate_batch
+from utils_aggregator import aggregate_transactions
+from utils_incremental import ingest_new_lines, run_incremental, load_checkpoint
+
+from conftest import write_sales_file
+
+LINES = [
+    "T001|2024-12-01|P101|Laptop|1|45000|C001|North",
+    "T002|2024-12-01|P102|Mouse|2|500|C002|South",
+    "T003|2024-12-02|P101|Laptop|0|45000|C003|North",  # zero quantity -> rejected
+    "X004|2024-12-02|P103|Keyboard|1|1500|C001|East",  # bad transaction id -> rejected
+    "T005|2024-12-02|P103|Keyboard|1|1,500|C004|East",
+]
+MORE = [
+    "T006|2024-12-03|P102|Mouse|1|-500|C002|South",  # negative price -> rejected
+    "T007|2024-12-03|P104|Webcam|3|2500|C005|West",
+]
+
+
+def batch_state(filename):
+    valid, report = validate_batch(parse_transactions(read_sales_data(filename)))
+    return aggregate_transactions(valid).to_state()
+
+
+def append(filename, lines, newline=True):
+    with open(filename, 'a', encoding='utf-8', newline='') as f:
+        f.write("\n".join(lines) + ("\n" if newline else ""))
+
+
+def test_first_run_matches_the_validated_batch_pipeline(tmp_path):
+    sales_file = write_sales_file(tmp_path / 'sales.txt', LINES)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file)
+    assert new == 3
+    assert aggregate.to_state() == batch_state(sales_file)
+    assert checkpoint['rejected']['non_positive_quantity'] == 1
+    assert checkpoint['rejected']['bad_transaction_id'] == 1
+
+
+def test_sample_file_matches_the_batch_pipeline():
+    sales_file = os.path.join(os.path.dirname(__file__), '..', 'util.py', 'sales_data.txt')
+    checkpoint, aggregate, new = ingest_new_lines(sales_file)
+    assert aggregate.to_state() == batch_state(sales_file)
+    assert new == aggregate.transaction_count
+
+
+def test_resume_only_reads_appended_lines(tmp_path):
+    sales_file = write_sales_file(tmp_path / 'sales.txt', LINES)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file)
+    append(sales_file, MORE)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file, checkpoint)
+    assert new == 1
+    assert checkpoint['offset'] == os.path.getsize(sales_file)
+    assert aggregate.to_state() == batch_state(sales_file)
+    assert checkpoint['rejected']['non_positive_price'] == 1
+
+
+def test_incomplete_last_line_waits_for_the_next_run(tmp_path):
+    sales_file = write_sales_file(tmp_path / 'sales.txt', LINES)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file)
+    append(sales_file, ["T007|2024-12-03|P104|Webcam|3|25"], newline=False)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file, checkpoint)
+    assert new == 0
+    append(sales_file, ["00|C005|West"])
+    checkpoint, aggregate, new = ingest_new_lines(sales_file, checkpoint)
+    assert new == 1
+    assert aggregate.products['Webcam']['revenue'] == 3 * 2500.0
+
+
+def test_truncated_file_starts_over(tmp_path):
+    sales_file = write_sales_file(tmp_path / 'sales.txt', LINES + MORE)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file)
+    write_sales_file(tmp_path / 'sales.txt', MORE)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file, checkpoint)
+    assert new == 1
+    assert aggregate.to_state() == batch_state(sales_file)
+
+
+def test_rotated_file_of_the_same_or_bigger_size_starts_over(tmp_path):
+    sales_file = write_sales_file(tmp_path / 'sales.txt', LINES)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file)
+
+    # rewritten in place (same inode), same size, different content
+    rewritten = [line.replace('C00', 'C10') for line in LINES]
+    write_sales_file(tmp_path / 'sales.txt', rewritten)
+    assert os.path.getsize(sales_file) == checkpoint['offset']
+    checkpoint, aggregate, new = ingest_new_lines(sales_file, checkpoint)
+    assert aggregate.to_state() == batch_state(sales_file)
+
+    # replaced by a new, bigger file (new inode)
+    write_sales_file(tmp_path / 'next.txt', MORE + LINES)
+    os.replace(tmp_path / 'next.txt', sales_file)
+    checkpoint, aggregate, new = ingest_new_lines(sales_file, checkpoint)
+    assert new == 4
+    assert aggregate.to_state() == batch_state(sales_file)
+
+
+def test_missing_file_keeps_the_checkpoint(tmp_path, capsys):
+    sales_file = write_sales_file(tmp_path / 'sales.txt', LINES)
+    state_file = str(tmp_path / 'checkpoint.json')
+    run_incremental(sales_file, state_file)
+    saved = load_checkpoint(state_file)
+    os.remove(sales_file)
+    aggregate = run_incremental(sales_file, state_file)
+    assert "not found" in capsys.readouterr().out
+    assert load_checkpoint(state_file) == saved
+    assert aggregate.transaction_count == 3
+    assert run_incremental(str(tmp_path / 'never.txt'), str(tmp_path / 'other.json')).transaction_count == 0
@@ -0,0 +1,22 @@
+from utils_lru import LRUCache
+
+
+def test_evicts_the_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the oldest
+    cache.put('c', 3)
+    assert cache.keys() == ['a', 'c']
+    assert cache.get('b') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_pop_and_clear():
+    cache = LRUCache(4)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.pop('a') == 1
+    assert cache.pop('a') is None
+    cache.clear()
+    assert len(cache) == 0
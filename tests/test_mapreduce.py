@@ -0,0 +1,52 @@
+import pytest
+
+from generate_sales_data import write_sales_file as generate_sales_file
+from utils_file_handler import read_sales_data, parse_transactions, validate_batch
+from utils_aggregator import aggregate_transactions
+from utils_mapreduce import map_reduce_files, map_byte_range, partition_of
+
+from conftest import assert_same_aggregate
+
+
+@pytest.fixture(scope='module')
+def sales_files(tmp_path_factory):
+    # three "daily" files with the generator's usual mess
+    directory = tmp_path_factory.mktemp('mapreduce')
+    return [generate_sales_file(str(directory / f"day{n}.txt"), 3000, seed=n) for n in range(3)]
+
+
+def batch(filenames, distinct='exact'):
+    valid, reports = [], []
+    for filename in filenames:
+        rows, report = validate_batch(parse_transactions(read_sales_data(filename), columnar=True))
+        valid += rows.to_dicts()
+        reports.append(report)
+    return aggregate_transactions(valid, distinct), reports
+
+
+@pytest.mark.parametrize('distinct', ['exact', 'hll'])
+def test_map_reduce_equals_in_memory_aggregate(sales_files, distinct):
+    aggregate, summary = map_reduce_files(sales_files, workers=2, partitions=3, chunk_bytes=16 * 1024,
+                                          distinct=distinct)
+    expected, reports = batch(sales_files, distinct)
+    assert_same_aggregate(aggregate, expected)
+    assert summary['ranges'] > len(sales_files)
+    assert summary['invalid'] == sum(report['invalid'] for report in reports)
+    assert summary['valid'] == expected.transaction_count
+
+
+def test_map_step_puts_each_customer_in_one_partition(sales_files):
+    from utils_file_handler import plan_byte_ranges
+
+    encoding, ranges = plan_byte_ranges(sales_files[0], chunk_bytes=32 * 1024)
+    start, end = ranges[0]
+    aggregate, shards, report = map_byte_range(sales_files[0], start, end, encoding, 4)
+    assert aggregate.customers == {}
+    for partition, shard in shards.items():
+        assert all(partition_of(customer, 4) == partition for customer in shard.customers)
+    assert sum(len(shard.customers) for shard in shards.values()) > 0
+
+
+def test_worker_failure_raises(sales_files):
+    with pytest.raises(RuntimeError, match="worker failed"):
+        map_reduce_files(sales_files[:1], workers=2, distinct='bogus')
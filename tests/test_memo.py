@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+import utils_data_processor as processor
+from utils_file_handler import read_sales_data, parse_transactions, validate_batch
+from utils_memo import Memo, configure_memo, fingerprint, get_memo
+
+from conftest import write_sales_file
+
+LINES = [
+    "T001|2024-12-01|P101|Laptop|1|45000|C001|North",
+    "T002|2024-12-01|P102|Mouse|2|500|C002|South",
+    "T003|2024-12-02|P103|Keyboard|1|1500|C001|East",
+    "T004|2024-12-03|P104|Webcam|3|2500|C003|West",
+]
+
+
+@pytest.fixture
+def rows(tmp_path):
+    valid, report = validate_batch(parse_transactions(read_sales_data(write_sales_file(tmp_path / 's.txt', LINES))))
+    return valid
+
+
+@pytest.fixture
+def table(tmp_path):
+    return parse_transactions(read_sales_data(write_sales_file(tmp_path / 't.txt', LINES)), columnar=True)
+
+
+@pytest.fixture
+def memo():
+    return configure_memo(enabled=True)
+
+
+def test_memo_is_off_by_default(monkeypatch):
+    import utils_memo
+    monkeypatch.delenv('SALES_MEMO', raising=False)
+    monkeypatch.setattr(utils_memo, '_default_memo', None)
+    assert not get_memo().enabled
+
+
+@pytest.mark.parametrize('name', ['calculate_total_revenue', 'region_wise_sales', 'customer_analysis',
+                                  'daily_sales_trend', 'top_selling_products'])
+def test_hit_returns_the_uncached_result(memo, rows, name):
+    analysis = getattr(processor, name)
+    first = analysis(rows)
+    second = analysis(rows)
+    assert memo.hits == 1 and memo.misses == 1
+    assert first == second == analysis.uncached(rows)
+
+
+def test_hit_is_a_fresh_copy(memo, rows):
+    result = processor.region_wise_sales(rows)
+    result.clear()
+    assert processor.region_wise_sales(rows) != {}
+
+
+def test_mutated_or_appended_rows_are_recomputed(memo, rows):
+    assert processor.calculate_total_revenue(rows) == 55000.0
+    rows[1]['Quantity'] = 4
+    assert processor.calculate_total_revenue(rows) == 56000.0
+    rows.append(dict(rows[0], TransactionID='T005'))
+    assert processor.calculate_total_revenue(rows) == 101000.0
+    assert memo.hits == 0
+
+
+def test_table_fingerprint_follows_the_columns(table):
+    before, stable = fingerprint(table)
+    assert stable and before == fingerprint(table)[0]
+    table.columns['Quantity'][0] += 1
+    assert fingerprint(table)[0] != before
+    sliced = table.take(slice(0, 4, 2))  # strided view
+    assert fingerprint(sliced)[0] == fingerprint(sliced)[0]
+
+
+def test_list_fingerprint_tells_close_values_apart(rows):
+    other = [dict(row) for row in rows]
+    other[0]['UnitPrice'] = -1 if rows[0]['UnitPrice'] == -2 else rows[0]['UnitPrice'] + 1e-9
+    assert fingerprint(rows)[0] != fingerprint(other)[0]
+    assert fingerprint([{'TransactionID': 'T1'}]) == (None, False)
+
+
+def test_disk_tier_survives_a_new_memo(tmp_path, rows):
+    configure_memo(enabled=True, cache_dir=str(tmp_path / 'memo'))
+    expected = processor.customer_analysis(rows)
+    memo = configure_memo(enabled=True, cache_dir=str(tmp_path / 'memo'))  # like a new process
+    assert processor.customer_analysis(rows) == expected
+    assert (memo.disk_hits, memo.misses) == (1, 0)
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    memo = Memo(max_entries=2)
+    for key in 'abc':
+        memo.put(key, key * 10)
+    assert memo.get('a') == (False, None)
+    assert memo.get('c') == (True, 'cccccccccc')
+
+    memo = Memo(max_bytes=200)
+    memo.put('small', 'x' * 10)
+    memo.put('big', 'y' * 150)
+    assert memo.get('small')[0] and memo.get('big')[0]
+    memo.put('bigger', 'z' * 150)  # pushes the least recently used entries out
+    assert memo.get('bigger')[0] and not memo.get('small')[0]
+    memo.put('huge', 'h' * 1000)  # larger than the whole memo: never kept
+    assert not memo.get('huge')[0]
+    assert memo._memory.bytes <= 200
+
+
+def test_counters_are_exact_under_threads(rows):
+    memo = Memo()
+    memo.put('hit', 1)
+
+    def hammer():
+        for _ in range(2000):
+            memo.get('hit')
+            memo.get('miss')
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (memo.hits, memo.misses) == (16000, 16000)
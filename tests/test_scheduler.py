@@ -0,0 +1,65 @@
+import sys
+import time
+
+import pytest
+
+import utils_instrumentation
+from utils_instrumentation import Tracer
+from utils_scheduler import Stage, run_stages, exclusive_output, LineWriter
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = Tracer(enabled=True, memory=False)
+    monkeypatch.setattr(utils_instrumentation, '_tracer', tracer)
+    return tracer
+
+
+def test_stages_record_rows_in_and_out(tracer):
+    stages = [
+        Stage('read', lambda: list(range(10))),
+        Stage('keep_even', lambda rows: [row for row in rows if row % 2 == 0], ['read']),
+        Stage('save', lambda rows: 'out.txt', ['keep_even']),
+    ]
+    results = run_stages(stages)
+    assert results['keep_even'] == [0, 2, 4, 6, 8]
+    records = {record['name']: record for record in tracer.records}
+    assert (records['read']['rows_in'], records['read']['rows_out']) == (None, 10)
+    assert (records['keep_even']['rows_in'], records['keep_even']['rows_out']) == (10, 5)
+    assert (records['save']['rows_in'], records['save']['rows_out']) == (5, None)  # a file name is not rows
+
+
+def test_failed_stage_raises(tracer):
+    stages = [Stage('boom', lambda: 1 / 0), Stage('after', lambda value: value, ['boom'])]
+    with pytest.raises(RuntimeError, match="Stage boom failed"):
+        run_stages(stages)
+
+
+def test_stage_output_is_never_mixed_within_a_line(capsys):
+    def chatty(name):
+        def stage():
+            for n in range(20):
+                sys.stdout.write(f"{name} ")
+                time.sleep(0.001)
+                print(f"line {n}")
+        return stage
+    run_stages([Stage(name, chatty(name)) for name in 'abcd'], max_workers=4)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 80
+    assert all(line.split(' ')[1:] == ['line', line.split(' ')[-1]] for line in lines)
+
+
+def test_exclusive_output_keeps_a_prompt_together(capsys):
+    def prompt():
+        with exclusive_output():
+            sys.stdout.write("Question? ")
+            sys.stdout.flush()
+            time.sleep(0.05)  # the user thinking
+            print("answer")
+
+    def noisy():
+        time.sleep(0.01)
+        print("noise")
+    run_stages([Stage('prompt', prompt), Stage('noisy', noisy)], max_workers=2)
+    assert capsys.readouterr().out.splitlines() == ["Question? answer", "noise"]
+    assert not isinstance(sys.stdout, LineWriter)  # stdout is given back
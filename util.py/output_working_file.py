@@ -1,135 +1,279 @@
+import json
 import os
-import pandas as pd
-from collections import defaultdict # for aggregating data  
 from datetime import datetime
 from utils_file_handler import (
     read_sales_data,
     parse_transactions,
-    validate_and_filter
+    atomic_write
 )
-transactions = parse_transactions(read_sales_data('sales_data.txt'))
-enriched_transactions = []  # Assume this is populated elsewhere
+from utils_aggregator import SalesAggregate, aggregate_transactions
+from utils_topk import top_k
+from utils_dates import as_ordinal, ordinal_to_date, period_key, NO_DATE
 
-def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt'):
+
+# REPORT SNAPSHOT #
+
+# Aggregation and formatting are separate steps:
+# 1. build_report_snapshot() does the ONE aggregation pass and returns a plain JSON-serialisable snapshot,
+#    optionally with one partial aggregate per region or per month from that same pass
+# 2. render_sales_report() only formats a snapshot (or a SalesAggregate) and streams it to disk
+#    section by section, so any number of reports can be rendered without aggregating again
+#
+# Snapshot format:
+# {
+#     'overall': {...},                      # SalesAggregate.to_state()
+#     'enrichment': {'matched': 85, 'total': 92, 'unmatched_products': ['P110', ...]},
+#     'partition_by': 'region',              # None, 'region' or 'month'
+#     'partitions': {'North': {...}, ...}    # SalesAggregate.to_state() per partition
+# }
+
+PARTITIONS = ('region', 'month')
+
+
+def enrichment_summary(enriched_transactions):
+    # matched / total counts and the ProductIDs that could not be enriched (dicts or a TransactionTable)
+    if getattr(enriched_transactions, 'columnar', False):
+        matched = enriched_transactions.columns['API_Match']
+        return {
+            'matched': int(matched.sum()),
+            'total': len(enriched_transactions),
+            'unmatched_products': enriched_transactions.values('ProductID')[~matched].tolist(),
+        }
+    enriched_transactions = list(enriched_transactions or ())
+    return {
+        'matched': sum(1 for trx in enriched_transactions if trx.get("API_Match")),
+        'total': len(enriched_transactions),
+        'unmatched_products': [trx['ProductID'] for trx in enriched_transactions if not trx.get("API_Match")],
+    }
+
+
+def _partition_aggregates(transactions, partition_by, distinct):
+    # one pass: every transaction goes into the aggregate of its region / month
+    if getattr(transactions, 'columnar', False):
+        import numpy as np
+
+        if partition_by == 'region':
+            codes, names = transactions.codes('Region'), transactions.categories['Region']
+        else:
+            # month of each distinct day, spread to the rows through the inverse index
+            transactions = transactions.take(transactions.columns['Date'] != NO_DATE)  # no month for an invalid date
+            days, inverse = np.unique(transactions.columns['Date'], return_inverse=True)
+            months = [period_key(int(day), 'month') for day in days]
+            names = sorted(set(months))
+            month_codes = {month: code for code, month in enumerate(names)}
+            codes = np.asarray([month_codes[month] for month in months], dtype=np.int32)[inverse]
+        return {names[code]: aggregate_transactions(transactions.take(codes == code), distinct)
+                for code in np.unique(codes).tolist()}
+
+    partitions = {}
+    for trx in transactions:
+        try:
+            day = as_ordinal(trx.get('DateOrdinal') or trx['Date'])
+            if partition_by == 'region':
+                key = trx['Region']
+            elif day is None:
+                continue  # no month for an invalid date
+            else:
+                key = period_key(day, 'month')
+            aggregate = partitions.get(key)
+            if aggregate is None:
+                aggregate = partitions[key] = SalesAggregate(distinct)
+            aggregate.add(day, trx['ProductName'], trx['Quantity'], trx['UnitPrice'], trx['CustomerID'], trx['Region'])
+        except KeyError:  # Missing expected fields
+            continue
+    return partitions
+
+
+def build_report_snapshot(transactions, enriched_transactions=(), partition_by=None, distinct='exact'):
+    """
+    Runs the aggregation once and returns a snapshot that render_sales_report() can format any number of times.
+
+    partition_by='region' or 'month' also keeps one aggregate per partition; the overall aggregate
+    is then the merge of the partitions, so the data is still only scanned once.
+    """
+    if partition_by is not None and partition_by not in PARTITIONS:
+        raise ValueError(f"Unknown partition: {partition_by} (use 'region' or 'month')")
+
+    partitions = {}
+    if partition_by is None or isinstance(transactions, SalesAggregate):
+        overall = aggregate_transactions(transactions, distinct)
+    else:
+        partitions = _partition_aggregates(transactions, partition_by, distinct)
+        overall = SalesAggregate(distinct)
+        for aggregate in partitions.values():
+            overall.merge(aggregate)
+
+    return {
+        'overall': overall.to_state(),
+        'enrichment': enrichment_summary(enriched_transactions),
+        'partition_by': partition_by if partitions else None,
+        'partitions': {key: aggregate.to_state() for key, aggregate in sorted(partitions.items())},
+    }
+
+
+def save_report_snapshot(snapshot, filename):
+    with atomic_write(filename) as f:
+        json.dump(snapshot, f)
+    return filename
+
+
+def load_report_snapshot(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# REPORT RENDERING #
+
+def _report_sections(aggregate, enrichment, title=None):
+    # yields the report one section at a time; nothing here aggregates, it only reads the aggregate
+    # --- 1. HEADER ---
+    header = ["============================================\n",
+              "       SALES ANALYTICS REPORT\n"]
+    if title:
+        header.append(f"     {title}\n")
+    header += [f"     Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+               f"     Records Processed: {aggregate.transaction_count}\n",
+               "============================================\n\n"]
+    yield "".join(header)
+
+    # --- 2. OVERALL SUMMARY ---
+    total_revenue = aggregate.total_revenue
+    total_transactions = aggregate.transaction_count
+    avg_order_value = total_revenue / total_transactions if total_transactions else 0.0
+    date_range = f"{aggregate.min_date} to {aggregate.max_date}"  # formatted from the first/last day ordinals
+    yield ("OVERALL SUMMARY\n"
+           "--------------------------------------------\n"
+           f"Total Revenue:        ₹{total_revenue:,.2f}\n"
+           f"Total Transactions:   {total_transactions}\n"
+           f"Average Order Value:  ₹{avg_order_value:,.2f}\n"
+           f"Date Range:           {date_range}\n\n")
+
+    # --- 3. REGION-WISE PERFORMANCE ---
+    lines = ["REGION-WISE PERFORMANCE\n",
+             "--------------------------------------------\n",
+             f"{'Region':<10} {'Sales':<15} {'% of Total':<12} {'Transactions':<12}\n"]
+    region_data = aggregate.regions
+    for region, data in sorted(region_data.items(), key=lambda x: x[1]['sales'], reverse=True):
+        sales = data['sales']
+        percent_total = (sales / total_revenue * 100) if total_revenue else 0
+        transactions_count = data['transactions']
+        lines.append(f"{region:<10} ₹{sales:,.2f}   {percent_total:.2f}%     {transactions_count:<12}\n")
+    lines.append("\n")
+    yield "".join(lines)
+
+    # --- 4. TOP 5 PRODUCTS ---
+    lines = ["TOP 5 PRODUCTS\n",
+             "--------------------------------------------\n",
+             f"{'Rank':<6} {'Product Name':<25} {'Quantity Sold':<15} {'Revenue':<15}\n"]
+    product_data = aggregate.products
+    top_products = top_k(product_data.items(), 5, key=lambda x: x[1]['revenue'])
+    for rank, (product, data) in enumerate(top_products, start=1):
+        lines.append(f"{rank:<6} {product:<25} {data['quantity']:<15} ₹{data['revenue']:,.2f}\n")
+    lines.append("\n")
+    yield "".join(lines)
+
+    # --- 5. TOP 5 CUSTOMERS ---
+    lines = ["TOP 5 CUSTOMERS\n",
+             "--------------------------------------------\n",
+             f"{'Rank':<6} {'Customer ID':<15} {'Total Spent':<15} {'Order Count':<12}\n"]
+    top_customers = top_k(aggregate.customers.items(), 5, key=lambda x: x[1]['total_spent'])
+    for rank, (customer, data) in enumerate(top_customers, start=1):
+        lines.append(f"{rank:<6} {customer:<15} ₹{data['total_spent']:,.2f}   {data['order_count']:<12}\n")
+    lines.append("\n")
+    yield "".join(lines)
+
+    # --- 6. DAILY SALES TREND ---
+    lines = ["DAILY SALES TREND\n",
+             "--------------------------------------------\n",
+             f"{'Date':<12} {'Revenue':<15} {'Transactions':<15} {'Unique Customers':<18}\n"]
+    daily_data = aggregate.days
+    for day, data in sorted(daily_data.items()):  # integer day ordinals, formatted only here
+        lines.append(f"{ordinal_to_date(day):<12} ₹{data['revenue']:,.2f}   {data['transactions']:<15} {len(data['customers']):<18}\n")
+    lines.append("\n")
+    yield "".join(lines)
+
+    # --- 7. PRODUCT PERFORMANCE ANALYSIS ---
+    lines = ["PRODUCT PERFORMANCE ANALYSIS\n",
+             "--------------------------------------------\n"]
+    # Best selling day
+    if daily_data:
+        best_day = max(daily_data.items(), key=lambda x: x[1]['revenue'])[0]
+        best_selling_day, best_selling_day_revenue = ordinal_to_date(best_day), daily_data[best_day]['revenue']
+    else:
+        best_selling_day, best_selling_day_revenue = None, 0.0
+    # Low performing products
+    low_performing_products = [product for product, data
+                                in product_data.items() if data['revenue'] < 1000]
+    lines.append(f"Best Selling Day: {best_selling_day} with Revenue ₹{best_selling_day_revenue:,.2f}\n")
+    lines.append("Low Performing Products:\n")
+    for product in low_performing_products:
+        lines.append(f"- {product}\n")
+    lines.append("\n")
+    # Average transaction value per region
+    lines.append("Average Transaction Value per Region:\n")
+    for region, data in region_data.items():
+        avg_value = data['sales'] / data['transactions'] if data['transactions'] > 0 else 0
+        lines.append(f"- {region}: ₹{avg_value:,.2f}\n")
+    lines.append("\n")
+    yield "".join(lines)
+
+    # --- 8. API ENRICHMENT SUMMARY ---
+    total_enriched, total = enrichment['matched'], enrichment['total']
+    success_rate = (total_enriched / total * 100) if total else 0
+    lines = ["API ENRICHMENT SUMMARY\n",
+             "--------------------------------------------\n",
+             f"Total Products Enriched: {total_enriched}\n",
+             f"Success Rate: {success_rate:.2f}%\n",
+             "Products that couldn't be enriched:\n"]
+    for product in enrichment['unmatched_products']:
+        lines.append(f"- {product}\n")
+    yield "".join(lines)
+
+
+def render_sales_report(snapshot, output_file='output/sales_report.txt', partition=None):
+    """
+    Formats a report snapshot (or a SalesAggregate) into output_file - no aggregation happens here.
+    partition picks one partition of a partitioned snapshot, e.g. 'North' or '2024-12'.
+    """
+    if isinstance(snapshot, SalesAggregate):
+        snapshot = {'overall': snapshot, 'enrichment': enrichment_summary(()), 'partitions': {}}
+    title = None
+    if partition is None:
+        aggregate = snapshot['overall']
+    else:
+        aggregate = snapshot['partitions'][partition]
+        title = f"{snapshot['partition_by'].title()}: {partition}"
+    if not isinstance(aggregate, SalesAggregate):
+        aggregate = SalesAggregate.from_state(aggregate)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
     with open(output_file, 'w', encoding='utf-8') as f:
-        # --- 1. HEADER ---
-        f.write("============================================\n")
-        f.write("       SALES ANALYTICS REPORT\n")
-        f.write(f"     Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"     Records Processed: {len(transactions)}\n")
-        f.write("============================================\n\n")
-
-        # --- 2. OVERALL SUMMARY ---
-        f.write("OVERALL SUMMARY\n")
-        f.write("--------------------------------------------\n")
-        total_revenue = sum(trx['Quantity'] * trx['UnitPrice'] for trx in transactions)
-        total_transactions = len(transactions)
-        avg_order_value = total_revenue / total_transactions
-        date_format = "%Y-%m-%d"
-        dates = [datetime.strptime(trx['Date'], date_format) for trx in transactions]
-        date_range = f"{min(dates).strftime(date_format)} to {max(dates).strftime(date_format)}"
-        f.write(f"Total Revenue:        ₹{total_revenue:,.2f}\n")
-        f.write(f"Total Transactions:   {total_transactions}\n")
-        f.write(f"Average Order Value:  ₹{avg_order_value:,.2f}\n")
-        f.write(f"Date Range:           {date_range}\n\n")
-        # --- 3. REGION-WISE PERFORMANCE ---
-        f.write("REGION-WISE PERFORMANCE\n")
-        f.write("--------------------------------------------\n")
-        f.write(f"{'Region':<10} {'Sales':<15} {'% of Total':<12} {'Transactions':<12}\n")
-        region_data = defaultdict(lambda: {'sales': 0, 'transactions': 0})
-        for trx in transactions:
-            region = trx['Region']
-            amount = trx['Quantity'] * trx['UnitPrice']
-            region_data[region]['sales'] += amount
-            region_data[region]['transactions'] += 1
-        for region, data in sorted(region_data.items(), key=lambda x: x[1]['sales'], reverse=True):
-            sales = data['sales']
-            percent_total = (sales / total_revenue * 100)
-            transactions_count = data['transactions']
-            f.write(f"{region:<10} ₹{sales:,.2f}   {percent_total:.2f}%     {transactions_count:<12}\n")
-        f.write("\n")
-        # --- 4. TOP 5 PRODUCTS ---
-        f.write("TOP 5 PRODUCTS\n")
-        f.write("--------------------------------------------\n")
-        f.write(f"{'Rank':<6} {'Product Name':<25} {'Quantity Sold':<15} {'Revenue':<15}\n")
-        product_data = defaultdict(lambda: {'quantity': 0, 'revenue': 0})
-        for trx in transactions:
-            product_name = trx['ProductName']
-            quantity = trx['Quantity']
-            amount = trx['Quantity'] * trx['UnitPrice']
-            product_data[product_name]['quantity'] += quantity
-            product_data[product_name]['revenue'] += amount
-        top_products = sorted(product_data.items(), key=lambda x: x[1]['revenue'], reverse=True)[:5]
-        for rank, (product, data) in enumerate(top_products, start=1):
-            f.write(f"{rank:<6} {product:<25} {data['quantity']:<15} ₹{data['revenue']:,.2f}\n")
-        f.write("\n")
-        # --- 5. TOP 5 CUSTOMERS ---
-        f.write("TOP 5 CUSTOMERS\n")
-        f.write("--------------------------------------------\n")
-        f.write(f"{'Rank':<6} {'Customer ID':<15} {'Total Spent':<15} {'Order Count':<12}\n")
-        customer_data = defaultdict(lambda: {'total_spent': 0, 'order_count': 0})
-        for trx in transactions:
-            customer_id = trx['CustomerID']
-            amount = trx['Quantity'] * trx['UnitPrice']
-            customer_data[customer_id]['total_spent'] += amount
-            customer_data[customer_id]['order_count'] += 1
-        top_customers = sorted(customer_data.items(), key=lambda x: x[1]['total_spent'], reverse=True)[:5]
-        for rank, (customer, data) in enumerate(top_customers, start=1):
-            f.write(f"{rank:<6} {customer:<15} ₹{data['total_spent']:,.2f}   {data['order_count']:<12}\n")
-        f.write("\n")
-        # --- 6. DAILY SALES TREND ---
-        f.write("DAILY SALES TREND\n")
-        f.write("--------------------------------------------\n")
-        f.write(f"{'Date':<12} {'Revenue':<15} {'Transactions':<15} {'Unique Customers':<18}\n")
-        daily_data = defaultdict(lambda: {'revenue': 0, 'transactions': 0, 'unique_customers': set()})
-        for trx in transactions:
-            date = datetime.strptime(trx['Date'], "%Y-%m-%d").date()
-            amount = trx['Quantity'] * trx['UnitPrice']
-            daily_data[date]['revenue'] += amount
-            daily_data[date]['transactions'] += 1
-            daily_data[date]['unique_customers'].add(trx['CustomerID'])
-        for date, data in sorted(daily_data.items()):
-            f.write(f"{date:<12} ₹{data['revenue']:,.2f}   {data['transactions']:<15} {len(data['unique_customers']):<18}\n")
-        f.write("\n")
-        # --- 7. PRODUCT PERFORMANCE ANALYSIS ---
-        f.write("PRODUCT PERFORMANCE ANALYSIS\n")
-        f.write("--------------------------------------------\n")
-        # Best selling day
-        best_selling_day = max(daily_data.items(), key=lambda x: x[1
-]['revenue'])[0]
-        best_selling_day_revenue = daily_data[best_selling_day]['revenue']
-        # Low performing products
-        low_performing_products = [product for product, data
-                                    in product_data.items() if data['revenue'] < 1000]
-        # Average transaction value per region
-        avg_transaction_value_per_region = {}
-        for region, data in region_data.items():
-            avg_value = data['sales'] / data['transactions'] if data['transactions'] > 0 else 0
-            avg_transaction_value_per_region[region] = avg_value
-        f.write(f"Best Selling Day: {best_selling_day} with Revenue ₹{best_selling_day_revenue:,.2f}\n")
-        f.write("Low Performing Products:\n")
-        for product in low_performing_products:
-            f.write(f"- {product}\n")
-        f.write("\n")
-        f.write("Average Transaction Value per Region:\n")
-        for region, avg_value in avg_transaction_value_per_region.items():
-            f.write(f"- {region}: ₹{avg_value:,.2f}\n")
-        f.write("\n")
-        # --- 8. API ENRICHMENT SUMMARY ---
-        f.write("API ENRICHMENT SUMMARY\n")
-        f.write("--------------------------------------------\n")
-        total_enriched = sum(1 for trx in enriched_transactions if trx.get("API_Match"))
-        success_rate = (total_enriched / len(enriched_transactions) * 100) if enriched_transactions else 0
-        unenriched_products = [trx['ProductID'] for trx in enriched_transactions if not trx.get("API_Match")]
-        f.write(f"Total Products Enriched: {total_enriched}\n")
-        f.write(f"Success Rate: {success_rate:.2f}%\n")
-        f.write("Products that couldn't be enriched:\n")
-        for product in unenriched_products:
-            f.write(f"- {product}\n")
+        for section in _report_sections(aggregate, snapshot['enrichment'], title):
+            f.write(section)  # each section goes to disk as soon as it is formatted
     print("Sales report generated at", output_file)
-    return None
-print(generate_sales_report(transactions, enriched_transactions))
+    return output_file
+
 
+def render_partition_reports(snapshot, output_dir='output', prefix='sales_report'):
+    """
+    Renders the overall report plus one report per partition of the snapshot.
+    Returns the list of files written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = [render_sales_report(snapshot, os.path.join(output_dir, f"{prefix}.txt"))]
+    for partition in snapshot['partitions']:
+        safe_name = "".join(c if c.isalnum() or c in '-_' else '_' for c in partition) or 'blank'
+        written.append(render_sales_report(snapshot, os.path.join(output_dir, f"{prefix}_{safe_name}.txt"), partition))
+    return written
+
+
+def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt', distinct='exact'):
+    # every number in the report comes from ONE aggregation pass (transactions may already be a SalesAggregate)
+    # distinct='hll' estimates the daily unique customers with HyperLogLog instead of keeping every id
+    aggregate = aggregate_transactions(transactions, distinct)
+    snapshot = {'overall': aggregate, 'enrichment': enrichment_summary(enriched_transactions), 'partitions': {}}
+    render_sales_report(snapshot, output_file)
+    return None
 
 
 # def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt'):
@@ -214,7 +358,6 @@ print(generate_sales_report(transactions, enriched_transactions))
 # # def generate_sales_report(transactions, enriched_transactions, output_file='output/sales_report.txt
 
 
-    
     # # Generates a comprehensive formatted text report
 
 
@@ -281,3 +424,14 @@ print(generate_sales_report(transactions, enriched_transactions))
     # (continue with all sections...)
     # """
 
+
+if __name__ == "__main__":
+    transactions = parse_transactions(read_sales_data('sales_data.txt'))
+    enriched_transactions = []  # Assume this is populated elsewhere
+
+    print(generate_sales_report(transactions, enriched_transactions))
+
+    # one aggregation pass, then one report per region from the saved snapshot
+    snapshot = build_report_snapshot(transactions, enriched_transactions, partition_by='region')
+    save_report_snapshot(snapshot, 'output/report_snapshot.json')
+    print(render_partition_reports(load_report_snapshot('output/report_snapshot.json'), 'output'))
@@ -0,0 +1,240 @@
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from utils_file_handler import read_sales_data, parse_transactions, validate_and_filter, FilterIndex
+from utils_aggregator import aggregate_transactions
+from utils_api_handler import fetch_all_products, create_product_mapping, enrich_sales_columns
+from output_working_file import enrichment_summary
+from utils_lru import LRUCache
+import utils_data_processor as processor
+
+# ANALYTICS QUERY DAEMON #
+
+# Every script run re-reads, re-parses and re-enriches the file before it can answer anything.
+# The daemon does that ONCE, keeps the dataset in memory and answers the analyses over HTTP/JSON:
+#
+#   GET  /region_wise_sales?region=North&min_amount=1000&max_amount=50000
+#   GET  /top_selling_products?n=10            GET /customer_analysis?limit=20
+#   GET  /daily_sales_trend                    GET /find_peak_sales_day
+#   GET  /calculate_total_revenue              GET /low_performing_products?threshold=10
+#   GET  /enrichment                           GET /status
+#   POST /reload                               (re-reads the file and the catalog, clears the caches)
+#
+# region / min_amount / max_amount work on every analysis (filtered variants).
+# - the unfiltered aggregate is computed at load time; a filtered one is a FilterIndex bisect
+#   plus one aggregation pass, and is kept in a small LRU
+# - every answer is cached as ready-to-send JSON bytes, so a repeated query is a dict lookup
+# - cache keys carry the dataset generation, and /reload swaps in a fully loaded dataset before
+#   clearing the caches, so queries keep being answered (from the old data) while it reloads
+#
+# usage: python sales_daemon.py [sales file] [--host 127.0.0.1] [--port 8600]
+
+DEFAULT_PORT = 8600
+RESULT_CACHE_SIZE = 1024
+AGGREGATE_CACHE_SIZE = 64
+
+
+def _number(params, name, convert=float, default=None):
+    value = params.get(name)
+    return convert(value.replace(',', '')) if value else default
+
+
+# analysis name -> function(aggregate, query params)
+QUERIES = {
+    'calculate_total_revenue': lambda aggregate, params: processor.calculate_total_revenue(aggregate),
+    'region_wise_sales': lambda aggregate, params: processor.region_wise_sales(aggregate),
+    'top_selling_products': lambda aggregate, params: processor.top_selling_products(
+        aggregate, n=_number(params, 'n', int, 5)),
+    'customer_analysis': lambda aggregate, params: dict(list(processor.customer_analysis(aggregate).items())
+                                                        [:_number(params, 'limit', int)]),
+    'daily_sales_trend': lambda aggregate, params: processor.daily_sales_trend(aggregate),
+    'find_peak_sales_day': lambda aggregate, params: processor.find_peak_sales_day(aggregate),
+    'low_performing_products': lambda aggregate, params: processor.low_performing_products(
+        aggregate, threshold=_number(params, 'threshold', int, 10)),
+}
+FILTERS = ('region', 'min_amount', 'max_amount')
+
+
+class UnknownQuery(Exception):
+    # raised for a query name that is neither in QUERIES nor 'enrichment' (-> 404); any other
+    # KeyError is a bug in an analysis and must come back as a 500
+    pass
+
+
+class SalesDataset:
+    """
+    The parsed, validated and enriched sales file, held in memory (as TransactionTables).
+    """
+
+    def __init__(self, sales_file, enrich=True):
+        started = time.perf_counter()
+        self.sales_file = sales_file
+        table = parse_transactions(read_sales_data(sales_file), columnar=True)
+        self.index = FilterIndex(table)  # validated once; every filtered query is a bisect + slice
+        self.valid, self.invalid_count, summary = validate_and_filter(table, index=self.index)
+        self.aggregate = aggregate_transactions(self.valid)
+        self.enriched = None
+        if enrich:
+            mapping = create_product_mapping(fetch_all_products())
+            self.enriched = self.valid.with_columns(*enrich_sales_columns(self.valid, mapping))
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        self.load_seconds = round(time.perf_counter() - started, 3)
+
+    def filtered_aggregate(self, region=None, min_amount=None, max_amount=None):
+        transactions, invalid_count, summary = validate_and_filter(
+            self.index.transactions, region, min_amount, max_amount, index=self.index)
+        return aggregate_transactions(transactions)
+
+
+class QueryService:
+    """
+    Answers the analyses from the current SalesDataset, with the result and aggregate caches.
+    """
+
+    def __init__(self, sales_file, enrich=True):
+        self.sales_file = sales_file
+        self.enrich = enrich
+        self.results = LRUCache(RESULT_CACHE_SIZE)
+        self.aggregates = LRUCache(AGGREGATE_CACHE_SIZE)
+        self._reload_lock = threading.Lock()
+        self.current = (None, 0)  # (dataset, generation), swapped as one tuple so a reader never mixes them
+        self.reload()
+
+    def reload(self):
+        # load next to the old dataset, then swap; concurrent reloads are serialized
+        with self._reload_lock:
+            dataset = SalesDataset(self.sales_file, self.enrich)
+            self.current = (dataset, self.current[1] + 1)
+            self.results.clear()
+            self.aggregates.clear()
+        return self.status()
+
+    def status(self):
+        dataset, generation = self.current
+        return {
+            'sales_file': str(dataset.sales_file),
+            'generation': generation,
+            'loaded_at': dataset.loaded_at,
+            'load_seconds': dataset.load_seconds,
+            'valid': len(dataset.valid),
+            'invalid': dataset.invalid_count,
+            'regions': dataset.index.regions(),
+            'cache': {'results': len(self.results), 'hits': self.results.hits, 'misses': self.results.misses},
+        }
+
+    def _aggregate(self, dataset, generation, criteria):
+        if not any(criteria):
+            return dataset.aggregate
+        key = (generation, criteria)
+        aggregate = self.aggregates.get(key)
+        if aggregate is None:
+            aggregate = dataset.filtered_aggregate(*criteria)
+            self.aggregates.put(key, aggregate)
+        return aggregate
+
+    def query(self, name, params):
+        """
+        Returns the JSON bytes answering analysis `name` with the given query params.
+        Raises UnknownQuery for an unknown analysis and ValueError for a bad parameter.
+        """
+        if name not in QUERIES and name != 'enrichment':
+            raise UnknownQuery(name)
+        dataset, generation = self.current  # one consistent snapshot per request
+        key = (generation, name, tuple(sorted(params.items())))
+        body = self.results.get(key)
+        if body is not None:
+            return body
+        if name == 'enrichment':
+            result = enrichment_summary(dataset.enriched if dataset.enriched is not None else ())
+        else:
+            query = QUERIES[name]
+            criteria = (params.get('region') or None, _number(params, 'min_amount'), _number(params, 'max_amount'))
+            result = query(self._aggregate(dataset, generation, criteria), params)
+        body = json.dumps(result).encode('utf-8')
+        self.results.put(key, body)
+        return body
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    service = None  # set by make_server()
+    verbose = False
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({'error': message}).encode('utf-8'))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = url.path.strip('/')
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if name == 'status':
+            return self._send(200, json.dumps(self.service.status()).encode('utf-8'))
+        try:
+            self._send(200, self.service.query(name, params))
+        except UnknownQuery:
+            self._error(404, f"Unknown query '{name}' (available: {', '.join(list(QUERIES) + ['enrichment'])})")
+        except ValueError as e:
+            self._error(400, f"Bad parameter: {e}")
+        except Exception as e:
+            self._error(500, str(e))
+
+    def do_POST(self):
+        if urlsplit(self.path).path.strip('/') != 'reload':
+            return self._error(404, "Only POST /reload is supported")
+        try:
+            self._send(200, json.dumps(self.service.reload()).encode('utf-8'))
+        except Exception as e:
+            self._error(500, f"Reload failed, still serving the previous data: {e}")
+
+    def log_message(self, format, *args):
+        # the default handler logs every request to stderr, which costs more than a cached answer
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(sales_file, host='127.0.0.1', port=DEFAULT_PORT, enrich=True, verbose=False):
+    """
+    Loads the dataset and returns a ThreadingHTTPServer ready to serve_forever().
+    """
+    service = QueryService(sales_file, enrich)
+    handler = type('BoundQueryHandler', (QueryHandler,), {'service': service, 'verbose': verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(sales_file, host='127.0.0.1', port=DEFAULT_PORT, enrich=True, verbose=False):
+    server = make_server(sales_file, host, port, enrich, verbose)
+    status = server.service.status()
+    print(f"Loaded {status['valid']} valid transactions in {status['load_seconds']}s")
+    print(f"Serving sales analytics on http://{host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the sales analyses over HTTP/JSON from memory")
+    parser.add_argument('sales_file', nargs='?', default='sales_data.txt')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--no-enrich', action='store_true', help="don't fetch the product catalog")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+    serve(args.sales_file, args.host, args.port, not args.no_enrich, args.verbose)
@@ -0,0 +1,265 @@
+from utils_dates import as_ordinal, ordinal_to_date, date_to_ordinal, NO_DATE
+from utils_distinct import (DEFAULT_PRECISION, new_distinct_counter, is_distinct_counter,
+                            counter_to_state, counter_from_state, register_of, hash_item, HyperLogLog)
+
+# SINGLE-PASS AGGREGATION ENGINE #
+
+# Every analysis and the report need the same few group-bys (region, product, customer, day).
+# aggregate_transactions() computes all of them in ONE scan into a SalesAggregate,
+# and utils_data_processor / generate_sales_report only read from it afterwards.
+
+
+class SalesAggregate:
+    """
+    Result of one aggregation pass over the transactions.
+
+    regions:   {region: {'sales': float, 'transactions': int}}
+    products:  {product_name: {'quantity': int, 'revenue': float}}
+    customers: {customer_id: {'total_spent': float, 'order_count': int, 'products': set of product names}}
+    days:      {day ordinal: {'revenue': float, 'transactions': int, 'customers': distinct counter of customer ids}}
+
+    Days are integer ordinals (see utils_dates); min_date / max_date give the range as 'YYYY-MM-DD'.
+
+    distinct picks the per-day customer counter: 'exact' (a set) or 'hll' (HyperLogLog with 2**precision registers).
+    """
+
+    def __init__(self, distinct='exact', precision=DEFAULT_PRECISION):
+        self.distinct = distinct
+        self.precision = precision
+        self.transaction_count = 0
+        self.total_revenue = 0.0
+        self.first_day = None  # day ordinals
+        self.last_day = None
+        self.regions = {}
+        self.products = {}
+        self.customers = {}
+        self.days = {}
+
+    def __repr__(self):
+        return f"SalesAggregate({self.transaction_count} transactions, revenue {self.total_revenue:,.2f})"
+
+    @property
+    def min_date(self):
+        return None if self.first_day is None else ordinal_to_date(self.first_day)
+
+    @property
+    def max_date(self):
+        return None if self.last_day is None else ordinal_to_date(self.last_day)
+
+    def add(self, transaction_date, product_name, quantity, unit_price, customer_id, region):
+        # fold one transaction into every aggregate at once
+        # transaction_date is a day ordinal ('YYYY-MM-DD' also works; an invalid date only skips the day stats)
+        amount = quantity * unit_price
+        self.transaction_count += 1
+        self.total_revenue += amount
+
+        region_stats = self.regions.get(region)
+        if region_stats is None:
+            region_stats = self.regions[region] = {'sales': 0.0, 'transactions': 0}
+        region_stats['sales'] += amount
+        region_stats['transactions'] += 1
+
+        product_stats = self.products.get(product_name)
+        if product_stats is None:
+            product_stats = self.products[product_name] = {'quantity': 0, 'revenue': 0.0}
+        product_stats['quantity'] += quantity
+        product_stats['revenue'] += amount
+
+        customer_stats = self.customers.get(customer_id)
+        if customer_stats is None:
+            customer_stats = self.customers[customer_id] = {'total_spent': 0.0, 'order_count': 0, 'products': set()}
+        customer_stats['total_spent'] += amount
+        customer_stats['order_count'] += 1
+        customer_stats['products'].add(product_name)
+
+        day = transaction_date if isinstance(transaction_date, int) else as_ordinal(transaction_date)
+        if day is None:
+            return
+        if self.first_day is None or day < self.first_day:
+            self.first_day = day
+        if self.last_day is None or day > self.last_day:
+            self.last_day = day
+        day_stats = self.days.get(day)
+        if day_stats is None:
+            day_stats = self.days[day] = {
+                'revenue': 0.0, 'transactions': 0, 'customers': new_distinct_counter(self.distinct, self.precision)}
+        day_stats['revenue'] += amount
+        day_stats['transactions'] += 1
+        day_stats['customers'].add(customer_id)
+
+    def merge(self, other):
+        """
+        Folds another SalesAggregate into this one (sums and set/counter unions), so partial
+        aggregates of different parts of the data can be combined. Returns self.
+        Both must use the same kind of distinct counter.
+        """
+        self.transaction_count += other.transaction_count
+        self.total_revenue += other.total_revenue
+        if other.first_day is not None and (self.first_day is None or other.first_day < self.first_day):
+            self.first_day = other.first_day
+        if other.last_day is not None and (self.last_day is None or other.last_day > self.last_day):
+            self.last_day = other.last_day
+
+        for groups, other_groups in ((self.regions, other.regions), (self.products, other.products),
+                                     (self.customers, other.customers), (self.days, other.days)):
+            for key, other_stats in other_groups.items():
+                stats = groups.get(key)
+                if stats is None:
+                    # copy so the two aggregates never share mutable sets/counters
+                    groups[key] = {name: value.copy() if is_distinct_counter(value) else value
+                                   for name, value in other_stats.items()}
+                    continue
+                for name, value in other_stats.items():
+                    if is_distinct_counter(value):
+                        stats[name] |= value
+                    else:
+                        stats[name] += value
+        return self
+
+    def to_state(self):
+        # plain JSON-serialisable dict (sets become sorted lists, HyperLogLogs their registers,
+        # day ordinals 'YYYY-MM-DD' keys so the state stays readable)
+        def plain(groups):
+            return {key: {name: counter_to_state(value) if is_distinct_counter(value) else value
+                          for name, value in stats.items()}
+                    for key, stats in groups.items()}
+
+        return {
+            'distinct': self.distinct,
+            'precision': self.precision,
+            'transaction_count': self.transaction_count,
+            'total_revenue': self.total_revenue,
+            'min_date': self.min_date,
+            'max_date': self.max_date,
+            'regions': plain(self.regions),
+            'products': plain(self.products),
+            'customers': plain(self.customers),
+            'days': plain({ordinal_to_date(day): stats for day, stats in self.days.items()}),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        # inverse of to_state()
+        def restore(groups):
+            return {key: {name: counter_from_state(value) if isinstance(value, (list, dict)) else value
+                          for name, value in stats.items()}
+                    for key, stats in groups.items()}
+
+        aggregate = cls(state.get('distinct', 'exact'), state.get('precision', DEFAULT_PRECISION))
+        aggregate.transaction_count = state['transaction_count']
+        aggregate.total_revenue = state['total_revenue']
+        aggregate.first_day = as_ordinal(state['min_date'])
+        aggregate.last_day = as_ordinal(state['max_date'])
+        aggregate.regions = restore(state['regions'])
+        aggregate.products = restore(state['products'])
+        aggregate.customers = restore(state['customers'])
+        aggregate.days = {date_to_ordinal(day): stats for day, stats in restore(state['days']).items()}
+        return aggregate
+
+
+def aggregate_transactions(transactions, distinct='exact', precision=DEFAULT_PRECISION):
+    """
+    Computes every region, product, customer and day aggregate in a single pass.
+
+    Accepts a list of transaction dicts, a TransactionTable, or an existing SalesAggregate
+    (returned as is, so callers can always pass whatever they already have).
+    distinct / precision choose the unique-customers-per-day counter (see utils_distinct).
+    """
+    if isinstance(transactions, SalesAggregate):
+        return transactions
+    if getattr(transactions, 'columnar', False):
+        return _aggregate_table(transactions, distinct, precision)
+
+    aggregate = SalesAggregate(distinct, precision)
+    add = aggregate.add
+    for trx in transactions:
+        try:
+            # parse_transactions() already converted the date; older dicts only have the string
+            day = trx.get('DateOrdinal') or trx['Date']
+            add(day, trx['ProductName'], trx['Quantity'], trx['UnitPrice'], trx['CustomerID'], trx['Region'])
+        except KeyError:  # Missing expected fields
+            continue
+    return aggregate
+
+
+def _aggregate_table(table, distinct='exact', precision=DEFAULT_PRECISION):
+    # vectorized version for a TransactionTable: one bincount per measure and group
+    import numpy as np
+
+    aggregate = SalesAggregate(distinct, precision)
+    n = len(table)
+    if n == 0:
+        return aggregate
+
+    amount = table.amount
+    quantity = table.columns['Quantity']
+    aggregate.transaction_count = n
+    aggregate.total_revenue = float(amount.sum())
+
+    def group(codes, size):
+        # rows per group and revenue per group
+        return np.bincount(codes, minlength=size), np.bincount(codes, weights=amount, minlength=size)
+
+    # regions and products, in first-seen order like the dict path
+    regions = table.categories['Region']
+    counts, sales = group(table.codes('Region'), len(regions))
+    for code in np.flatnonzero(counts):
+        aggregate.regions[regions[code]] = {'sales': float(sales[code]), 'transactions': int(counts[code])}
+
+    names = table.categories['ProductName']
+    name_codes = table.codes('ProductName')
+    counts, revenue = group(name_codes, len(names))
+    product_quantity = np.bincount(name_codes, weights=quantity, minlength=len(names))
+    for code in np.flatnonzero(counts):
+        aggregate.products[names[code]] = {'quantity': int(product_quantity[code]), 'revenue': float(revenue[code])}
+
+    # customers, with the distinct products from the unique (customer, product) pairs
+    customers = table.categories['CustomerID']
+    customer_codes = table.codes('CustomerID')
+    counts, spent = group(customer_codes, len(customers))
+    pairs = np.unique(customer_codes.astype(np.int64) * len(names) + name_codes)
+    bounds = np.searchsorted(pairs // len(names), np.arange(len(customers) + 1))
+    pair_products = pairs % len(names)
+    for code in np.flatnonzero(counts):
+        aggregate.customers[customers[code]] = {
+            'total_spent': float(spent[code]),
+            'order_count': int(counts[code]),
+            'products': {names[p] for p in pair_products[bounds[code]:bounds[code + 1]]}
+        }
+
+    # days: ordinals shifted to 0-based offsets so they can be bincount buckets;
+    # rows without a valid date (NO_DATE) only miss the day stats, as in SalesAggregate.add()
+    dated = table.columns['Date'] != NO_DATE
+    if not dated.any():
+        return aggregate
+    ordinals = table.columns['Date'][dated]
+    day_customer_codes = customer_codes[dated]
+    first_day = int(ordinals.min())
+    offsets = ordinals - first_day
+    n_days = int(offsets.max()) + 1
+    counts = np.bincount(offsets, minlength=n_days)
+    day_revenue = np.bincount(offsets, weights=amount[dated], minlength=n_days)
+    pairs = np.unique(offsets.astype(np.int64) * len(customers) + day_customer_codes)
+    bounds = np.searchsorted(pairs // len(customers), np.arange(n_days + 1))
+    pair_customers = pairs % len(customers)
+    if distinct == 'hll':
+        # hash every customer once, then each day's registers are one np.maximum.at over its customers
+        slots = np.array([register_of(hash_item(c), precision) for c in customers], dtype=np.int64).reshape(-1, 2)
+    for offset in np.flatnonzero(counts):
+        day = first_day + int(offset)
+        day_customers = pair_customers[bounds[offset]:bounds[offset + 1]]
+        if distinct == 'hll':
+            registers = np.zeros(1 << precision, dtype=np.uint8)
+            np.maximum.at(registers, slots[day_customers, 0], slots[day_customers, 1].astype(np.uint8))
+            unique_customers = HyperLogLog(precision, registers.tobytes())
+        else:
+            unique_customers = new_distinct_counter(distinct, precision)
+            unique_customers.update(customers[c] for c in day_customers)
+        aggregate.days[day] = {
+            'revenue': float(day_revenue[offset]),
+            'transactions': int(counts[offset]),
+            'customers': unique_customers
+        }
+    aggregate.first_day = min(aggregate.days)
+    aggregate.last_day = max(aggregate.days)
+    return aggregate
@@ -1,131 +1,182 @@
-import pandas as pd
 import os
-import sys
-from pathlib import Path
+import threading
+import time
 
 from utils_file_handler import (
     read_sales_data,
     parse_transactions,
-    validate_and_filter
+    write_enriched_data
 )
-transactions = parse_transactions(read_sales_data('sales_data.txt'))
-
-
-import requests # to make API requests
-
-# GET ALL PRODUCTS 
-response = requests.get('https://dummyjson.com/products') # make GET request to API endpoint
-data = response.json()
-# data['products'] contains list of all products
-# data['total'] gives total count
-
-
-
-# GET A SINGLE PRODUCT BY ID
-# example pdt id 1:
-response = requests.get('https://dummyjson.com/products/1')
-product = response.json()
-# Returns single product object
-# product['id'], product['title'], product['price'], etc. can be accessed
-# Example: print product title and price
-print(f"Product: {product['title']}, Price: Rs {product['price']}")
-# You can integrate this API data with your sales transactions as needed
-
-# example pdt id 5:
-response = requests.get('https://dummyjson.com/products/5')
-product = response.json()
-print(f"Product: {product['title']}, Price: Rs {product['price']}")
-
-# GET SPECIFIC NUMBETR OF PRODUCTS
-
-response = requests.get('https://dummyjson.com/products?limit=100')
-data = response.json()
-# data['products'] contains list of products limited to 100
-# data['total'] gives total count
-# Example: print total number of products fetched
-print(f"Total Products Fetched: {len(data['products'])}")
-
-# You can further process this data as per your requirements
-
-# SEARCH PRODUCTS
-response = requests.get('https://dummyjson.com/products/search?q=phone')
-
-data = response.json()
-# data['products'] contains list of products matching search query 'phone'  
-# Example: print titles of matching products
-for product in data['products']:
-    print (f"""id: {product['id']}, Title: {product['title']},description : {product['description']},Price: Rs {product['price']}, 
-        category: {product['category']}, brand: {product['brand']}, rating: {product['rating']}, stock: {product['stock']}""")
-# You can modify the search query as needed
-# You can integrate this search functionality into your application as required
-# THIS CAN ALSO BE REPRESENTED AS: individual F single product object
-
-    print (
-        f"id: {product['id']}", 
-        f"Title: {product['title']}",
-        f"description : {product['description']}",
-        f"Price: Rs {product['price']}", 
-        f"category: {product['category']}", 
-        f"brand: {product['brand']}", 
-        f"rating: {product['rating']}", 
-        f"stock: {product['stock']}"
-        )
-#   "id": 1,
-#   "title": "iPhone 9",
-#   "description": "An apple mobile...",
-#   "price": 549,
-#   "category": "smartphones",
-#   "brand": "Apple",
-#   "rating": 4.69,
-#   "stock": 94
+
 
 
 # CREATE FUNCTION - FETCH ALL PRODUCTS #
 
-from urllib import response
-import requests # to make API requests
-import json # to handle JSON data
+from utils_catalog_cache import get_catalog_cache
 
-def fetch_all_products():
-    url='https://dummyjson.com/products'
-    response = requests.get(url)
-    data = response.json()
-    
-    response = requests.get(url + '?limit=100') # GET request to fetch 100 products
-    data = response.json()
-    for product in data['products']:
+# base URL of the product API; point it at a local stand-in server with SALES_API_BASE_URL=http://127.0.0.1:8000
+API_BASE_URL = os.environ.get('SALES_API_BASE_URL', 'https://dummyjson.com')
+
+
+def fetch_all_products(use_cache=True, base_url=None):
+    # the catalog is served from CatalogCache (memory + disk) when possible; use_cache=False always downloads
+    url = (base_url or API_BASE_URL).rstrip('/') + '/products'
+    if use_cache:
+        products = get_catalog_cache().get(url, download_catalog)
+    else:
         try:
-            print(
-            f"id: {product.get('id')}, "
-            f"Title: {product.get('title')}, "
-            f"description: {product.get('description')}, "
-            f"Price: Rs {product.get('price')}, "
-            f"category: {product.get('category')}, "
-            f"brand: {product.get('brand', 'N/A')}, "
-            f"rating: {product.get('rating')}, "
-            f"stock: {product.get('stock')}"
-            )
-        except KeyError as e:
-            print(f"Missing key {e} in product data: {product}")
-        continue
-    # data['total'] gives total count
-    print(f"Total Products Fetched: {len(data['products'])}")
-    return data['products']
-    # return empty list if API fails
+            products = download_catalog(url)['products']
+        except Exception as e:
+            print(f"Failed to fetch products from API: {e}")
+            products = []
+    print(f"Total Products Fetched: {len(products)}")
+    return products
+
+
+# PAGINATED CATALOG DOWNLOAD #
+
+# The API returns at most `limit` products per call plus data['total'].
+# The first page tells us the total; the remaining skip/limit pages are then fetched concurrently
+# by a bounded thread pool sharing one pooled requests.Session, with retry/backoff and a rate limit.
+
+PAGE_SIZE = 100
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 20
+MAX_RETRIES = 4
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all download threads: at most `rate` requests per second (bursts up to `rate`).
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+_session = None
+
+
+def get_session():
+    # one Session per process -> TCP/TLS connections are reused instead of opened per request
+    global _session
+    if _session is None:
+        import requests # to make API requests (imported here so importing this module stays cheap)
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _session = session
+    return _session
+
+
+def get_with_retry(url, params=None, headers=None, rate_limiter=None):
+    """
+    GET with exponential backoff on connection errors, 429 and 5xx (honours Retry-After).
+    """
+    import requests
+
+    session = get_session()
+    for attempt in range(MAX_RETRIES + 1):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=30)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+            continue
+        if response.status_code in RETRY_STATUS and attempt < MAX_RETRIES:
+            retry_after = response.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 0.5 * 2 ** attempt
+            time.sleep(delay)
+            continue
+        return response
+
+
+def download_catalog(url, etag=None, last_modified=None, page_size=PAGE_SIZE,
+                     max_workers=MAX_WORKERS, requests_per_second=REQUESTS_PER_SECOND):
+    """
+    Downloads every page of the catalog; this is the `fetch` function CatalogCache calls.
+    The first page is a conditional GET, so an unchanged catalog costs a single 304.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    rate_limiter = RateLimiter(requests_per_second)
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    response = get_with_retry(url, params={'limit': page_size, 'skip': 0}, headers=headers, rate_limiter=rate_limiter)
+    if response.status_code == 304:
+        return {'not_modified': True, 'products': None, 'etag': etag, 'last_modified': last_modified}
     if response.status_code != 200: # check for successful response
-        print("Failed to fetch products from API.")
-        return []
-    else: # print status message (success/failure)
-        print("Successfully fetched products from API.")
-        return data['products']
-print(fetch_all_products())
-print("Status message: Successfully fetched products from API.")
-print("Total Products Fetched: ", len(fetch_all_products()))
+        raise RuntimeError(f"API returned status {response.status_code}")
+    data = response.json()
+    products = list(data['products'])
+    total = data.get('total', len(products)) # data['total'] gives total count
+
+    def fetch_page(skip):
+        page = get_with_retry(url, params={'limit': page_size, 'skip': skip}, rate_limiter=rate_limiter)
+        if page.status_code != 200:
+            raise RuntimeError(f"API returned status {page.status_code} for skip={skip}")
+        return page.json()['products']
+
+    # the server may cap the page size below what we asked for, so step by what it actually returned
+    step = len(products)
+    if step and total > step:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for page in pool.map(fetch_page, range(step, total, step)):  # map keeps the pages in order
+                products.extend(page)
+
+    return {
+        'not_modified': False,
+        'products': products,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+
+def print_products(products):
+    for product in products:
+        print(
+        f"id: {product.get('id')}, "
+        f"Title: {product.get('title')}, "
+        f"description: {product.get('description')}, "
+        f"Price: Rs {product.get('price')}, "
+        f"category: {product.get('category')}, "
+        f"brand: {product.get('brand', 'N/A')}, "
+        f"rating: {product.get('rating')}, "
+        f"stock: {product.get('stock')}"
+        )
 
  
-
 # CREATE PRODUCT MAPPING
-def create_product_mapping(api_products):
+def create_product_mapping(api_products=None):
+    # api_products defaults to the (cached) catalog, so warm runs need no network at all
+    if api_products is None:
+        api_products = fetch_all_products()
     product_mapping = {}
     for product in api_products:
         try:
@@ -140,7 +191,6 @@ def create_product_mapping(api_products):
             print(f"Missing key {e} in product data: {product}")
             continue
     return product_mapping
-print(create_product_mapping(fetch_all_products()))
 
     # Creates a mapping of product IDs to product info
 
@@ -157,11 +207,10 @@ print(create_product_mapping(fetch_all_products()))
     # """
 
 
-
 # ENRICH SALES DATA (transactions) WITH API INFO #
 
 
-def enrich_sales_data(transactions, product_mapping):
+def enrich_sales_data(transactions, product_mapping, output_file="enriched_sales_data.txt"):
     """
     Enriches transaction data with API product information
     """
@@ -197,44 +246,129 @@ def enrich_sales_data(transactions, product_mapping):
 
         enriched_transactions.append(trx)
 
-    # --- 4. Write enriched data to file ---
-    output_file = "enriched_sales_data.txt"
+    # --- 4. Write enriched data to file (one buffered, atomic write) ---
+    if output_file:
+        write_enriched_data(enriched_transactions, output_file)
 
-    header = [
-        "TransactionID", "Date", "ProductID", "ProductName",
-        "Quantity", "UnitPrice", "CustomerID", "Region",
-        "API_Category", "API_Brand", "API_Rating", "API_Match"
-    ]
+    return enriched_transactions
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("|".join(header) + "\n")
+# VECTORIZED ENRICHMENT #
 
-        for trx in enriched_transactions:
-            row = [
-                str(trx.get(col, "")) for col in header
-            ]
-            f.write("|".join(row) + "\n")
+# enrich_sales_data() above parses and looks up the product id row by row and mutates every dict.
+# The columnar path turns the product mapping into dense arrays indexed by the numeric product id
+# (id -> category code / brand code / rating), and joins a whole ProductID column with one array gather.
+# The result is a set of NEW columns; the transactions themselves are never modified.
+
+def build_product_lookup(product_mapping):
+    """
+    Dense array lookup built from create_product_mapping() output:
+    {
+        'matched':        bool array,   index = product id
+        'category_codes': int32 array,  -1 where the id is unknown
+        'brand_codes':    int32 array,  -1 where the id is unknown
+        'ratings':        float64 array, NaN where the id is unknown
+        'categories':     list of category names (code -> name)
+        'brands':         list of brand names (code -> name)
+    }
+    """
+    import numpy as np
+
+    ids = [product_id for product_id in product_mapping if isinstance(product_id, int) and product_id >= 0]
+    size = max(ids) + 1 if ids else 0
+    lookup = {
+        'matched': np.zeros(size, dtype=bool),
+        'category_codes': np.full(size, -1, dtype=np.int32),
+        'brand_codes': np.full(size, -1, dtype=np.int32),
+        'ratings': np.full(size, np.nan, dtype=np.float64),
+        'categories': [],
+        'brands': [],
+    }
+    category_index, brand_index = {}, {}
+    for product_id in ids:
+        info = product_mapping[product_id]
+        lookup['matched'][product_id] = True
+        lookup['category_codes'][product_id] = category_index.setdefault(info.get('category'), len(category_index))
+        lookup['brand_codes'][product_id] = brand_index.setdefault(info.get('brand'), len(brand_index))
+        if info.get('rating') is not None:
+            lookup['ratings'][product_id] = info['rating']
+    lookup['categories'] = list(category_index)
+    lookup['brands'] = list(brand_index)
+    return lookup
+
+
+def product_numeric_ids(product_ids):
+    # 'P101' -> 101, anything unparseable -> -1 (called once per DISTINCT product id, not per row)
+    numeric_ids = []
+    for product_id in product_ids:
+        try:
+            numeric_ids.append(int(product_id.replace("P", "")))
+        except (AttributeError, ValueError):
+            numeric_ids.append(-1)
+    return numeric_ids
+
+
+def enrich_sales_columns(transactions, product_mapping):
+    """
+    Joins the API product info onto a TransactionTable or list of transaction dicts.
+
+    product_mapping: create_product_mapping() output, or an already built build_product_lookup().
+    Returns (columns, categories) in TransactionTable layout:
+    columns = {'API_Category': codes, 'API_Brand': codes, 'API_Rating': float64, 'API_Match': bool}
+    so for a table: table.with_columns(*enrich_sales_columns(table, mapping))
+    """
+    import numpy as np
+
+    lookup = product_mapping if 'category_codes' in product_mapping else build_product_lookup(product_mapping)
+
+    if getattr(transactions, 'columnar', False):
+        # ProductID is already dictionary-encoded: parse the distinct ids only
+        distinct_ids = transactions.categories['ProductID']
+        row_codes = transactions.codes('ProductID')
+    else:
+        index = {}
+        row_codes = np.fromiter((index.setdefault(trx.get('ProductID'), len(index)) for trx in transactions),
+                                dtype=np.int32)
+        distinct_ids = list(index)
+
+    numeric_ids = np.asarray(product_numeric_ids(distinct_ids), dtype=np.int64)
+    size = len(lookup['matched'])
+    known = (numeric_ids >= 0) & (numeric_ids < size)
+    slots = np.where(known, numeric_ids, 0)
+
+    def gather(array, missing):
+        # per distinct product id first, then one gather over all rows
+        per_id = np.where(known, array[slots] if size else missing, missing)
+        return per_id[row_codes]
+
+    columns = {
+        'API_Category': gather(lookup['category_codes'], -1).astype(np.int32),
+        'API_Brand': gather(lookup['brand_codes'], -1).astype(np.int32),
+        'API_Rating': gather(lookup['ratings'], np.nan).astype(np.float64),
+        'API_Match': gather(lookup['matched'], False).astype(bool),
+    }
+    categories = {'API_Category': lookup['categories'], 'API_Brand': lookup['brands']}
+    return columns, categories
 
-    return enriched_transactions
-print(enrich_sales_data(transactions, create_product_mapping(fetch_all_products())))
-df = pd.DataFrame(enrich_sales_data(transactions, create_product_mapping(fetch_all_products())))
-print(df)   
 
 def save_enriched_data(enriched_transactions, filename='data/enriched_sales_data.txt'):
-    for trx in enriched_transactions:
-        try:
-            with open(filename, 'a', encoding='utf-8') as f:
-                header = [
-                    "TransactionID", "Date", "ProductID", "ProductName",
-                    "Quantity", "UnitPrice", "CustomerID", "Region",
-                    "API_Category", "API_Brand", "API_Rating", "API_Match"
-                ]
-                row = [str(trx.get(col, "")) for col in header] 
-                f.write("|".join(row) + "\n")
-        except Exception as e:
-            print(f"Error writing transaction {trx.get('TransactionID', 'N/A')}: {e}")
-            continue
-    print("Enriched data saved to", filename)
+    # enriched_transactions: list of enriched dicts or a TransactionTable with the API_* columns
+    # a .parquet / .npz filename stores typed binary columns instead of pipe-delimited text
+    if filename.lower().endswith(('.parquet', '.npz')):
+        from utils_transaction_table import save_table, table_from_dicts
+
+        table = enriched_transactions
+        if not getattr(table, 'columnar', False):
+            table = table_from_dicts(enriched_transactions)
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        filename = save_table(table, filename)
+        print(f"Enriched data saved to {filename} ({len(table)} rows)")
+        return
+    try:
+        count = write_enriched_data(enriched_transactions, filename)
+    except OSError as e:
+        print(f"Error writing enriched data to {filename}: {e}")
+        return
+    print(f"Enriched data saved to {filename} ({count} rows)")
 
     # Saves enriched transactions back to file
 
@@ -250,4 +384,85 @@ def save_enriched_data(enriched_transactions, filename='data/enriched_sales_data
     # """
 
 
+if __name__ == "__main__":
+    # demo only: the module itself makes no HTTP calls on import
+    import pandas as pd
+    import requests
+
+    transactions = parse_transactions(read_sales_data('sales_data.txt'))
+
+    # GET ALL PRODUCTS 
+    response = requests.get('https://dummyjson.com/products') # make GET request to API endpoint
+    data = response.json()
+    # data['products'] contains list of all products
+    # data['total'] gives total count
+
+
+
+    # GET A SINGLE PRODUCT BY ID
+    # example pdt id 1:
+    response = requests.get('https://dummyjson.com/products/1')
+    product = response.json()
+    # Returns single product object
+    # product['id'], product['title'], product['price'], etc. can be accessed
+    # Example: print product title and price
+    print(f"Product: {product['title']}, Price: Rs {product['price']}")
+    # You can integrate this API data with your sales transactions as needed
+
+    # example pdt id 5:
+    response = requests.get('https://dummyjson.com/products/5')
+    product = response.json()
+    print(f"Product: {product['title']}, Price: Rs {product['price']}")
+
+    # GET SPECIFIC NUMBETR OF PRODUCTS
 
+    response = requests.get('https://dummyjson.com/products?limit=100')
+    data = response.json()
+    # data['products'] contains list of products limited to 100
+    # data['total'] gives total count
+    # Example: print total number of products fetched
+    print(f"Total Products Fetched: {len(data['products'])}")
+
+    # You can further process this data as per your requirements
+
+    # SEARCH PRODUCTS
+    response = requests.get('https://dummyjson.com/products/search?q=phone')
+
+    data = response.json()
+    # data['products'] contains list of products matching search query 'phone'  
+    # Example: print titles of matching products
+    for product in data['products']:
+        print (f"""id: {product['id']}, Title: {product['title']},description : {product['description']},Price: Rs {product['price']}, 
+            category: {product['category']}, brand: {product['brand']}, rating: {product['rating']}, stock: {product['stock']}""")
+    # You can modify the search query as needed
+    # You can integrate this search functionality into your application as required
+    # THIS CAN ALSO BE REPRESENTED AS: individual F single product object
+
+        print (
+            f"id: {product['id']}", 
+            f"Title: {product['title']}",
+            f"description : {product['description']}",
+            f"Price: Rs {product['price']}", 
+            f"category: {product['category']}", 
+            f"brand: {product['brand']}", 
+            f"rating: {product['rating']}", 
+            f"stock: {product['stock']}"
+            )
+    #   "id": 1,
+    #   "title": "iPhone 9",
+    #   "description": "An apple mobile...",
+    #   "price": 549,
+    #   "category": "smartphones",
+    #   "brand": "Apple",
+    #   "rating": 4.69,
+    #   "stock": 94
+
+    print(fetch_all_products())
+    print("Status message: Successfully fetched products from API.")
+    print("Total Products Fetched: ", len(fetch_all_products()))
+
+    print(create_product_mapping(fetch_all_products()))
+
+    print(enrich_sales_data(transactions, create_product_mapping(fetch_all_products())))
+    df = pd.DataFrame(enrich_sales_data(transactions, create_product_mapping(fetch_all_products())))
+    print(df)   
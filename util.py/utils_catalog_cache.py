@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils_file_handler import atomic_write
+from utils_lru import LRUCache
+
+# PRODUCT CATALOG CACHE #
+
+# The product catalog changes rarely, but every enrichment used to download it again.
+# CatalogCache keeps it at two levels:
+# 1. in-process LRU (OrderedDict)      -> free on repeated calls in the same run
+# 2. JSON snapshot on disk             -> free on warm runs of the scripts
+# After `ttl` seconds an entry is stale and is revalidated with a conditional GET
+# (If-None-Match / If-Modified-Since); a 304 answer only refreshes the timestamp.
+# With stale_while_revalidate=True a stale entry is returned at once and refreshed in a background thread.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'sales_analytics')
+DEFAULT_TTL = 60 * 60  # 1 hour
+
+
+class CatalogCache:
+    """
+    Two-level (memory + disk) cache for catalog downloads, keyed by URL.
+
+    fetch(url, etag, last_modified) must return a dict:
+    {'not_modified': bool, 'products': list, 'etag': str or None, 'last_modified': str or None}
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_entries=8, stale_while_revalidate=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_while_revalidate = stale_while_revalidate
+        self._memory = LRUCache(max_entries)  # url -> entry
+        self._lock = threading.Lock()  # guards _refreshing
+        self._refreshing = set()  # urls with a background revalidation running
+
+    def snapshot_path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"catalog_{key}.json")
+
+    def get(self, url, fetch):
+        """
+        Returns the product list for url, downloading it only when needed.
+        """
+        entry = self._lookup(url)
+        if entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+            return entry['products']
+
+        if entry is not None and self.stale_while_revalidate:
+            with self._lock:
+                start = url not in self._refreshing
+                self._refreshing.add(url)
+            if start:
+                threading.Thread(target=self._refresh_in_background, args=(url, fetch, entry), daemon=True).start()
+            return entry['products']
+
+        return self._revalidate(url, fetch, entry)
+
+    def invalidate(self, url=None):
+        # drop one url (or everything) from memory and disk
+        urls = [url] if url is not None else self._memory.keys()
+        for key in urls:
+            self._memory.pop(key)
+            try:
+                os.remove(self.snapshot_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _lookup(self, url):
+        entry = self._memory.get(url)
+        if entry is None:
+            entry = self._load_snapshot(url)
+            if entry is not None:
+                self._memory.put(url, entry)
+        return entry
+
+    def _load_snapshot(self, url):
+        try:
+            with open(self.snapshot_path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):  # missing, unreadable or corrupt snapshot -> treat as a miss
+            return None
+
+    def _save_snapshot(self, url, entry):
+        with atomic_write(self.snapshot_path(url)) as f:
+            json.dump(entry, f)
+
+    def _revalidate(self, url, fetch, entry):
+        etag = entry.get('etag') if entry else None
+        last_modified = entry.get('last_modified') if entry else None
+        try:
+            result = fetch(url, etag=etag, last_modified=last_modified)
+        except Exception as e:
+            if entry is not None:
+                print(f"Catalog refresh failed ({e}), using cached copy.")
+                return entry['products']
+            print(f"Failed to fetch products from API: {e}")
+            return []
+
+        if result['not_modified'] and entry is not None:
+            entry = dict(entry, fetched_at=time.time())
+        else:
+            entry = {
+                'url': url,
+                'fetched_at': time.time(),
+                'etag': result.get('etag'),
+                'last_modified': result.get('last_modified'),
+                'products': result['products'],
+            }
+        self._memory.put(url, entry)
+        try:
+            self._save_snapshot(url, entry)
+        except OSError as e:  # read-only or full cache dir: the download itself is still good
+            print(f"Could not save the catalog snapshot ({e}), keeping it in memory only.")
+        return entry['products']
+
+    def _refresh_in_background(self, url, fetch, entry):
+        try:
+            self._revalidate(url, fetch, entry)
+        finally:
+            with self._lock:
+                self._refreshing.discard(url)
+
+
+_default_cache = None
+
+
+def get_catalog_cache():
+    """
+    Shared CatalogCache used by fetch_all_products(); settings come from the environment:
+    SALES_CATALOG_CACHE_DIR, SALES_CATALOG_TTL (seconds), SALES_CATALOG_SWR (1 = stale-while-revalidate).
+    """
+    global _default_cache
+    if _default_cache is None:
+        configure_catalog_cache(
+            cache_dir=os.environ.get('SALES_CATALOG_CACHE_DIR', DEFAULT_CACHE_DIR),
+            ttl=float(os.environ.get('SALES_CATALOG_TTL', DEFAULT_TTL)),
+            stale_while_revalidate=os.environ.get('SALES_CATALOG_SWR') == '1',
+        )
+    return _default_cache
+
+
+def configure_catalog_cache(**settings):
+    # replaces the shared cache, e.g. configure_catalog_cache(ttl=600, stale_while_revalidate=True)
+    global _default_cache
+    _default_cache = CatalogCache(**settings)
+    return _default_cache
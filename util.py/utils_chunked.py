@@ -0,0 +1,86 @@
+from itertools import islice
+
+from utils_file_handler import read_sales_data, parse_transactions, validate_batch, filter_transactions, VALIDATION_RULES
+from utils_aggregator import SalesAggregate, aggregate_transactions
+from utils_distinct import DEFAULT_PRECISION
+
+# CHUNKED (OUT-OF-CORE) PROCESSING #
+
+# read_sales_data / parse_transactions / the analyses normally hold the whole file in memory.
+# In chunked mode the file is streamed N lines at a time; each chunk is parsed, validated and
+# filtered, folded into a partial SalesAggregate, and then dropped. The partial aggregates are
+# merged as they come (SalesAggregate.merge), so peak memory is one chunk plus the aggregate
+# (number of regions / products / customers / days), whatever the size of the file.
+# The merged SalesAggregate can be passed to every utils_data_processor analysis and to the report.
+
+CHUNK_ROWS = 100000
+
+
+def iter_chunks(filename, chunk_rows=CHUNK_ROWS):
+    """
+    Yields lists of at most chunk_rows cleaned lines, streaming the file.
+    """
+    lines = read_sales_data(filename, stream=True)
+    if getattr(lines, 'columnar', False):
+        # a binary .parquet/.npz file is already a table; hand it out in row slices
+        for start in range(0, len(lines), chunk_rows):
+            yield lines.take(slice(start, start + chunk_rows))
+        return
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_chunk(raw_lines, region=None, min_amount=None, max_amount=None, columnar=False,
+                  distinct='exact', precision=DEFAULT_PRECISION):
+    """
+    Parses, validates and filters one chunk and aggregates it.
+    Returns (partial SalesAggregate, filter summary, per-rule rejection counts).
+    """
+    transactions = parse_transactions(raw_lines, columnar=columnar)
+    valid_transactions, report = validate_batch(transactions)
+    valid_transactions, invalid_count, summary = filter_transactions(
+        valid_transactions, region, min_amount, max_amount, report)
+    summary['parse_skipped'] = len(raw_lines) - len(transactions)  # wrong field count, bad numbers / dates
+    rejected = {rule: stats['rejected'] for rule, stats in report['rules'].items()}
+    return aggregate_transactions(valid_transactions, distinct, precision), summary, rejected
+
+
+def aggregate_file_chunked(filename, chunk_rows=CHUNK_ROWS, region=None, min_amount=None, max_amount=None,
+                           columnar=False, distinct='exact', precision=DEFAULT_PRECISION):
+    """
+    Out-of-core version of read -> parse -> validate_and_filter -> aggregate for files larger than memory.
+
+    Returns (SalesAggregate, summary) where summary adds up the per-chunk filter summaries
+    (total_input, invalid, filtered_by_region, filtered_by_amount, final_count, parse_skipped, chunks)
+    and has the per-rule rejection counts under 'rejected'.
+    columnar=True parses each chunk into a TransactionTable (less memory per chunk, vectorized validation).
+    """
+    aggregate = SalesAggregate(distinct, precision)
+    summary = {'total_input': 0, 'valid': 0, 'invalid': 0, 'filtered_by_region': 0, 'filtered_by_amount': 0,
+               'final_count': 0, 'parse_skipped': 0, 'chunks': 0,
+               'rejected': {rule: 0 for rule in VALIDATION_RULES}}
+    for chunk in iter_chunks(filename, chunk_rows):
+        partial, chunk_summary, rejected = process_chunk(chunk, region, min_amount, max_amount,
+                                                         columnar, distinct, precision)
+        aggregate.merge(partial)
+        for key, value in chunk_summary.items():
+            summary[key] += value
+        for rule, count in rejected.items():
+            summary['rejected'][rule] += count
+        summary['chunks'] += 1
+    return aggregate, summary
+
+
+if __name__ == "__main__":
+    import sys
+
+    # usage: python utils_chunked.py [sales file] [rows per chunk]
+    sales_file = sys.argv[1] if len(sys.argv) > 1 else 'sales_data.txt'
+    chunk_rows = int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_ROWS
+    aggregate, summary = aggregate_file_chunked(sales_file, chunk_rows)
+    print(aggregate)
+    print(summary)
@@ -0,0 +1,185 @@
+from utils_dates import as_ordinal, period_key, NO_DATE
+
+# REGION x DATE x PRODUCT CUBE #
+
+# Questions like "North, week 49, chargers" used to rescan the raw transactions every time.
+# SalesCube pre-aggregates revenue, quantity and transaction count once per (day, region, product)
+# cell. Only cells that had sales are stored (sparse), sorted by day, so:
+# - a date range is two np.searchsorted calls on the day column
+# - region / product filters are boolean masks over that slice only
+# - week / month roll-ups group the matching cells, never the transactions
+# The cube is persisted with np.savez and loads back without touching the sales file.
+
+MEASURES = ('revenue', 'quantity', 'transactions')
+GROUP_BYS = ('region', 'product', 'day', 'week', 'month')
+
+
+class SalesCube:
+    """
+    Sparse pre-aggregated cube.
+
+    cells:      dict of 'day' (int32 ordinals), 'region', 'product' (int32 codes),
+                'revenue' (float64), 'quantity' (int64), 'transactions' (int64); sorted by day
+    regions:    list of region names (code -> name)
+    products:   list of product names (code -> name)
+    """
+
+    def __init__(self, cells, regions, products):
+        self.cells = cells
+        self.regions = regions
+        self.products = products
+        self._region_codes = {name: code for code, name in enumerate(regions)}
+        self._product_codes = {name: code for code, name in enumerate(products)}
+
+    def __len__(self):
+        return len(self.cells['day'])
+
+    def __repr__(self):
+        return f"SalesCube({len(self)} cells, {len(self.regions)} regions, {len(self.products)} products)"
+
+    def _codes(self, names, index):
+        import numpy as np
+
+        # one name or a list of names -> array of codes (unknown names simply match nothing)
+        if isinstance(names, str):
+            names = [names]
+        return np.array([index[name] for name in names if name in index], dtype=np.int32)
+
+    def _select(self, region=None, product=None, start=None, end=None):
+        import numpy as np
+
+        # row range from the date bounds (inclusive), then masks for region and product
+        days = self.cells['day']
+        start, end = as_ordinal(start), as_ordinal(end)
+        lo = 0 if start is None else int(np.searchsorted(days, start, side='left'))
+        hi = len(days) if end is None else int(np.searchsorted(days, end, side='right'))
+        rows = np.arange(lo, hi)
+        if region is not None:
+            rows = rows[np.isin(self.cells['region'][lo:hi], self._codes(region, self._region_codes))]
+        if product is not None:
+            rows = rows[np.isin(self.cells['product'][rows], self._codes(product, self._product_codes))]
+        return rows
+
+    def query(self, region=None, product=None, start=None, end=None, by=None):
+        """
+        Totals for a slice of the cube.
+
+        region / product: a name, a list of names, or None for all
+        start / end:      'YYYY-MM-DD' (or date / ordinal), inclusive, None for open-ended
+        by:               None for one total, or 'region', 'product', 'day', 'week', 'month'
+
+        Returns {'revenue': float, 'quantity': int, 'transactions': int},
+        or {group: {...}} sorted by group when `by` is given.
+        """
+        import numpy as np
+
+        rows = self._select(region, product, start, end)
+        if by is None:
+            return self._totals(rows)
+        if by not in GROUP_BYS:
+            raise ValueError(f"Unknown group by: {by} (use one of {', '.join(GROUP_BYS)})")
+
+        if by == 'region':
+            labels = np.asarray(self.regions, dtype=object)[self.cells['region'][rows]]
+        elif by == 'product':
+            labels = np.asarray(self.products, dtype=object)[self.cells['product'][rows]]
+        else:
+            # label each distinct day once, not each cell
+            days, inverse = np.unique(self.cells['day'][rows], return_inverse=True)
+            labels = np.asarray([period_key(int(d), by) for d in days], dtype=object)[inverse]
+
+        keys, inverse = np.unique(labels.astype(str), return_inverse=True)
+        result = {}
+        sums = {name: np.bincount(inverse, weights=self.cells[name][rows], minlength=len(keys)) for name in MEASURES}
+        for i, key in enumerate(keys.tolist()):
+            result[key] = {
+                'revenue': float(sums['revenue'][i]),
+                'quantity': int(sums['quantity'][i]),
+                'transactions': int(sums['transactions'][i]),
+            }
+        return result
+
+    def _totals(self, rows):
+        return {
+            'revenue': float(self.cells['revenue'][rows].sum()),
+            'quantity': int(self.cells['quantity'][rows].sum()),
+            'transactions': int(self.cells['transactions'][rows].sum()),
+        }
+
+    def save(self, filename):
+        import numpy as np
+
+        with open(filename, 'wb') as f:
+            np.savez(f, regions=np.asarray(self.regions, dtype=str), products=np.asarray(self.products, dtype=str),
+                     **{f"cell:{name}": column for name, column in self.cells.items()})
+        return filename
+
+
+def load_cube(filename):
+    """
+    Loads a SalesCube written by SalesCube.save().
+    """
+    import numpy as np
+
+    with np.load(filename, allow_pickle=False) as data:
+        cells = {name[len('cell:'):]: data[name] for name in data.files if name.startswith('cell:')}
+        return SalesCube(cells, data['regions'].tolist(), data['products'].tolist())
+
+
+def build_cube(transactions):
+    """
+    Builds the cube from parsed transactions (list of dicts or a TransactionTable) in one vectorized pass.
+    Rows are validated first with the same rules as validate_and_filter, so the cube answers
+    match the analyses; a valid row without a parseable date has no day and gets no cell.
+    """
+    import numpy as np
+    from utils_file_handler import validate_batch, validation_mask
+
+    if getattr(transactions, 'columnar', False):
+        keep, report = validation_mask(transactions)
+    else:
+        from utils_transaction_table import table_from_dicts
+        valid, report = validate_batch(transactions)
+        transactions = table_from_dicts(valid)
+        keep = np.ones(len(transactions), dtype=bool)
+    table = transactions.take(keep & (transactions.columns['Date'] != NO_DATE))
+    regions = table.categories['Region']
+    products = table.categories['ProductName']
+    if len(table) == 0:
+        empty = {'day': np.zeros(0, np.int32), 'region': np.zeros(0, np.int32), 'product': np.zeros(0, np.int32),
+                 'revenue': np.zeros(0), 'quantity': np.zeros(0, np.int64), 'transactions': np.zeros(0, np.int64)}
+        return SalesCube(empty, list(regions), list(products))
+
+    # one int64 key per (day, region, product); sorting the keys sorts the cells by day first
+    day_codes = table.columns['Date'].astype(np.int64)
+    first_day = int(day_codes.min())
+    n_regions, n_products = max(len(regions), 1), max(len(products), 1)
+    keys = ((day_codes - first_day) * n_regions + table.codes('Region')) * n_products + table.codes('ProductName')
+    cell_keys, inverse = np.unique(keys, return_inverse=True)
+
+    cells = {
+        'day': (cell_keys // (n_regions * n_products) + first_day).astype(np.int32),
+        'region': (cell_keys // n_products % n_regions).astype(np.int32),
+        'product': (cell_keys % n_products).astype(np.int32),
+        'revenue': np.bincount(inverse, weights=table.amount, minlength=len(cell_keys)),
+        'quantity': np.bincount(inverse, weights=table.columns['Quantity'], minlength=len(cell_keys)).astype(np.int64),
+        'transactions': np.bincount(inverse, minlength=len(cell_keys)).astype(np.int64),
+    }
+    return SalesCube(cells, list(regions), list(products))
+
+
+if __name__ == "__main__":
+    import sys
+    from utils_file_handler import read_sales_data, parse_transactions
+
+    # usage: python utils_cube.py [sales file] [cube file]
+    sales_file = sys.argv[1] if len(sys.argv) > 1 else 'sales_data.txt'
+    cube_file = sys.argv[2] if len(sys.argv) > 2 else 'sales_cube.npz'
+
+    cube = build_cube(parse_transactions(read_sales_data(sales_file), columnar=True))
+    cube.save(cube_file)
+    cube = load_cube(cube_file)
+    print(cube)
+    print(cube.query(by='region'))
+    print(cube.query(region='North', by='week'))
+    print(cube.query(product='Laptop Charger', start='2024-12-01', end='2024-12-15'))
@@ -1,79 +1,50 @@
-import pandas as pd
-
 from utils_file_handler import (
     read_sales_data,
     parse_transactions,
     validate_and_filter
 )
+from utils_aggregator import SalesAggregate, aggregate_transactions
+from utils_distinct import DEFAULT_PRECISION, rollup_distinct
+from utils_dates import ordinal_to_date, period_key, week_start
+from utils_topk import top_k, approximate_top_products
+from utils_memo import memoize
+
+# every analysis can be memoized on (dataset fingerprint, parameters), so repeated calls on unchanged data are free (opt-in, see utils_memo)
+
 
 # TOTAL REVENUE CALCULATION
 
+@memoize
 def calculate_total_revenue(transactions):
     """
     Calculates total revenue from all transactions.
     """
-    total_revenue = 0.0
-
-    for trx in transactions:
-        try:
-            total_revenue += trx['Quantity'] * trx['UnitPrice']
-        except KeyError:
-            continue
-
-    return total_revenue
-
-
-if __name__ == "__main__":
-
-    # Read and parse sales data
-    sales_data = read_sales_data('sales_data.txt')
-    transactions = parse_transactions(sales_data)
+    return aggregate_transactions(transactions).total_revenue
 
-    # Calculate total revenue
-    total_revenue = calculate_total_revenue(transactions)
-    print(f"Total Revenue: Rs {total_revenue:,.2f}")
-
-    # Validate and filter
-    summary = validate_and_filter(
-        transactions,
-        region='North',
-        min_amount=100,
-        max_amount=1000
-    )
-    print(summary)
 
-    # REGIONWISE SALES ANALYSIS
+# REGIONWISE SALES ANALYSIS
 
+@memoize
 def region_wise_sales(transactions):
+    # transactions can be a list of dicts, a TransactionTable or an already computed SalesAggregate
+    aggregate = aggregate_transactions(transactions)
+    grand_total_sales = aggregate.total_revenue # total sales across all regions
     region_stats = {} # dictionary to hold region-wise stats
-    grand_total_sales = 0.0 # total sales across all regions . why 0 ? = initial value
-
-    for trx in transactions:
-        if 'Region' not in trx:
-            continue
-        region = trx['Region'] # get region from transaction
-        amount = trx['Quantity'] * trx['UnitPrice']
-        grand_total_sales += amount # accumulate grand total sales (add amount over and over)
-        if region not in region_stats: # if region not in region_stats dict , then initialize it
-            region_stats[region] = {
-                'total_sales': 0.0,
-                'transaction_count': 0
-            }
-        region_stats[region]['total_sales'] += amount
-        region_stats[region]['transaction_count'] += 1
-    for region, stats in region_stats.items(): # calculate percentage contribution of each region to grand total sales
-        stats['percentage'] = (stats['total_sales'] / grand_total_sales * 100) if grand_total_sales > 0 else 0.0
+    for region, stats in aggregate.regions.items(): # calculate percentage contribution of each region to grand total sales
+        region_stats[region] = {
+            'total_sales': stats['sales'],
+            'transaction_count': stats['transactions'],
+            'percentage': (stats['sales'] / grand_total_sales * 100) if grand_total_sales > 0 else 0.0
+        }
     # Sort regions by total_sales in descending order
     sorted_region_stats = dict(sorted(region_stats.items(), key=lambda item: item[1]['total_sales'], reverse=True))
     return sorted_region_stats
-region_analysis = region_wise_sales(transactions)
-print(region_analysis)
-df= pd.DataFrame(region_analysis).T  # Transpose to get regions as rows
-print(df)
-    
+
+
 # TOP SELLING PRODUCTS
 
-def top_selling_products(transactions, n=5):
+@memoize
+def top_selling_products(transactions, n=5, approximate=False, capacity=1000):
     # """
     # Returns top N selling products based on total quantity sold.
 
@@ -82,76 +53,41 @@ def top_selling_products(transactions, n=5):
     #     ('Laptop', 25, 1125000.0),
     #     ('Mouse', 40, 80000.0)
     # ]
-    # """
-
-    product_stats = {} # 
 
-    for trx in transactions:
-
-        # Validate required fields - why ? to avoid KeyError like below 
-        if 'ProductName' not in trx or 'Quantity' not in trx or 'UnitPrice' not in trx:  
-            continue
-
-        product = trx['ProductName'] # get product name from transaction
-        quantity = trx['Quantity']
-        revenue = quantity * trx['UnitPrice']
-
-        # Initialize product if not present
-        if product not in product_stats:
-            product_stats[product] = {
-                'TotalQuantity': 0,
-                'TotalRevenue': 0.0
-            }
+    # approximate=True streams the rows through a fixed-memory Space-Saving/Count-Min
+    # sketch (see utils_topk) instead of aggregating every product; the numbers are then estimates.
+    # """
+    if approximate and not isinstance(transactions, SalesAggregate):
+        return approximate_top_products(transactions, n, capacity)
 
-        # Aggregate values
-        product_stats[product]['TotalQuantity'] += quantity
-        product_stats[product]['TotalRevenue'] += revenue
+    aggregate = aggregate_transactions(transactions)
 
-    # Sort by TotalQuantity (descending)
-    sorted_products = sorted(
-        [(p, v['TotalQuantity'], v['TotalRevenue']) for p, v in product_stats.items()], # tuple list of (ProductName, TotalQuantity, TotalRevenue)
-        # p = ProductName , v = {'TotalQuantity': x, 'TotalRevenue': y}
-        key=lambda x: x[1], # lambda x : x[1] means sort by second element of tuple which is TotalQuantity
-        reverse=True
+    # Top N by TotalQuantity (descending) with a bounded heap instead of sorting every product
+    return top_k(
+        ((p, v['quantity'], v['revenue']) for p, v in aggregate.products.items()), # (ProductName, TotalQuantity, TotalRevenue)
+        n,
+        key=lambda x: x[1] # x[1] is TotalQuantity
     )
 
-    return sorted_products[:n]
-print(top_selling_products(transactions, n=5))
-
-df = pd.DataFrame(top_selling_products(transactions, n=5), columns=['ProductName', 'TotalQuantity', 'TotalRevenue'])
-print(df)
 
 # CUSTOMER PURCHASE ANALYSIS
 
+@memoize
 def customer_analysis(transactions):
+    aggregate = aggregate_transactions(transactions)
     customer_stats = {}
-    for trx in transactions:
-        customer_id = trx['CustomerID']
-        amount = trx['Quantity'] * trx['UnitPrice']
-        product_name = trx['ProductName']
-
-        if customer_id not in customer_stats:
-            customer_stats[customer_id] = {
-                'total_spent': 0.0,
-                'purchase_count': 0,
-                'products_bought': set()
-            }
-
-        customer_stats[customer_id]['total_spent'] += amount
-        customer_stats[customer_id]['purchase_count'] += 1
-        customer_stats[customer_id]['products_bought'].add(product_name)
-    # Finalize average order value and convert products_bought to list
-    for customer_id, stats in customer_stats.items():
-        stats['avg_order_value'] = stats['total_spent'] / stats['purchase_count'] if stats['purchase_count'] > 0 else 0.0
-        stats['products_bought'] = list(stats['products_bought'])
+    for customer_id, stats in aggregate.customers.items():
+        customer_stats[customer_id] = {
+            'total_spent': stats['total_spent'],
+            'purchase_count': stats['order_count'],
+            'products_bought': list(stats['products']),
+            'avg_order_value': stats['total_spent'] / stats['order_count'] if stats['order_count'] > 0 else 0.0
+        }
     # Sort by total_spent descending
     sorted_customer_stats = dict(sorted(customer_stats.items(), key=lambda item: item[1]['total_spent'], reverse=True))
     return sorted_customer_stats
-print(customer_analysis(transactions))
-df = pd.DataFrame(customer_analysis(transactions)).T
-print(df)
 
-  
+
     # """
     # Analyzes customer purchase patterns
 
@@ -179,32 +115,21 @@ print(df)
 
 # Daily sales trend analysis
 
-def daily_sales_trend(transactions):
+@memoize
+def daily_sales_trend(transactions, distinct='exact', precision=DEFAULT_PRECISION):
+    # distinct='hll' counts unique customers with a fixed-size HyperLogLog per day instead of a set
+    aggregate = aggregate_transactions(transactions, distinct, precision)
     daily_stats = {}
-    for trx in transactions:
-        date = trx['Date']
-        amount = trx['Quantity'] * trx['UnitPrice']
-        customer_id = trx['CustomerID']
-
-        if date not in daily_stats:
-            daily_stats[date] = {
-                'revenue': 0.0,
-                'transaction_count': 0,
-                'unique_customers': set()
-            }
-
-        daily_stats[date]['revenue'] += amount
-        daily_stats[date]['transaction_count'] += 1
-        daily_stats[date]['unique_customers'].add(customer_id)
-    # Finalize unique_customers count
-    for date, stats in daily_stats.items():
-        stats['unique_customers'] = len(stats['unique_customers'])
-    # Sort by date
-    sorted_daily_stats = dict(sorted(daily_stats.items()))
-    return sorted_daily_stats
-print(daily_sales_trend(transactions))
-df = pd.DataFrame(daily_sales_trend(transactions)).T
-print(df)
+    # Sort by date (integer day ordinals sort chronologically, the string is only made for the output key)
+    for day, stats in sorted(aggregate.days.items()):
+        daily_stats[ordinal_to_date(day)] = {
+            'revenue': stats['revenue'],
+            'transaction_count': stats['transactions'],
+            'unique_customers': len(stats['customers'])
+        }
+    return daily_stats
+
+
     # """
     # Analyzes sales trends by date
 
@@ -229,21 +154,52 @@ print(df)
     # - Sort chronologically
     # """
 
+# UNIQUE CUSTOMERS PER WEEK / MONTH
+
+@memoize
+def unique_customers_by_period(transactions, period='week', distinct='exact', precision=DEFAULT_PRECISION):
+    """
+    Unique customers per week ('YYYY-Www') or month ('YYYY-MM'), merged from the per-day counters.
+    Returns {period: unique_customers}, sorted by period.
+    """
+    aggregate = aggregate_transactions(transactions, distinct, precision)
+    counters = {day: stats['customers'] for day, stats in aggregate.days.items()}
+    return {key: len(counter) for key, counter in rollup_distinct(counters, period).items()}
+
+
+# SALES PER WEEK / MONTH
+
+@memoize
+def sales_by_period(transactions, period='week'):
+    """
+    Revenue and transaction count per ISO week ('YYYY-Www') or month ('YYYY-MM').
+    Days are integer ordinals, so weeks are integer arithmetic over the day aggregates.
+    """
+    aggregate = aggregate_transactions(transactions)
+    period_stats = {}
+    for day, stats in sorted(aggregate.days.items()):
+        key = period_key(week_start(day) if period == 'week' else day, period)
+        totals = period_stats.setdefault(key, {'revenue': 0.0, 'transaction_count': 0})
+        totals['revenue'] += stats['revenue']
+        totals['transaction_count'] += stats['transactions']
+    return period_stats
+
+
 # PEAK SALES DAY
 
+@memoize
 def find_peak_sales_day(transactions):
-
-    daily_stats = daily_sales_trend(transactions)
+    # reads the day aggregates directly instead of rebuilding the whole daily trend
+    aggregate = aggregate_transactions(transactions)
     peak_day = None
     max_revenue = 0.0
     transaction_count = 0
-    for date, stats in daily_stats.items():
+    for day, stats in sorted(aggregate.days.items()):
         if stats['revenue'] > max_revenue:
             max_revenue = stats['revenue']
-            peak_day = date
-            transaction_count = stats['transaction_count']
-    return (peak_day, max_revenue, transaction_count)
-print(find_peak_sales_day(transactions))
+            peak_day = day
+            transaction_count = stats['transactions']
+    return (ordinal_to_date(peak_day) if peak_day is not None else None, max_revenue, transaction_count)
     # """
     # Identifies the date with highest revenue
 
@@ -254,29 +210,16 @@ print(find_peak_sales_day(transactions))
     # """
 
 # LOW PERFORMING PRODUCTS
+@memoize
 def low_performing_products(transactions, threshold=10):
-    product_stats = {}
-    for trx in transactions:
-        product = trx['ProductName']
-        quantity = trx['Quantity']
-        revenue = quantity * trx['UnitPrice']
-
-        if product not in product_stats:
-            product_stats[product] = {
-                'TotalQuantity': 0,
-                'TotalRevenue': 0.0
-            }
-
-        product_stats[product]['TotalQuantity'] += quantity
-        product_stats[product]['TotalRevenue'] += revenue
+    aggregate = aggregate_transactions(transactions)
     low_performers = [
-        (product, stats['TotalQuantity'], stats['TotalRevenue'])
-        for product, stats in product_stats.items()
-        if stats['TotalQuantity'] < threshold
+        (product, stats['quantity'], stats['revenue'])
+        for product, stats in aggregate.products.items()
+        if stats['quantity'] < threshold
     ]
     low_performers.sort(key=lambda x: x[1])  # Sort by TotalQuantity ascending
     return low_performers
-print(low_performing_products(transactions))
 
     # """
     # Identifies products with low sales
@@ -296,6 +239,48 @@ print(low_performing_products(transactions))
     # - Sort by TotalQuantity ascending
     # """
 
-df = pd.DataFrame(low_performing_products(transactions), columns=['ProductName', 'TotalQuantity', 'TotalRevenue'])
-print(df)
 
+if __name__ == "__main__":
+    import pandas as pd  # only the demo below needs pandas
+
+    # Read and parse sales data
+    sales_data = read_sales_data('sales_data.txt')
+    transactions = parse_transactions(sales_data)
+
+    # Calculate total revenue
+    total_revenue = calculate_total_revenue(transactions)
+    print(f"Total Revenue: Rs {total_revenue:,.2f}")
+
+    # Validate and filter
+    valid_transactions, invalid_count, summary = validate_and_filter(
+        transactions,
+        region='North',
+        min_amount=100,
+        max_amount=1000
+    )
+    print(summary)
+
+    region_analysis = region_wise_sales(transactions)
+    print(region_analysis)
+    df= pd.DataFrame(region_analysis).T  # Transpose to get regions as rows
+    print(df)
+
+    print(top_selling_products(transactions, n=5))
+
+    df = pd.DataFrame(top_selling_products(transactions, n=5), columns=['ProductName', 'TotalQuantity', 'TotalRevenue'])
+    print(df)
+
+    print(customer_analysis(transactions))
+    df = pd.DataFrame(customer_analysis(transactions)).T
+    print(df)
+
+    print(daily_sales_trend(transactions))
+    df = pd.DataFrame(daily_sales_trend(transactions)).T
+    print(df)
+
+    print(find_peak_sales_day(transactions))
+
+    print(low_performing_products(transactions))
+
+    df = pd.DataFrame(low_performing_products(transactions), columns=['ProductName', 'TotalQuantity', 'TotalRevenue'])
+    print(df)
@@ -0,0 +1,58 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+# DATE ORDINALS #
+
+# Dates are kept as integer day ordinals (date.toordinal()) from parsing onwards:
+# grouping, sorting and range checks on ints are much cheaper than on 'YYYY-MM-DD' strings,
+# and weeks are plain integer division. A sales file only has a few hundred distinct dates,
+# so both conversions are cached and each distinct string is parsed / formatted only once.
+
+DATE_FORMAT = '%Y-%m-%d'
+NO_DATE = 0  # stands for a date that did not parse in a TransactionTable column (real ordinals start at 1)
+
+
+@lru_cache(maxsize=65536)
+def date_to_ordinal(text):
+    """
+    'YYYY-MM-DD' -> day ordinal, or None when the string is not a valid date.
+    """
+    try:
+        return datetime.strptime(text, DATE_FORMAT).toordinal()
+    except (ValueError, TypeError):
+        return None
+
+
+@lru_cache(maxsize=65536)
+def ordinal_to_date(ordinal):
+    # day ordinal -> 'YYYY-MM-DD', only used when writing output
+    return date.fromordinal(ordinal).isoformat()
+
+
+def as_ordinal(day):
+    # accepts an ordinal, a 'YYYY-MM-DD' string or a date
+    if day is None or isinstance(day, int):
+        return day
+    if isinstance(day, date):
+        return day.toordinal()
+    return date_to_ordinal(day)
+
+
+def week_start(ordinal):
+    # ordinal 1 (0001-01-01) is a Monday, so ISO weeks are blocks of 7 from there
+    return ordinal - (ordinal - 1) % 7
+
+
+@lru_cache(maxsize=65536)
+def period_key(ordinal, period):
+    """
+    Label of the day / ISO week / month an ordinal falls in: 'YYYY-MM-DD', 'YYYY-Www' or 'YYYY-MM'.
+    """
+    if period == 'day':
+        return ordinal_to_date(ordinal)
+    if period == 'week':
+        year, week, _ = date.fromordinal(ordinal).isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == 'month':
+        return ordinal_to_date(ordinal)[:7]
+    raise ValueError(f"Unknown period: {period} (use 'day', 'week' or 'month')")
@@ -0,0 +1,121 @@
+import base64
+import hashlib
+import math
+
+from utils_dates import as_ordinal, period_key
+
+# DISTINCT COUNTERS #
+
+# Unique customers per day used to be an exact set of every CustomerID, for every day.
+# Over a year with millions of customers that is most of the aggregate's memory.
+# The per-day counter is pluggable:
+# - 'exact' -> a plain set (default, exact counts)
+# - 'hll'   -> HyperLogLog: 2**precision one-byte registers per day whatever the number of customers,
+#              about 1.04 / sqrt(2**precision) relative error (precision 12 -> 4 KB, ~1.6%)
+# Both support add(), len(), |= (merge) and copy(), so the aggregator treats them the same,
+# and both merge losslessly, so per-day counters roll up into weekly/monthly unique counts.
+
+DEFAULT_PRECISION = 12
+
+
+def hash_item(item):
+    # 64-bit hash that is stable across processes and runs (unlike hash())
+    return int.from_bytes(hashlib.blake2b(str(item).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def register_of(hashed, precision):
+    """
+    (register index, rank) for a 64-bit hash: the first `precision` bits pick the register,
+    the rank is the position of the first 1 bit in the rest.
+    """
+    rest_bits = 64 - precision
+    rest = hashed & ((1 << rest_bits) - 1)
+    return hashed >> rest_bits, rest_bits - rest.bit_length() + 1
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with set-like add / len / |= / copy.
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+
+    def __repr__(self):
+        return f"HyperLogLog(precision={self.precision}, ~{len(self)} distinct)"
+
+    def add(self, item):
+        index, rank = register_of(hash_item(item), self.precision)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting is more accurate for small sets
+        return estimate
+
+    def __len__(self):
+        return int(round(self.count()))
+
+    def __ior__(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Can only merge HyperLogLogs of the same precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def copy(self):
+        return HyperLogLog(self.precision, self.registers)
+
+    def to_state(self):
+        return {'hll': self.precision, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state['hll'], base64.b64decode(state['registers']))
+
+
+def new_distinct_counter(mode='exact', precision=DEFAULT_PRECISION):
+    if mode == 'exact':
+        return set()
+    if mode == 'hll':
+        return HyperLogLog(precision)
+    raise ValueError(f"Unknown distinct counter: {mode} (use 'exact' or 'hll')")
+
+
+def is_distinct_counter(value):
+    return isinstance(value, (set, HyperLogLog))
+
+
+def counter_to_state(counter):
+    # JSON-serialisable form: sorted list for a set, registers for a HyperLogLog
+    if isinstance(counter, HyperLogLog):
+        return counter.to_state()
+    return sorted(counter)
+
+
+def counter_from_state(state):
+    if isinstance(state, dict) and 'hll' in state:
+        return HyperLogLog.from_state(state)
+    return set(state)
+
+
+def rollup_distinct(counters_by_day, period='week'):
+    """
+    Merges per-day counters ({day ordinal or 'YYYY-MM-DD': counter}) into one counter per week or month.
+    Returns {period: counter}, sorted by period.
+    """
+    rolled = {}
+    for day, counter in sorted(counters_by_day.items()):
+        key = period_key(as_ordinal(day), period)
+        if key in rolled:
+            rolled[key] |= counter
+        else:
+            rolled[key] = counter.copy()
+    return rolled
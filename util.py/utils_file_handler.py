@@ -1,24 +1,19 @@
 
 import os
-import sys
-from pathlib import Path
-from urllib import response
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import time
-import re
-from io import StringIO # treats strings like file)
-pd.set_option('display.max_columns', None) # to display all columns in pandas DF
+import codecs
+import itertools
+import mmap
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+
+from utils_dates import date_to_ordinal, NO_DATE
 
 # We can read the file using pd.read_csv if file source is trusted and we know encoding be used is for UTF 8 (inbuilt in pandas).
 # But, if the source is not trusted  and we do not know the encoding option whether to use (UTF 8 or  'latin-1' or  'cp1252') and also need to clean the data
 # we need to go with basic def fn loop with encoding command 
 # READ SALES DATA WITH ENCODING HANDLING
 
-sales_data = pd.read_csv(r'sales_data.txt', delimiter='|', header=0,)
-print(sales_data)
-sales_data.info()
 
     # """
     # Reads sales data from file handling encoding issues
@@ -37,43 +32,99 @@ sales_data.info()
     # """
 
 # READ SALES DATA WITH ENCODING HANDLING
-filename = 'sales_data.txt'
-def read_sales_data(filename):
-    encodings_to_try = ['utf-8', 'latin-1', 'cp1252']
-    raw_lines = []
 
-    for encoding in encodings_to_try:
+# utf-8 first, then cp1252 before latin-1 - latin-1 decodes any byte so it can only be the last resort
+ENCODINGS_TO_TRY = ['utf-8', 'cp1252', 'latin-1']
+SNIFF_BYTES = 64 * 1024  # how much of the file is used to guess the encoding
+
+
+def sniff_encoding(sample):
+    """
+    Guesses the encoding of a file from its first bytes.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    # incremental decoder with final=False so a multi-byte char cut at the end of the sample is not an error
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    # mixed sample: keep utf-8 if most non-ascii lines are valid utf-8,
+    # the odd bad line is then handled by decode_line's fallback
+    utf8_lines = bad_lines = 0
+    for raw_line in sample.split(b'\n')[:-1]:  # last piece may be cut in the middle
+        if raw_line.isascii():
+            continue
         try:
-            # Open file safely using with statement
-            with open(filename, mode='r', encoding=encoding) as file:
-
-                lines = file.readlines()
-
-                # Skip header row and clean remaining lines
-                for line in lines[1:]:  # skip header
-                    line = line.strip() # Skip empty lines
-                    if not line:
-                        continue
-
-                    raw_lines.append(line) # Append cleaned line to raw_lines
+            raw_line.decode('utf-8')
+            utf8_lines += 1
+        except UnicodeDecodeError:
+            bad_lines += 1
+    if utf8_lines >= bad_lines and utf8_lines > 0:
+        return 'utf-8'
+    try:
+        sample.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return ENCODINGS_TO_TRY[-1]
+
+
+def decode_line(raw_line, encoding):
+    """
+    Decodes one line of bytes, falling back line by line to the other encodings
+    so a single bad byte does not force a reread of the whole file.
+    """
+    try:
+        return raw_line.decode(encoding)
+    except UnicodeDecodeError:
+        for fallback in ENCODINGS_TO_TRY:
+            try:
+                return raw_line.decode(fallback)
+            except UnicodeDecodeError:
+                continue
+    return raw_line.decode(ENCODINGS_TO_TRY[-1], errors='replace')
 
-            # If file read successfully, stop trying other encodings
-            break
 
-        except UnicodeDecodeError:
-            # Try next encoding
+def _iter_clean_lines(file, encoding):
+    # file is opened in binary mode; '\n' is the same byte in every supported encoding,
+    # so splitting on raw bytes first and decoding per line is safe
+    file.readline()  # skip header
+    for raw_line in file:
+        line = decode_line(raw_line, encoding).strip()
+        if not line:  # Skip empty lines
             continue
+        yield line
+
 
+def read_sales_data(filename, stream=False):
+    # stream=True returns a generator of cleaned lines instead of a list (for multi-GB files)
+    if str(filename).lower().endswith(('.parquet', '.npz')):
+        # binary columnar file (see utils_transaction_table.save_table): loaded as a TransactionTable, no text parsing
+        from utils_transaction_table import load_table
+        try:
+            return load_table(filename)
         except FileNotFoundError:
             print(f"Error: File '{filename}' not found.")
             return []
-    return raw_lines
 
-print(read_sales_data(filename))
+    try:
+        # open once up front so a missing file is reported here and not on first iteration
+        file = open(filename, mode='rb')
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return iter([]) if stream else []
 
-df=pd.read_csv('sales_data.txt', delimiter='|', header=0)
-print(df)
-df.__len__()
+    encoding = sniff_encoding(file.read(SNIFF_BYTES))
+    file.seek(0)
+
+    def generate():
+        with file:
+            yield from _iter_clean_lines(file, encoding)
+
+    if stream:
+        return generate()
+    return list(generate())
 
 
 # PARSE & CLEAN DATA #
@@ -112,62 +163,268 @@ df.__len__()
 
 # DATA PARSING 
 
-raw_lines=read_sales_data('sales_data.txt')
-def parse_transactions(raw_lines):
-    clean_transactions = []  # final output list
+def parse_line(line):
+    """
+    Parses one raw line into a tuple of cleaned, typed fields:
+    (TransactionID, Date, ProductID, ProductName, Quantity, UnitPrice, CustomerID, Region)
 
-    for line in raw_lines:
+    Returns None for empty lines, rows with the wrong number of fields or bad numbers.
+    """
+    # Remove leading/trailing spaces and newline characters
+    line = line.strip()
 
-        # Remove leading/trailing spaces and newline characters
-        line = line.strip()
+    # Skip empty lines
+    if not line:
+        return None
 
-        # Skip empty lines
-        if not line:
-            continue
+    # Split line by pipe delimiter
+    parts = line.split('|')
 
-        # Split line by pipe delimiter
-        parts = line.split('|')
+    # Skip rows with incorrect number of fields
+    if len(parts) != 8:
+        return None
 
-        # Skip rows with incorrect number of fields
-        if len(parts) != 8:
-            continue
+    try:
+        # Assign fields to meaningful variable names
+        txn_id, date, product_id, product_name, quantity, unit_price, customer_id, region = parts
 
-        try:
-            # Assign fields to meaningful variable names
-            txn_id, date, product_id, product_name, quantity, unit_price, customer_id, region = parts
-
-            # Clean product name (remove commas)
-            product_name = product_name.replace(',', '').strip()
-
-            # Remove commas from numeric fields
-            quantity = quantity.replace(',', '').strip()
-            unit_price = unit_price.replace(',', '').strip()
-
-            # Convert data types
-            quantity = int(quantity)
-            unit_price = float(unit_price)
-
-            # Create clean transaction dictionary
-            transaction = {
-                'TransactionID': txn_id.strip(),
-                'Date': date.strip(),
-                'ProductID': product_id.strip(),
-                'ProductName': product_name,
-                'Quantity': quantity,
-                'UnitPrice': unit_price,
-                'CustomerID': customer_id.strip(),
-                'Region': region.strip()
-            }
-
-            # Add to final list
-            clean_transactions.append(transaction)
-
-        except ValueError:
-            # Skip rows with invalid numeric conversion
+        # Clean product name (remove commas)
+        product_name = product_name.replace(',', '').strip()
+
+        # Remove commas from numeric fields
+        quantity = quantity.replace(',', '').strip()
+        unit_price = unit_price.replace(',', '').strip()
+
+        # Convert data types
+        quantity = int(quantity)
+        unit_price = float(unit_price)
+
+    except ValueError:
+        # Skip rows with invalid numeric conversion
+        return None
+
+    return (txn_id.strip(), date.strip(), product_id.strip(), product_name,
+            quantity, unit_price, customer_id.strip(), region.strip())
+
+
+def parse_transactions(raw_lines, columnar=False):
+    # columnar=True returns a TransactionTable (numpy columns) instead of a list of dicts
+    if getattr(raw_lines, 'columnar', False):
+        # already a table, e.g. read_sales_data() of a .parquet/.npz file - nothing to parse
+        return raw_lines if columnar else raw_lines.to_dicts()
+    if columnar:
+        return _parse_transactions_columnar(raw_lines)
+
+    clean_transactions = []  # final output list
+
+    for line in raw_lines:
+        fields = parse_line(line)
+        if fields is None:
             continue
+        txn_id, date, product_id, product_name, quantity, unit_price, customer_id, region = fields
+
+        # Create clean transaction dictionary
+        transaction = {
+            'TransactionID': txn_id,
+            'Date': date,
+            'DateOrdinal': date_to_ordinal(date),  # integer day for grouping (None if the date is invalid)
+            'ProductID': product_id,
+            'ProductName': product_name,
+            'Quantity': quantity,
+            'UnitPrice': unit_price,
+            'CustomerID': customer_id,
+            'Region': region
+        }
+
+        # Add to final list
+        clean_transactions.append(transaction)
 
     return clean_transactions
-print(parse_transactions(raw_lines))
+
+
+def _parse_transactions_columnar(raw_lines):
+    from utils_transaction_table import TransactionTableBuilder  # numpy is only needed for this path
+
+    builder = TransactionTableBuilder()
+    for line in raw_lines:
+        fields = parse_line(line)
+        if fields is None:
+            continue
+        txn_id, date, product_id, product_name, quantity, unit_price, customer_id, region = fields
+        # dates are stored as integer day ordinals (cached, each distinct date string is parsed once);
+        # a malformed date is kept as NO_DATE, like the dict path keeps the row with DateOrdinal None
+        date_ordinal = date_to_ordinal(date)
+        builder.append(txn_id, NO_DATE if date_ordinal is None else date_ordinal, product_id, product_name,
+                       quantity, unit_price, customer_id, region)
+    return builder.build()
+
+
+# PARALLEL PARSING OF ONE LARGE FILE #
+
+# The file is memory-mapped and cut into byte ranges that always end right after a '\n',
+# so every line belongs to exactly one range and the 8-field check sees whole lines only.
+# Each range is parsed in its own process into a columnar chunk and the chunks are joined in file order.
+
+MIN_CHUNK_BYTES = 1024 * 1024
+
+
+def split_byte_ranges(buffer, start, chunk_bytes):
+    """
+    Splits buffer[start:] into (start, end) ranges of about chunk_bytes, aligned on newlines.
+    """
+    size = len(buffer)
+    ranges = []
+    while start < size:
+        end = min(start + chunk_bytes, size)
+        if end < size:
+            newline = buffer.find(b'\n', end - 1)  # end - 1: a range may end exactly on a newline
+            end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _parse_byte_range(filename, start, end, encoding):
+    # runs in a worker process: decode and parse only this slice of the file
+    with open(filename, mode='rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        raw_lines = buffer[start:end].split(b'\n')
+    return _parse_transactions_columnar(decode_line(raw_line, encoding) for raw_line in raw_lines)
+
+
+def plan_byte_ranges(filename, workers=1, chunk_bytes=None):
+    """
+    Sniffs the encoding and cuts the data part of the file (after the header) into newline-aligned ranges.
+    Returns (encoding, [(start, end), ...]); no ranges for a missing, empty or header-only file.
+    """
+    try:
+        file = open(filename, mode='rb')
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return None, []
+
+    with file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None, []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            encoding = sniff_encoding(buffer[:SNIFF_BYTES])
+            header_end = buffer.find(b'\n') + 1  # skip header - only the first range can contain it
+            if header_end == 0:
+                return encoding, []
+            if chunk_bytes is None:
+                # a few ranges per worker so one slow range does not hold up the rest
+                chunk_bytes = max(MIN_CHUNK_BYTES, (len(buffer) - header_end) // (workers * 4) + 1)
+            return encoding, split_byte_ranges(buffer, header_end, chunk_bytes)
+
+
+def parse_transactions_parallel(filename, workers=None, chunk_bytes=None):
+    """
+    Parallel mode of parse_transactions for one big pipe-delimited file.
+
+    Returns a TransactionTable with the same rows, in the same order, as
+    parse_transactions(read_sales_data(filename), columnar=True).
+    """
+    from utils_transaction_table import TransactionTable
+
+    workers = workers or os.cpu_count() or 1
+    encoding, ranges = plan_byte_ranges(filename, workers, chunk_bytes)
+    if not ranges:
+        return _parse_transactions_columnar([])
+
+    if workers == 1 or len(ranges) == 1:
+        chunks = [_parse_byte_range(filename, start, end, encoding) for start, end in ranges]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            futures = [pool.submit(_parse_byte_range, filename, start, end, encoding) for start, end in ranges]
+            chunks = [future.result() for future in futures]
+    return TransactionTable.concat(chunks)
+
+
+# ATOMIC FILE WRITES #
+
+# Every file the pipeline writes for someone else to read (enriched data, reports, snapshots,
+# checkpoints, caches, traces) goes through atomic_write: the data goes to a temp file next to
+# the target, which is renamed over it only once everything has been written. Readers never see
+# a half-written file, and a failed write leaves the old file as it was.
+
+_temp_ids = itertools.count()
+
+
+@contextmanager
+def atomic_write(filename, mode='w', **options):
+    """
+    `with atomic_write(filename) as f:` - open() on a temp file that replaces filename when the block
+    ends without an error; on an error the temp file is removed. Text modes default to utf-8.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    # pid + thread + counter: concurrent writers of the same target never share a temp file
+    temp_file = f"{filename}.{os.getpid()}.{threading.get_ident()}.{next(_temp_ids)}.tmp"
+    if 'b' not in mode:
+        options.setdefault('encoding', 'utf-8')
+    try:
+        with open(temp_file, mode, **options) as f:
+            yield f
+        os.replace(temp_file, filename)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+# BULK WRITER FOR ENRICHED DATA #
+
+# Opens the output ONCE, writes the header once and streams the rows through a large buffer
+# in batches of joined lines (atomic_write, so the target is only replaced once all are written).
+
+ENRICHED_HEADER = [
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region",
+    "API_Category", "API_Brand", "API_Rating", "API_Match"
+]
+WRITE_BUFFER_BYTES = 1024 * 1024
+WRITE_BATCH_ROWS = 10000
+
+
+def _format_value(value):
+    # None (and NaN for a missing rating) -> empty field
+    if value is None or value != value:
+        return ""
+    return str(value)
+
+
+def _iter_row_batches(rows, header, batch_rows):
+    if getattr(rows, 'columnar', False):
+        # straight from columnar data: decode one column slice at a time, no per-row dicts
+        for start in range(0, len(rows), batch_rows):
+            batch = rows.take(slice(start, start + batch_rows))
+            columns = [batch.values(col).tolist() if col in batch.columns else [None] * len(batch)
+                       for col in header]
+            yield ["|".join(_format_value(v) for v in values) for values in zip(*columns)]
+        return
+    batch = []
+    for trx in rows:
+        batch.append("|".join(_format_value(trx.get(col)) for col in header))
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_enriched_data(rows, filename, header=ENRICHED_HEADER, batch_rows=WRITE_BATCH_ROWS):
+    """
+    Writes transaction dicts or a TransactionTable as a pipe-delimited file with one header line.
+    The target is replaced atomically when everything has been written. Returns the row count.
+    """
+    written = 0
+    with atomic_write(filename, newline="\n", buffering=WRITE_BUFFER_BYTES) as f:
+        f.write("|".join(header) + "\n")
+        for lines in _iter_row_batches(rows, header, batch_rows):
+            f.write("\n".join(lines) + "\n")
+            written += len(lines)
+    return written
 
 
 # DATA VALIDATION & FILTER ING
@@ -209,67 +466,311 @@ print(parse_transactions(raw_lines))
     # - Show count of records after each filter applied
     # """
 
-transactions = parse_transactions(raw_lines)
-
-def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
-    valid = []   # region , min & max based on filter criteria as given above
-    invalid_count = 0 
-
-    for trx in transactions: # as per validation rules & requirements 
-        try:
-            if trx['Quantity'] <= 0 or trx['UnitPrice'] <= 0:
-                invalid_count += 1 # Invalid if quantity or unit price is non-positive otherwise continue
-                continue
-
-            if not (
-                trx['TransactionID'].startswith('T') and
-                trx['ProductID'].startswith('P') and
-                trx['CustomerID'].startswith('C')
-            ):
-                invalid_count += 1 # Invalid if IDs do not start with expected letters, otherwise continue
-                continue
-
-            amount = trx['Quantity'] * trx['UnitPrice']  # Calculate the transaction amount
 
-            if region and trx['Region'] != region: # Filter by region if specified
+# Validation rules, checked in this order; a row can break several of them and is counted under each.
+REQUIRED_FIELDS = ['TransactionID', 'Date', 'ProductID', 'ProductName',
+                   'Quantity', 'UnitPrice', 'CustomerID', 'Region']
+VALIDATION_RULES = ['missing_fields', 'non_positive_quantity', 'non_positive_price',
+                    'bad_transaction_id', 'bad_product_id', 'bad_customer_id']
+ID_PREFIXES = {'bad_transaction_id': ('TransactionID', 'T'),
+               'bad_product_id': ('ProductID', 'P'),
+               'bad_customer_id': ('CustomerID', 'C')}
+SAMPLE_ROWS = 5  # row ids kept per rule in the validation report
+
+
+def failed_rules(trx):
+    """
+    Names of the validation rules one transaction dict breaks (empty list = valid):
+    all fields present, Quantity and UnitPrice > 0, IDs starting with T / P / C.
+    """
+    failed = []
+    if any(field not in trx for field in REQUIRED_FIELDS):
+        failed.append('missing_fields')
+    if 'Quantity' in trx and not trx['Quantity'] > 0:
+        failed.append('non_positive_quantity')
+    if 'UnitPrice' in trx and not trx['UnitPrice'] > 0:
+        failed.append('non_positive_price')
+    for rule, (field, prefix) in ID_PREFIXES.items():
+        if field in trx and not str(trx[field]).startswith(prefix):
+            failed.append(rule)
+    return failed
+
+
+def is_valid_transaction(trx):
+    # the same rules as failed_rules() (prefixes as in ID_PREFIXES), stopping at the first broken one,
+    # so a valid row costs a few lookups and comparisons
+    try:
+        return (trx['Quantity'] > 0 and trx['UnitPrice'] > 0
+                and trx['TransactionID'].startswith('T') and trx['ProductID'].startswith('P')
+                and trx['CustomerID'].startswith('C')
+                and 'Date' in trx and 'ProductName' in trx and 'Region' in trx)
+    except (KeyError, AttributeError):  # a missing field, or an ID that is not a string
+        return not failed_rules(trx)
+
+
+def _empty_report(total):
+    return {'total_input': total, 'valid': 0, 'invalid': 0,
+            'rules': {rule: {'rejected': 0, 'sample_rows': []} for rule in VALIDATION_RULES}}
+
+
+def validation_mask(table, sample_size=SAMPLE_ROWS):
+    """
+    Vectorized validation of a TransactionTable: every rule is one boolean mask over whole columns.
+
+    Returns (valid mask, report) where report is
+    {'total_input', 'valid', 'invalid', 'rules': {rule: {'rejected': rows breaking it, 'sample_rows': first row ids}}}
+    """
+    import numpy as np
+
+    n = len(table)
+    broken = {}
+    missing = np.zeros(n, dtype=bool)
+    for field in REQUIRED_FIELDS:
+        column = table.columns.get(field)
+        if column is None:
+            missing[:] = True
+        elif field in table.categories:
+            missing |= column < 0  # code -1 = no value
+    broken['missing_fields'] = missing
+    broken['non_positive_quantity'] = ~(table.columns['Quantity'] > 0)
+    broken['non_positive_price'] = ~(table.columns['UnitPrice'] > 0)  # NaN fails too
+    for rule, (field, prefix) in ID_PREFIXES.items():
+        # check each distinct id once, then spread the answer to the rows through the codes
+        bad = np.asarray([not str(value).startswith(prefix) for value in table.categories[field]] + [False], dtype=bool)
+        broken[rule] = bad[table.codes(field)]
+
+    invalid = np.zeros(n, dtype=bool)
+    report = _empty_report(n)
+    for rule in VALIDATION_RULES:
+        invalid |= broken[rule]
+        rows = np.flatnonzero(broken[rule])
+        report['rules'][rule] = {'rejected': int(len(rows)), 'sample_rows': rows[:sample_size].tolist()}
+    report['invalid'] = int(invalid.sum())
+    report['valid'] = n - report['invalid']
+    return ~invalid, report
+
+
+def validate_batch(transactions, sample_size=SAMPLE_ROWS):
+    """
+    Validates all transactions at once and explains the rejections.
+
+    Returns (valid transactions, report) - see validation_mask() for the report.
+    A TransactionTable is checked with column masks and gives back a table;
+    a list of dicts is checked row by row with the same rules and gives back a list.
+    """
+    if getattr(transactions, 'columnar', False):
+        mask, report = validation_mask(transactions, sample_size)
+        return transactions.take(mask), report
+
+    valid = []
+    report = _empty_report(len(transactions))
+    for row, trx in enumerate(transactions):
+        if is_valid_transaction(trx):
+            valid.append(trx)
+            continue
+        for rule in failed_rules(trx):  # only the rejected rows are explained rule by rule
+            stats = report['rules'][rule]
+            stats['rejected'] += 1
+            if len(stats['sample_rows']) < sample_size:
+                stats['sample_rows'].append(row)
+    report['valid'] = len(valid)
+    report['invalid'] = len(transactions) - len(valid)
+    return valid, report
+
+
+class FilterIndex:
+    """
+    Validates the transactions ONCE and indexes the valid ones for repeated filtering.
+
+    For every region (and for all regions, key None) it keeps the row ids sorted by amount
+    plus the matching sorted amounts, so a region + amount range filter is two bisects
+    and a slice: O(log n + k) instead of a full scan with revalidation.
+    Works on a list of dicts or a TransactionTable (validated and sorted with numpy).
+    """
+
+    def __init__(self, transactions):
+        if getattr(transactions, 'columnar', False):
+            self.transactions = transactions
+            self._index_table(transactions)
+            return
+        self.transactions = transactions if isinstance(transactions, list) else list(transactions)
+        valid_rows = []
+        self.report = _empty_report(len(self.transactions))
+        for row, trx in enumerate(self.transactions):
+            if is_valid_transaction(trx):
+                valid_rows.append(row)
                 continue
-            if min_amount and amount < min_amount: 
+            for rule in failed_rules(trx):
+                stats = self.report['rules'][rule]
+                stats['rejected'] += 1
+                if len(stats['sample_rows']) < SAMPLE_ROWS:
+                    stats['sample_rows'].append(row)
+        self.valid_count = self.report['valid'] = len(valid_rows)
+        self.invalid_count = self.report['invalid'] = len(self.transactions) - len(valid_rows)
+
+        amounts = {row: self.transactions[row]['Quantity'] * self.transactions[row]['UnitPrice'] for row in valid_rows}
+        by_amount = sorted(valid_rows, key=amounts.__getitem__)
+        self._rows = {None: by_amount}
+        for row in by_amount:  # already in amount order, so every region list is sorted too
+            self._rows.setdefault(self.transactions[row].get('Region'), []).append(row)
+        self._amounts = {key: [amounts[row] for row in rows] for key, rows in self._rows.items()}
+
+    def _index_table(self, table):
+        import numpy as np
+
+        mask, self.report = validation_mask(table)
+        self.valid_count = self.report['valid']
+        self.invalid_count = self.report['invalid']
+        valid_rows = np.flatnonzero(mask)
+        amounts = table.amount[valid_rows]
+        order = np.argsort(amounts, kind='stable')
+        by_amount, sorted_amounts = valid_rows[order], amounts[order]
+        self._rows = {None: by_amount.tolist()}
+        self._amounts = {None: sorted_amounts.tolist()}
+        region_codes = table.codes('Region')[by_amount]
+        for code, region in enumerate(table.categories['Region']):
+            in_region = region_codes == code
+            if in_region.any():
+                self._rows[region] = by_amount[in_region].tolist()
+                self._amounts[region] = sorted_amounts[in_region].tolist()
+
+    def __len__(self):
+        return len(self.transactions)  # rows indexed, valid and invalid
+
+    def regions(self):
+        return sorted(key for key in self._rows if key)  # blank regions cannot be selected by a filter
+
+    def amount_range(self):
+        # (min, max) amount over the valid transactions, for the filter prompt
+        amounts = self._amounts[None]
+        return (amounts[0], amounts[-1]) if amounts else (None, None)
+
+    def filter(self, region=None, min_amount=None, max_amount=None):
+        """
+        Returns (row ids in input order, filter summary) for the given filters.
+        Like the linear scan, a falsy region / min_amount / max_amount means no filter.
+        """
+        key = region or None
+        rows = self._rows.get(key, [])
+        amounts = self._amounts.get(key, [])
+        lo = bisect_left(amounts, min_amount) if min_amount else 0
+        hi = bisect_right(amounts, max_amount) if max_amount else len(amounts)
+        selected = sorted(rows[lo:hi]) if hi > lo else []
+        summary = {
+            'total_input': len(self.transactions),
+            'valid': len(selected),
+            'invalid': self.invalid_count,
+            'filtered_by_region': self.valid_count - len(rows),
+            'filtered_by_amount': len(rows) - len(selected),
+            'final_count': len(selected),
+        }
+        return selected, summary
+
+
+def filter_transactions(valid_transactions, region=None, min_amount=None, max_amount=None, report=None):
+    """
+    Region / amount filters over already validated transactions in ONE linear pass (no index, no sort).
+    report is the validate_batch() report the totals of the summary come from.
+    Returns (filtered transactions, invalid_count, filter_summary) like validate_and_filter().
+    """
+    if getattr(valid_transactions, 'columnar', False):
+        import numpy as np
+
+        keep = np.ones(len(valid_transactions), dtype=bool)
+        if region:
+            regions = list(valid_transactions.categories['Region'])
+            keep &= valid_transactions.codes('Region') == (regions.index(region) if region in regions else -2)
+        in_region = int(keep.sum())
+        amounts = valid_transactions.amount
+        if min_amount:
+            keep &= amounts >= min_amount
+        if max_amount:
+            keep &= amounts <= max_amount
+        selected = valid_transactions.take(keep)
+    else:
+        rows = [trx for trx in valid_transactions if trx.get('Region') == region] if region else valid_transactions
+        in_region = len(rows)
+        selected = []
+        for trx in rows:
+            amount = trx['Quantity'] * trx['UnitPrice']
+            if min_amount and amount < min_amount:
                 continue
             if max_amount and amount > max_amount:
                 continue
+            selected.append(trx)
 
-            valid.append(trx) # Valid transaction after all checks . 
-                                # why append here - because it passed all validation and filtering criteria
+    invalid_count = report['invalid'] if report else 0
+    Summary = {
+        'total_input': report['total_input'] if report else len(valid_transactions),
+        'valid': len(selected),
+        'invalid': invalid_count,
+        'filtered_by_region': len(valid_transactions) - in_region,
+        'filtered_by_amount': in_region - len(selected),
+        'final_count': len(selected),
+    }
+    return selected, invalid_count, Summary
 
-        except KeyError:  # Missing expected fields
-            invalid_count += 1
 
+def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None, index=None):
+    # Returns: tuple (valid_transactions, invalid_count, filter_summary) as described above.
+    # One call is one validation pass plus one filter pass (validate_batch + filter_transactions).
+    # Pass index=FilterIndex(transactions) to filter the same data repeatedly (e.g. interactive filtering):
+    # validation and the amount sort then happen once, in the index, and each call is only a bisect + slice.
+    # A TransactionTable is validated with column masks and the result is a table too.
+    # index.report has the per-rule rejection counts behind the single invalid_count.
+    if index is None:
+        valid, report = validate_batch(transactions)
+        return filter_transactions(valid, region, min_amount, max_amount, report)
+    rows, Summary = index.filter(region, min_amount, max_amount)
+    if getattr(index.transactions, 'columnar', False):
+        valid = index.transactions.take(rows)
+    else:
+        valid = [index.transactions[row] for row in rows]
+    return valid, index.invalid_count, Summary
 
 
-# Add more detailed summary information
-    Summary = {
-        'total_input': len(transactions),
-        'valid': len(valid),
-        'invalid': invalid_count,
-        'filtered_by_amount': len(transactions) - invalid_count - len(valid), 
-}
-    return Summary
+if __name__ == "__main__":
+    import pandas as pd  # only the demo below needs pandas
+
+    pd.set_option('display.max_columns', None) # to display all columns in pandas DF
+
+    sales_data = pd.read_csv(r'sales_data.txt', delimiter='|', header=0,)
+    print(sales_data)
+    sales_data.info()
+
+    filename = 'sales_data.txt'
+
+    print(read_sales_data(filename))
+
+    df=pd.read_csv('sales_data.txt', delimiter='|', header=0)
+    print(df)
+    df.__len__()
+
+    raw_lines=read_sales_data('sales_data.txt')
+
+    print(parse_transactions(raw_lines))
+
+    transactions = parse_transactions(raw_lines)
 
-# Better debugging output - why? To understand the distribution of valid, invalid, and filtered transactions
-print(f"Transactions: {len(transactions)} total")
+    # Better debugging output - why? To understand the distribution of valid, invalid, and filtered transactions
+    print(f"Transactions: {len(transactions)} total")
 
 
-# Fix the None value
-Summary = validate_and_filter(
-    transactions, 
-    region=None,  # Changed from 'None' string
-    min_amount=100, 
-    max_amount=1000
-)
-print(validate_and_filter(transactions, region=None, min_amount=100, max_amount=1000))
-print(transactions)
-print(Summary)
+    # Fix the None value
+    valid, invalid_count, Summary = validate_and_filter(
+        transactions, 
+        region=None,  # Changed from 'None' string
+        min_amount=100, 
+        max_amount=1000
+    )
+    print(validate_and_filter(transactions, region=None, min_amount=100, max_amount=1000))
+    print(transactions)
+    print(Summary)
 
-df = pd.DataFrame(transactions)
-print(df)
+    # repeated filters on the same data: build the index once
+    index = FilterIndex(transactions)
+    for region in index.regions():
+        print(region, validate_and_filter(transactions, region=region, min_amount=100, index=index)[2])
 
+    df = pd.DataFrame(transactions)
+    print(df)
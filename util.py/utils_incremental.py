@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+
+from utils_file_handler import (SNIFF_BYTES, REQUIRED_FIELDS, VALIDATION_RULES, sniff_encoding, decode_line,
+                                parse_line, is_valid_transaction, failed_rules, atomic_write)
+from utils_aggregator import SalesAggregate
+
+# INCREMENTAL INGESTION #
+
+# The sales file is append-only and grows all day, so re-parsing it from the top every hour is wasted work.
+# A checkpoint file remembers how many bytes were already folded into the aggregates,
+# and the next run only parses what was appended after that offset.
+# New lines go through the same validation rules as the batch pipeline before they are aggregated.
+#
+# The checkpoint also remembers which file it was: its inode and a checksum of its first bytes.
+# A file that was rotated or rewritten (even to the same or a bigger size) does not match and is
+# read again from the top instead of from the old offset.
+
+# Checkpoint file format (JSON):
+# {
+#     'filename': 'sales_data.txt',
+#     'offset': 4096,             # bytes already processed (always right after a '\n')
+#     'encoding': 'utf-8',        # sniffed on the first run and reused afterwards
+#     'inode': 1234567,           # os.stat().st_ino of the file
+#     'head': 'ab12...',          # blake2b of the first min(offset, HEAD_BYTES) bytes
+#     'rejected': {...},          # validation rule -> rows rejected so far
+#     'aggregate': {...}          # SalesAggregate.to_state()
+# }
+
+HEAD_BYTES = 4096
+
+
+def load_checkpoint(state_file):
+    """
+    Returns the saved checkpoint dict, or None if there is none yet.
+    """
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(state_file, checkpoint):
+    with atomic_write(state_file) as f:
+        json.dump(checkpoint, f)
+
+
+def _head_checksum(file, length):
+    file.seek(0)
+    return hashlib.blake2b(file.read(length), digest_size=16).hexdigest()
+
+
+def _same_file(file, checkpoint, filename):
+    # True when the checkpoint was taken on this file and the file was only appended to since
+    stat = os.fstat(file.fileno())
+    if checkpoint.get('filename') != filename or stat.st_size < checkpoint['offset']:
+        return False
+    if checkpoint.get('inode') != stat.st_ino:
+        return False
+    return checkpoint.get('head') == _head_checksum(file, min(checkpoint['offset'], HEAD_BYTES))
+
+
+def ingest_new_lines(filename, checkpoint=None, distinct='exact'):
+    """
+    Parses and validates only the lines appended since the checkpoint and folds the valid ones into its aggregate.
+
+    Returns (new checkpoint, up-to-date SalesAggregate, number of new valid transactions).
+    An incomplete last line (no '\\n' yet) is left for the next run.
+    A missing file is reported and leaves the checkpoint as it was.
+    distinct only applies when starting over; an existing checkpoint keeps its own counter kind.
+    """
+    try:
+        file = open(filename, mode='rb')
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        aggregate = SalesAggregate.from_state(checkpoint['aggregate']) if checkpoint else SalesAggregate(distinct)
+        return checkpoint, aggregate, 0
+
+    with file:
+        if checkpoint is None or not _same_file(file, checkpoint, filename):
+            # first run, other file, or the file was truncated/rotated: start over
+            file.seek(0)
+            encoding = sniff_encoding(file.read(SNIFF_BYTES))
+            file.seek(0)
+            file.readline()  # skip header
+            aggregate = SalesAggregate(distinct)
+            rejected = {rule: 0 for rule in VALIDATION_RULES}
+        else:
+            encoding = checkpoint['encoding']
+            aggregate = SalesAggregate.from_state(checkpoint['aggregate'])
+            rejected = dict(checkpoint.get('rejected') or {rule: 0 for rule in VALIDATION_RULES})
+            file.seek(checkpoint['offset'])
+
+        offset = file.tell()
+        new_transactions = 0
+        for raw_line in file:
+            if not raw_line.endswith(b'\n'):
+                break  # still being written
+            offset += len(raw_line)
+            fields = parse_line(decode_line(raw_line, encoding))
+            if fields is None:
+                continue
+            trx = dict(zip(REQUIRED_FIELDS, fields))  # parse_line() returns the fields in this order
+            if not is_valid_transaction(trx):
+                for rule in failed_rules(trx):
+                    rejected[rule] += 1
+                continue
+            aggregate.add(trx['Date'], trx['ProductName'], trx['Quantity'], trx['UnitPrice'],
+                          trx['CustomerID'], trx['Region'])
+            new_transactions += 1
+
+        checkpoint = {
+            'filename': filename,
+            'offset': offset,
+            'encoding': encoding,
+            'inode': os.fstat(file.fileno()).st_ino,
+            'head': _head_checksum(file, min(offset, HEAD_BYTES)),
+            'rejected': rejected,
+            'aggregate': aggregate.to_state(),
+        }
+    return checkpoint, aggregate, new_transactions
+
+
+def run_incremental(filename, state_file, report_file=None, enriched_transactions=(), distinct='exact'):
+    """
+    One incremental pipeline run: load checkpoint -> parse new lines -> save checkpoint -> (optional) report.
+
+    Returns the up-to-date SalesAggregate; it can be passed to any utils_data_processor analysis.
+    """
+    checkpoint, aggregate, new_transactions = ingest_new_lines(filename, load_checkpoint(state_file), distinct)
+    if checkpoint is None:
+        return aggregate  # no file and no earlier checkpoint: nothing to save
+    save_checkpoint(state_file, checkpoint)
+    print(f"Incremental run: {new_transactions} new transactions, checkpoint at byte {checkpoint['offset']}")
+
+    if report_file:
+        from output_working_file import generate_sales_report
+        generate_sales_report(aggregate, list(enriched_transactions), report_file)
+    return aggregate
+
+
+if __name__ == "__main__":
+    import sys
+
+    # usage: python utils_incremental.py [sales file] [checkpoint file]
+    sales_file = sys.argv[1] if len(sys.argv) > 1 else 'sales_data.txt'
+    state_file = sys.argv[2] if len(sys.argv) > 2 else 'sales_checkpoint.json'
+    print(run_incremental(sales_file, state_file))
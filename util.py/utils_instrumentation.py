@@ -0,0 +1,217 @@
+import functools
+import json
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from utils_file_handler import atomic_write
+
+# STAGE INSTRUMENTATION #
+
+# Records, for every workflow stage and every wrapped function:
+# - wall time and CPU time
+# - peak traced memory while it ran (tracemalloc, absolute bytes traced, child stages included)
+# - rows in / rows out (len() of the first argument and of the result, or set by hand)
+# - bytes read / written by the process (/proc/self/io rchar / wchar, where available)
+# and writes them as a JSON trace.
+#
+# Stages may run on several threads (utils_scheduler); nesting is tracked per thread, but tracemalloc
+# is process-wide, so the peak of a stage that overlaps others includes their allocations too.
+#
+# Disabled (the default) it costs nothing: stage() hands back one shared do-nothing context,
+# and wrap() returns the function itself, so no wrapper sits in the call path.
+#
+# Trace format:
+# {
+#     'meta': {'started': ..., 'python': ..., 'argv': [...], 'memory_traced': true},
+#     'stages': [
+#         {'name': 'parse_transactions', 'parent': None, 'depth': 0, 'start_offset': 0.12,
+#          'wall_seconds': 0.35, 'cpu_seconds': 0.34, 'peak_bytes': 61000000,
+#          'rows_in': 100000, 'rows_out': 99800, 'bytes_read': 0, 'bytes_written': 0, 'error': None},
+#         ...
+#     ]
+# }
+
+
+def _io_counters():
+    # (bytes read, bytes written) by this process so far, or (None, None) off Linux
+    try:
+        with open('/proc/self/io', 'r') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _count(value):
+    if isinstance(value, (str, bytes)):  # a file name or a body, not rows
+        return None
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+class _NullStage:
+    # what stage() returns when tracing is off: every attribute set on it is simply dropped
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageRecord:
+    """
+    One timed stage; a `with tracer.stage(...) as record:` body may set
+    record.rows_in / rows_out / bytes_read / bytes_written itself.
+    """
+
+    def __init__(self, tracer, name, parent, rows_in):
+        self._tracer = tracer
+        self.name = name
+        self.parent = parent.name if parent else None
+        self.depth = parent.depth + 1 if parent else 0
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_read = None
+        self.bytes_written = None
+        self.error = None
+        self._child_peak = 0
+
+    def __enter__(self):
+        tracer = self._tracer
+        if tracer.memory:
+            parent = tracer._stack[-1] if tracer._stack else None
+            if parent is not None:
+                # keep the parent's peak so far before the peak counter is reset for this stage
+                parent._child_peak = max(parent._child_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        tracer._stack.append(self)
+        self._io = _io_counters()
+        self._start = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._start
+        cpu = time.process_time() - self._cpu
+        tracer = self._tracer
+        tracer._stack.pop()
+        peak = None
+        if tracer.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self._child_peak)
+            if tracer._stack:
+                tracer._stack[-1]._child_peak = max(tracer._stack[-1]._child_peak, peak)
+        read, written = _io_counters()
+        if read is not None and self._io[0] is not None:
+            # an explicit value set by the stage body wins over the process counters
+            self.bytes_read = self.bytes_read if self.bytes_read is not None else read - self._io[0]
+            self.bytes_written = self.bytes_written if self.bytes_written is not None else written - self._io[1]
+        tracer.records.append({
+            'name': self.name,
+            'parent': self.parent,
+            'depth': self.depth,
+            'start_offset': round(self._start - tracer.started, 6),
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'peak_bytes': peak,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'error': repr(exc) if exc is not None else None,
+        })
+        if tracer.verbose:
+            print(f"  [{self.name}] {wall:.3f}s wall, {cpu:.3f}s cpu"
+                  + (f", peak {peak / 2 ** 20:,.1f} MiB" if peak is not None else ""))
+        return False
+
+
+class Tracer:
+    """
+    Collects StageRecords. Tracer(enabled=False) is a no-op.
+    """
+
+    def __init__(self, enabled=False, memory=True, verbose=False):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.verbose = verbose
+        self.records = []
+        self._local = threading.local()  # per-thread stack of open stages
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def stage(self, name, rows_in=None):
+        if not self.enabled:
+            return _NULL_STAGE
+        return StageRecord(self, name, self._stack[-1] if self._stack else None, rows_in)
+
+    def wrap(self, function, name=None):
+        """
+        Returns function itself when tracing is off, otherwise a wrapper that records one stage per call
+        (rows in = len(first argument), rows out = len(result), when they have a length).
+        """
+        if not self.enabled:
+            return function
+        name = name or function.__name__
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with self.stage(name, _count(args[0]) if args else None) as record:
+                result = function(*args, **kwargs)
+                record.rows_out = _count(result)
+                return result
+        return traced
+
+    def trace(self):
+        return {
+            'meta': {
+                'started': self.started_at,
+                'python': platform.python_version(),
+                'argv': sys.argv,
+                'memory_traced': self.memory,
+            },
+            'stages': self.records,
+        }
+
+    def write(self, filename):
+        with atomic_write(filename) as f:
+            json.dump(self.trace(), f, indent=2)
+        return filename
+
+    def close(self):
+        if self.memory:
+            tracemalloc.stop()
+
+
+_tracer = Tracer(enabled=False)
+
+
+def get_tracer():
+    return _tracer
+
+
+def enable_tracing(memory=True, verbose=False):
+    # replaces the shared tracer with an enabled one and returns it
+    global _tracer
+    _tracer = Tracer(enabled=True, memory=memory, verbose=verbose)
+    return _tracer
@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+
+# BOUNDED LRU CACHE #
+
+# The in-memory level of every cache in the pipeline (analysis memo, catalog cache, daemon answers):
+# an OrderedDict in use order, most recently used last, so a hit is a move_to_end and an
+# eviction is a popitem from the front. One lock makes it safe to share between threads.
+
+
+class LRUCache:
+    """
+    Bounded dict that drops the least recently used entry; safe to share between threads.
+    size limits the entries; max_bytes (optional, for bytes values) limits their total len().
+    get() returns None on a miss, so None itself cannot be cached.
+    """
+
+    def __init__(self, size, max_bytes=None):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.bytes = 0  # total len() of the values, tracked only with max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _sizeof(self, value):
+        return len(value) if self.max_bytes is not None else 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= self._sizeof(old)
+            if self.max_bytes is not None and len(value) > self.max_bytes:
+                return  # larger than the whole cache: not kept
+            self._entries[key] = value
+            self.bytes += self._sizeof(value)
+            while len(self._entries) > self.size or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                key, evicted = self._entries.popitem(last=False)  # evict least recently used
+                self.bytes -= self._sizeof(evicted)
+
+    def pop(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self.bytes -= self._sizeof(value)
+            return value
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
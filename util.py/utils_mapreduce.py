@@ -0,0 +1,231 @@
+import json
+import os
+import zlib
+from multiprocessing import Pipe, Process, Queue
+from multiprocessing.connection import wait
+
+from utils_file_handler import plan_byte_ranges, _parse_byte_range, validation_mask, VALIDATION_RULES
+from utils_aggregator import SalesAggregate, aggregate_transactions
+from utils_distinct import DEFAULT_PRECISION
+
+# MULTI-PROCESS MAP-REDUCE #
+
+# For many sales files (e.g. a month of daily files) spread over several worker processes:
+# - the coordinator cuts every file into newline-aligned byte ranges (plan_byte_ranges) and
+#   hands them out one at a time over a pipe to whichever map worker is free
+# - map: a worker parses its range, validates it (validation_mask) and aggregates the valid rows ONCE.
+#   The aggregate is split in two:
+#   * the customer table - the part that grows with the data - is cut into partitions by
+#     crc32(CustomerID) % partitions, and each partition goes to its own reducer process
+#   * the rest (totals, regions, products, days) is small and goes to the coordinator
+#   Each worker first combines everything it mapped, and ships once, when it is told to finish.
+# - reduce: reducer p merges the customer partials of partition p from all the map workers.
+#   The coordinator merges the small dimension partials, then adopts every reducer's customers
+#   as they are: a customer only ever lands in one partition, so no customer is merged across partitions.
+# Everything travels as compressed JSON of SalesAggregate.to_state() (encode_state) - plain bytes,
+# so a worker on another host could send the same thing over a socket.
+# The result is the SalesAggregate that the analyses and generate_sales_report() take directly.
+
+
+def partition_of(customer_id, partitions):
+    # stable across processes and hosts (unlike hash(), which is salted per process)
+    return zlib.crc32(customer_id.encode('utf-8')) % partitions
+
+
+def encode_state(aggregate):
+    # SalesAggregate -> compressed JSON bytes (see SalesAggregate.to_state())
+    return zlib.compress(json.dumps(aggregate.to_state()).encode('utf-8'))
+
+
+def decode_state(data):
+    # inverse of encode_state()
+    return SalesAggregate.from_state(json.loads(zlib.decompress(data).decode('utf-8')))
+
+
+def split_customers(aggregate, partitions):
+    """
+    Takes the customer table out of aggregate and returns it as {partition: SalesAggregate holding only
+    those customers}; aggregate keeps the totals, regions, products and days.
+    """
+    shards = {}
+    for customer_id, stats in aggregate.customers.items():
+        partition = partition_of(customer_id, partitions)
+        shard = shards.get(partition)
+        if shard is None:
+            shard = shards[partition] = SalesAggregate(aggregate.distinct, aggregate.precision)
+        shard.customers[customer_id] = stats
+    aggregate.customers = {}
+    return shards
+
+
+def map_byte_range(filename, start, end, encoding, partitions, distinct='exact', precision=DEFAULT_PRECISION):
+    """
+    Map step for one byte range: parse -> validate -> aggregate once -> split the customers by partition.
+    Returns (aggregate without customers, {partition: customers-only SalesAggregate}, validation report).
+    """
+    table = _parse_byte_range(filename, start, end, encoding)
+    mask, report = validation_mask(table)
+    aggregate = aggregate_transactions(table.take(mask), distinct, precision)
+    return aggregate, split_customers(aggregate, partitions), report
+
+
+def _map_worker(connection, reducer_queues, distinct, precision):
+    # runs in a map process: map every range it is sent and combine locally; on 'finish' send the
+    # customer partials to their reducers and the rest to the coordinator
+    dimensions = SalesAggregate(distinct, precision)
+    customers = {}
+    try:
+        while True:
+            message = connection.recv()
+            if message[0] == 'finish':
+                break
+            filename, start, end, encoding = message[1:]
+            aggregate, shards, report = map_byte_range(filename, start, end, encoding, len(reducer_queues),
+                                                       distinct, precision)
+            dimensions.merge(aggregate)
+            for partition, shard in shards.items():
+                if partition in customers:
+                    customers[partition].merge(shard)
+                else:
+                    customers[partition] = shard
+            rejected = {rule: stats['rejected'] for rule, stats in report['rules'].items()}
+            connection.send(('done', report['total_input'], report['invalid'], rejected))
+        shipped = 0
+        for partition, shard in customers.items():
+            data = encode_state(shard)
+            shipped += len(data)
+            reducer_queues[partition].put(data)
+        data = encode_state(dimensions)
+        connection.send(('states', data, shipped + len(data)))
+    except Exception as e:
+        connection.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+
+def _reduce_worker(connection, queue, distinct, precision):
+    # runs in a reducer process: merges the customer partials of one partition until the None sentinel
+    customers = SalesAggregate(distinct, precision)
+    try:
+        while True:
+            data = queue.get()
+            if data is None:
+                break
+            customers.merge(decode_state(data))
+        connection.send(('customers', encode_state(customers)))
+    except Exception as e:
+        connection.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+
+def _start(target, *args):
+    parent_end, child_end = Pipe()
+    process = Process(target=target, args=(child_end,) + args, daemon=True)
+    process.start()
+    child_end.close()
+    return parent_end, process
+
+
+def _receive(connection, processes):
+    try:
+        return connection.recv()
+    except EOFError:
+        return ('error', f"worker exited with code {processes[connection].exitcode}")
+
+
+def map_reduce_files(filenames, workers=None, partitions=None, chunk_bytes=None,
+                     distinct='exact', precision=DEFAULT_PRECISION):
+    """
+    Parses, validates and aggregates all the files with `workers` map processes and `partitions`
+    reducer processes (one per CustomerID partition).
+
+    Returns (SalesAggregate, summary) where summary has total_input (parsed rows), valid, invalid,
+    the per-rule rejection counts under 'rejected', and files / ranges / partitions / state_bytes
+    (size of the serialized partials the map workers shipped).
+    Raises RuntimeError if a worker fails.
+    """
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    workers = workers or os.cpu_count() or 1
+    partitions = partitions or workers
+
+    tasks = []
+    for filename in filenames:
+        encoding, ranges = plan_byte_ranges(filename, workers, chunk_bytes)
+        tasks += [('map', filename, start, end, encoding) for start, end in ranges]
+    tasks.reverse()  # pop() from the end hands them out in file order
+
+    summary = {'total_input': 0, 'valid': 0, 'invalid': 0, 'rejected': {rule: 0 for rule in VALIDATION_RULES},
+               'files': len(filenames), 'ranges': len(tasks), 'partitions': partitions, 'state_bytes': 0}
+    aggregate = SalesAggregate(distinct, precision)
+    failure = None
+
+    queues = [Queue() for _ in range(partitions)]
+    reducers = dict(_start(_reduce_worker, queue, distinct, precision) for queue in queues)
+    mappers = {}  # coordinator end of the pipe -> process
+    for _ in range(max(1, min(workers, len(tasks)))):
+        connection, process = _start(_map_worker, queues, distinct, precision)
+        mappers[connection] = process
+        connection.send(tasks.pop() if tasks else ('finish',))
+
+    try:
+        # map phase: hand out ranges until none are left, collect the dimension partials
+        while mappers:
+            for connection in wait(list(mappers)):
+                message = _receive(connection, mappers)
+                if message[0] == 'done':
+                    total, invalid, rejected = message[1:]
+                    summary['total_input'] += total
+                    summary['invalid'] += invalid
+                    for rule, count in rejected.items():
+                        summary['rejected'][rule] += count
+                    connection.send(tasks.pop() if tasks and failure is None else ('finish',))
+                    continue
+                if message[0] == 'states':
+                    aggregate.merge(decode_state(message[1]))
+                    summary['state_bytes'] += message[2]
+                elif failure is None:
+                    failure = message[1]
+                    tasks.clear()
+                mappers.pop(connection).join()  # joined: its customer partials are all in the queues
+                connection.close()
+            if failure is not None:
+                break
+
+        # reduce phase: every map worker has shipped, so the reducers can finish their partitions
+        if failure is None:
+            for queue in queues:
+                queue.put(None)
+            while reducers:
+                for connection in wait(list(reducers)):
+                    message = _receive(connection, reducers)
+                    if message[0] == 'customers':
+                        # disjoint by construction: the customers are adopted, not merged
+                        aggregate.customers.update(decode_state(message[1]).customers)
+                    elif failure is None:
+                        failure = message[1]
+                    reducers.pop(connection).join()
+                    connection.close()
+                if failure is not None:
+                    break
+    finally:
+        for process in list(mappers.values()) + list(reducers.values()):
+            process.terminate()
+
+    if failure is not None:
+        raise RuntimeError(f"Map-reduce worker failed: {failure}")
+    summary['valid'] = summary['total_input'] - summary['invalid']
+    return aggregate, summary
+
+
+if __name__ == "__main__":
+    import sys
+    from output_working_file import generate_sales_report
+
+    # usage: python utils_mapreduce.py [sales file ...]
+    sales_files = sys.argv[1:] or ['sales_data.txt']
+    aggregate, summary = map_reduce_files(sales_files)
+    print(aggregate)
+    print(summary)
+    generate_sales_report(aggregate, [], 'output/sales_report_mapreduce.txt')
@@ -0,0 +1,202 @@
+import functools
+import hashlib
+import inspect
+import marshal
+import os
+import pickle
+import threading
+from operator import itemgetter
+
+from utils_file_handler import atomic_write
+from utils_lru import LRUCache
+
+# MEMOIZED ANALYSES #
+
+# The analyses are pure functions of (dataset, parameters), and the scripts call the same ones on the
+# same data again and again (print it, then build a DataFrame from it; every report; every dashboard hit).
+# @memoize caches the result under (function, fingerprint of the dataset, call parameters):
+# 1. in-process LRU of pickled results     -> a repeated call is one unpickle (always a fresh copy,
+#                                             so a caller changing the result never changes the cache)
+# 2. optional pickle files in cache_dir    -> free across runs too (fingerprints are the same in
+#                                             every process, see fingerprint())
+# The fingerprint is a digest of the data, so any change to the fields the analyses read changes it.
+# It is a full pass over the rows: cheap for a TransactionTable (one hash over the column buffers,
+# no copies), about a quarter of an analysis for a list of dicts (200k rows: ~0.26s against ~0.9s).
+# That is why the memo is opt-in (SALES_MEMO=1 or configure_memo(enabled=True)): it pays off when
+# the same data is analysed again and again, and only costs when every call sees new data.
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # pickled results kept in memory
+FINGERPRINT_FIELDS = ('TransactionID', 'Date', 'ProductID', 'ProductName', 'Quantity', 'UnitPrice',
+                      'CustomerID', 'Region')
+_row_fields = itemgetter(*FINGERPRINT_FIELDS)
+FINGERPRINT_BATCH = 8192  # rows per digest update
+# marshal format 2 has no back-references, so equal rows always give equal bytes
+MARSHAL_VERSION = 2
+
+
+def _buffer(column):
+    # the column's own memory for the digest; only a strided view has to be copied
+    try:
+        return memoryview(column).cast('B')
+    except (TypeError, ValueError):
+        return column.tobytes()
+
+
+def fingerprint(transactions):
+    """
+    Returns (fingerprint, stable) for the data an analysis is called on, or (None, False) when it
+    cannot be fingerprinted (an iterator, a SalesAggregate, ...) and must not be cached.
+    stable=True means the same data gives the same fingerprint in every process (usable on disk).
+
+    - TransactionTable: row count + blake2b over the column buffers and dictionaries (stable)
+    - list of dicts:    row count + blake2b over the marshalled row values (stable)
+    """
+    if getattr(transactions, 'columnar', False):
+        digest = hashlib.blake2b(digest_size=16)
+        for name, column in sorted(transactions.columns.items()):
+            digest.update(name.encode('utf-8'))
+            digest.update(_buffer(column))
+        for name, values in sorted(transactions.categories.items()):
+            digest.update(repr((name, list(values))).encode('utf-8'))
+        return ('table', len(transactions), digest.hexdigest()), True
+    if isinstance(transactions, list):
+        # a digest, not hash(): that is 64 bits and collides on purpose (hash(-1) == hash(-2))
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            for start in range(0, len(transactions), FINGERPRINT_BATCH):
+                rows = map(_row_fields, transactions[start:start + FINGERPRINT_BATCH])
+                digest.update(marshal.dumps(list(rows), MARSHAL_VERSION))
+        except (KeyError, TypeError, ValueError):  # rows without the usual fields, or odd value types
+            return None, False
+        return ('rows', len(transactions), digest.hexdigest()), True
+    return None, False
+
+
+class Memo:
+    """
+    Bounded LRU of pickled results (max_entries results, max_bytes of pickles),
+    optionally backed by pickle files in cache_dir.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, cache_dir=None, enabled=True, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self._memory = LRUCache(max_entries, max_bytes)  # key -> pickled result
+        self._lock = threading.Lock()  # guards the counters below; the analyses run on several threads
+        self.disk_hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.cache_dir, f"memo_{name}.pkl")
+
+    def get(self, key, persistent=False):
+        # (True, fresh copy of the result) or (False, None)
+        data = self._memory.get(key)
+        if data is None and persistent and self.cache_dir:
+            data = self._load(key)
+            if data is not None:
+                self._memory.put(key, data)
+                with self._lock:
+                    self.disk_hits += 1
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return False, None
+        return True, pickle.loads(data)
+
+    def put(self, key, result, persistent=False):
+        try:
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return  # not picklable -> simply not cached
+        self._memory.put(key, data)
+        if persistent and self.cache_dir:
+            self._save(key, data)
+
+    def clear(self, disk=False):
+        self._memory.clear()
+        if disk and self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.startswith('memo_') and name.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    @property
+    def hits(self):
+        return self._memory.hits  # answered from memory
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _load(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                stored_key, data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):  # missing or corrupt -> a miss
+            return None
+        return data if stored_key == key else None  # guards against a file name collision
+
+    def _save(self, key, data):
+        with atomic_write(self.path(key), 'wb') as f:
+            pickle.dump((key, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+_default_memo = None
+
+
+def get_memo():
+    """
+    Shared Memo used by @memoize; settings come from the environment:
+    SALES_MEMO (1 = on, off by default), SALES_MEMO_SIZE (entries in memory), SALES_MEMO_BYTES
+    (bytes of results in memory), SALES_MEMO_DIR (enables the disk tier).
+    """
+    global _default_memo
+    if _default_memo is None:
+        configure_memo(
+            max_entries=int(os.environ.get('SALES_MEMO_SIZE', DEFAULT_MAX_ENTRIES)),
+            max_bytes=int(os.environ.get('SALES_MEMO_BYTES', DEFAULT_MAX_BYTES)),
+            cache_dir=os.environ.get('SALES_MEMO_DIR') or None,
+            enabled=os.environ.get('SALES_MEMO') == '1',
+        )
+    return _default_memo
+
+
+def configure_memo(**settings):
+    # replaces the shared memo, e.g. configure_memo(enabled=True, max_entries=256, cache_dir='output/memo')
+    global _default_memo
+    _default_memo = Memo(**settings)
+    return _default_memo
+
+
+def memoize(function):
+    """
+    Caches function(transactions, ...) by the fingerprint of transactions plus the other arguments
+    (defaults filled in, so f(t) and f(t, n=5) share an entry). function.uncached is the original.
+    """
+    signature = inspect.signature(function)
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def memoized(transactions, *args, **kwargs):
+        memo = get_memo()
+        if not memo.enabled:
+            return function(transactions, *args, **kwargs)
+        data_key, stable = fingerprint(transactions)
+        if data_key is None:
+            return function(transactions, *args, **kwargs)
+        bound = signature.bind(transactions, *args, **kwargs)
+        bound.apply_defaults()
+        params = tuple(list(bound.arguments.items())[1:])
+        key = (name, data_key, params)
+        found, result = memo.get(key, stable)
+        if found:
+            return result
+        result = function(transactions, *args, **kwargs)
+        memo.put(key, result, stable)
+        return result
+
+    memoized.uncached = function
+    return memoized
@@ -0,0 +1,145 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+from utils_instrumentation import get_tracer, _count
+
+# STAGE SCHEDULER #
+
+# The workflow as a dependency graph instead of a fixed sequence of steps.
+# Every stage is submitted to a thread pool as soon as all of its dependencies have finished,
+# so independent work overlaps: the network-bound catalog fetch runs while the file is read and parsed,
+# independent analyses run side by side, and the report starts as soon as its own inputs are ready.
+# End-to-end time becomes the critical path of the graph instead of the sum of all steps.
+# While the stages run, stdout is a LineWriter: every thread's output goes out in whole lines under
+# one lock, so two stages never print into the same line, and exclusive_output() keeps a prompt
+# and its answer in one piece.
+
+
+class Stage:
+    """
+    One node of the graph: function(*results of deps, in deps order) -> result.
+    """
+
+    def __init__(self, name, function, deps=()):
+        self.name = name
+        self.function = function
+        self.deps = tuple(deps)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={list(self.deps)})"
+
+
+class LineWriter:
+    """
+    Stands in for sys.stdout while stages run: each thread's text is held until it ends a line
+    (or is flushed, e.g. by input() before it waits), then written in one piece under a lock.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.RLock()
+        self._pending = threading.local()
+
+    def write(self, text):
+        head, newline, tail = (getattr(self._pending, 'text', '') + text).rpartition('\n')
+        if newline:
+            with self.lock:
+                self.stream.write(head + newline)
+        self._pending.text = tail
+        return len(text)
+
+    def flush(self):
+        tail, self._pending.text = getattr(self._pending, 'text', ''), ''
+        with self.lock:
+            if tail:
+                self.stream.write(tail)
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+@contextmanager
+def exclusive_output():
+    # hold the console for a prompt and its answer; the other stages' lines wait until it is done
+    writer = sys.stdout
+    if isinstance(writer, LineWriter):
+        with writer.lock:
+            yield
+    else:
+        yield
+
+
+def check_graph(stages):
+    # unknown dependencies and cycles are errors before anything runs
+    names = {stage.name for stage in stages}
+    if len(names) != len(stages):
+        raise ValueError("Stage names must be unique")
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in names]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stage(s): {', '.join(missing)}")
+    done, remaining = set(), list(stages)
+    while remaining:
+        ready = [stage for stage in remaining if all(dep in done for dep in stage.deps)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(stage.name for stage in remaining)}")
+        done.update(stage.name for stage in ready)
+        remaining = [stage for stage in remaining if stage.name not in done]
+
+
+def run_stages(stages, max_workers=4):
+    """
+    Runs the stages with up to max_workers threads, each as soon as its dependencies are done.
+
+    Returns {stage name: result}. If a stage raises, nothing new is started, the running stages
+    are allowed to finish, and a RuntimeError naming the failed stage is raised.
+    Output printed by the stages is serialized line by line (LineWriter).
+    With tracing on, every stage records rows in (len of its first input) and rows out (len of its result)
+    where they have a length.
+    """
+    check_graph(stages)
+    tracer = get_tracer()
+    results = {}
+    pending = list(stages)
+    running = {}  # future -> stage
+    failure = None
+
+    def run(stage):
+        inputs = [results[dep] for dep in stage.deps]
+        with tracer.stage(stage.name, _count(inputs[0]) if inputs else None) as record:
+            result = stage.function(*inputs)
+            record.rows_out = _count(result)
+            return result
+
+    stdout = sys.stdout
+    if not isinstance(stdout, LineWriter):
+        sys.stdout = LineWriter(stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage') as pool:
+            while pending or running:
+                if failure is None:
+                    ready = [stage for stage in pending if all(dep in results for dep in stage.deps)]
+                    for stage in ready:
+                        pending.remove(stage)
+                        running[pool.submit(run, stage)] = stage
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    try:
+                        results[stage.name] = future.result()
+                    except Exception as e:
+                        if failure is None:
+                            failure = (stage.name, e)
+    finally:
+        sys.stdout.flush()
+        sys.stdout = stdout
+
+    if failure is not None:
+        name, error = failure
+        raise RuntimeError(f"Stage {name} failed: {error}") from error
+    return results
@@ -0,0 +1,171 @@
+import hashlib
+import heapq
+from array import array
+
+# TOP-K HELPERS #
+
+# Exact top-K: heapq.nlargest keeps a bounded heap of k items -> O(N log k) instead of sorting all N.
+# It returns exactly what sorted(items, key=key, reverse=True)[:k] would (same tie order).
+
+# Approximate heavy hitters over unbounded streams, with fixed memory:
+# - SpaceSaving: monitors at most `capacity` items; every item whose true weight is above
+#   total / capacity is guaranteed to be in it, and each count overestimates by at most its `error`.
+# - CountMinSketch: depth x width counters; estimate(item) never underestimates and overestimates
+#   by at most total * e / width with probability 1 - exp(-depth).
+
+
+def top_k(items, k, key):
+    """
+    The k largest items by key (bounded heap, no full sort).
+    """
+    return heapq.nlargest(k, items, key=key)
+
+
+def bottom_k(items, k, key):
+    return heapq.nsmallest(k, items, key=key)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters summary (Metwally et al.) with at most `capacity` counters.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}  # item -> (count, error)
+        self._heap = []   # (count, item) min-heap, may hold outdated entries (lazy deletion)
+        self.total = 0
+
+    def add(self, item, weight=1):
+        self.total += weight
+        if item in self.counts:
+            count, error = self.counts[item]
+            self.counts[item] = (count + weight, error)
+            heapq.heappush(self._heap, (count + weight, item))
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = (weight, 0)
+            heapq.heappush(self._heap, (weight, item))
+        else:
+            # replace the smallest monitored item; the new item inherits its count as error
+            min_count, min_item = self._pop_min()
+            del self.counts[min_item]
+            self.counts[item] = (min_count + weight, min_count)
+            heapq.heappush(self._heap, (min_count + weight, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, item) for item, (count, error) in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            current = self.counts.get(item)
+            if current is not None and current[0] == count:
+                return count, item
+
+    def top(self, k):
+        """
+        [(item, estimated_count, max_overestimate), ...] for the k largest, descending.
+        """
+        best = heapq.nlargest(k, self.counts.items(), key=lambda entry: entry[1][0])
+        return [(item, count, error) for item, (count, error) in best]
+
+    def merge(self, other):
+        # combine two summaries (e.g. from two shards) and keep the `capacity` largest
+        merged = dict(self.counts)
+        for item, (count, error) in other.counts.items():
+            if item in merged:
+                merged[item] = (merged[item][0] + count, merged[item][1] + error)
+            else:
+                merged[item] = (count, error)
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda entry: entry[1][0])
+        self.counts = dict(kept)
+        self._heap = [(count, item) for item, (count, error) in self.counts.items()]
+        heapq.heapify(self._heap)
+        self.total += other.total
+        return self
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch: fixed width x depth counters for approximate per-item totals.
+    """
+
+    def __init__(self, width=2048, depth=5):
+        self.width = width
+        self.depth = depth
+        self.table = [array('d', bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+
+    def _columns(self, item):
+        # one 8-byte hash per row from a single blake2b digest (stable across processes, unlike hash())
+        digest = hashlib.blake2b(str(item).encode('utf-8'), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[8 * row:8 * row + 8], 'little') % self.width for row in range(self.depth)]
+
+    def add(self, item, weight=1):
+        self.total += weight
+        for row, column in enumerate(self._columns(item)):
+            self.table[row][column] += weight
+
+    def estimate(self, item):
+        return min(self.table[row][column] for row, column in enumerate(self._columns(item)))
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Can only merge Count-Min sketches of the same width and depth")
+        for row in range(self.depth):
+            mine, theirs = self.table[row], other.table[row]
+            for column in range(self.width):
+                mine[column] += theirs[column]
+        self.total += other.total
+        return self
+
+
+class StreamingTopK:
+    """
+    Approximate top-K over a stream: Space-Saving picks the candidates, and a Count-Min sketch
+    (which never underestimates) gives a second, usually tighter, upper bound for each of them.
+    """
+
+    def __init__(self, k=5, capacity=1000, width=2048, depth=5):
+        self.k = k
+        self.candidates = SpaceSaving(capacity)
+        self.sketch = CountMinSketch(width, depth)
+
+    def add(self, item, weight=1):
+        self.candidates.add(item, weight)
+        self.sketch.add(item, weight)
+
+    def merge(self, other):
+        self.candidates.merge(other.candidates)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def top(self, k=None):
+        # [(item, estimated_weight), ...] descending; estimate = min of both upper bounds
+        k = k or self.k
+        estimates = ((item, min(count, self.sketch.estimate(item)))
+                     for item, (count, error) in self.candidates.counts.items())
+        return heapq.nlargest(k, estimates, key=lambda entry: entry[1])
+
+
+def approximate_top_products(transactions, n=5, capacity=1000):
+    """
+    Heavy-hitter products by quantity from a stream of transaction dicts, in fixed memory.
+    Returns [(ProductName, estimated TotalQuantity, estimated TotalRevenue), ...] like top_selling_products().
+    """
+    tracker = StreamingTopK(n, capacity)
+    revenue = CountMinSketch(tracker.sketch.width, tracker.sketch.depth)
+    for trx in transactions:
+        tracker.add(trx['ProductName'], trx['Quantity'])
+        revenue.add(trx['ProductName'], trx['Quantity'] * trx['UnitPrice'])
+    return [(name, quantity, revenue.estimate(name)) for name, quantity in tracker.top()]
+
+
+def approximate_top_customers(transactions, n=5, capacity=1000):
+    """
+    Heavy-hitter customers by amount spent. Returns [(CustomerID, estimated total_spent), ...].
+    """
+    tracker = StreamingTopK(n, capacity)
+    for trx in transactions:
+        tracker.add(trx['CustomerID'], trx['Quantity'] * trx['UnitPrice'])
+    return tracker.top()
@@ -0,0 +1,297 @@
+import numpy as np
+from array import array
+from datetime import date
+
+from utils_dates import date_to_ordinal, ordinal_to_date, NO_DATE
+
+# COLUMNAR TRANSACTION TABLE #
+
+# One dict per row costs a few hundred bytes per transaction, which is most of the memory at tens of millions of rows.
+# TransactionTable keeps every field in one contiguous numpy array instead:
+# - Quantity  -> int32
+# - UnitPrice -> float64
+# - Date      -> int32 day ordinal (date.toordinal()), NO_DATE for a date that did not parse
+# - IDs, names and regions -> int32 codes into a list of unique strings (dictionary encoding)
+
+FIELDS = ['TransactionID', 'Date', 'ProductID', 'ProductName',
+          'Quantity', 'UnitPrice', 'CustomerID', 'Region']
+ENCODED_FIELDS = ['TransactionID', 'ProductID', 'ProductName', 'CustomerID', 'Region']
+
+
+class TransactionTable:
+    """
+    Column store for parsed transactions.
+
+    columns: dict of field name -> numpy array (all the same length)
+    categories: dict of field name -> list of strings, for dictionary-encoded fields
+                (code -1 means no value, e.g. an API_Category for an unmatched product)
+    """
+    columnar = True  # lets the analysis functions recognise a table without importing numpy
+
+    def __init__(self, columns, categories):
+        self.columns = columns
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.columns['Quantity'])
+
+    def __iter__(self):
+        # row-by-row dict view so code written for the list of dicts still works
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def __repr__(self):
+        return f"TransactionTable({len(self)} rows)"
+
+    @property
+    def amount(self):
+        # Quantity * UnitPrice for every row
+        return self.columns['Quantity'] * self.columns['UnitPrice']
+
+    def codes(self, field):
+        return self.columns[field]
+
+    def values(self, field):
+        # decoded column as a numpy array of python objects
+        if field in self.categories:
+            # one extra None at the end so code -1 decodes to None
+            return np.asarray(list(self.categories[field]) + [None], dtype=object)[self.columns[field]]
+        if field == 'Date':
+            return np.asarray([None if d == NO_DATE else ordinal_to_date(int(d)) for d in self.columns['Date']],
+                              dtype=object)
+        return self.columns[field]
+
+    def row(self, i):
+        transaction = {}
+        for field, column in self.columns.items():
+            value = column[i]
+            if field in self.categories:
+                value = self.categories[field][value] if value >= 0 else None
+            elif field == 'Date':
+                dated = value != NO_DATE
+                transaction['Date'] = ordinal_to_date(int(value)) if dated else None
+                transaction['DateOrdinal'] = int(value) if dated else None  # same keys as parse_transactions() dicts
+                continue
+            elif column.dtype.kind == 'b':
+                value = bool(value)
+            elif column.dtype.kind in 'iu':
+                value = int(value)
+            else:
+                value = float(value)
+                if value != value:  # NaN marks a missing number
+                    value = None
+            transaction[field] = value
+        return transaction
+
+    def with_columns(self, columns, categories=None):
+        """
+        Returns a new table with extra columns added (e.g. the API_* enrichment columns).
+        Existing arrays are shared, not copied.
+        """
+        merged_categories = dict(self.categories)
+        merged_categories.update(categories or {})
+        return TransactionTable(dict(self.columns, **columns), merged_categories)
+
+    def to_dicts(self):
+        return list(self)
+
+    def take(self, rows):
+        """
+        Returns a new table with only the given rows (boolean mask or row indices).
+        Categories are shared, not copied.
+        """
+        return TransactionTable({name: col[rows] for name, col in self.columns.items()}, self.categories)
+
+    @classmethod
+    def concat(cls, tables):
+        """
+        Joins several tables into one, merging their dictionaries and remapping the codes.
+        """
+        tables = [t for t in tables if t is not None]
+        if not tables:
+            return TransactionTableBuilder().build()
+        categories = {}
+        remapped = {field: [] for field in tables[0].categories}
+        for field in remapped:
+            index = {}
+            for table in tables:
+                # last slot maps code -1 (no value) back to -1
+                mapping = np.empty(len(table.categories[field]) + 1, dtype=np.int32)
+                mapping[-1] = -1
+                for code, value in enumerate(table.categories[field]):
+                    mapping[code] = index.setdefault(value, len(index))
+                remapped[field].append(mapping[table.columns[field]])
+            categories[field] = list(index)
+        columns = {}
+        for name in tables[0].columns:
+            if name in remapped:
+                columns[name] = np.concatenate(remapped[name])
+            else:
+                columns[name] = np.concatenate([t.columns[name] for t in tables])
+        return cls(columns, categories)
+
+
+class TransactionTableBuilder:
+    """
+    Collects parsed rows into growable arrays and interns the strings, then builds a TransactionTable.
+    """
+
+    def __init__(self):
+        self._index = {field: {} for field in ENCODED_FIELDS}
+        self._codes = {field: array('i') for field in ENCODED_FIELDS}
+        self._dates = array('i')
+        self._quantity = array('i')
+        self._price = array('d')
+
+    def _intern(self, field, value):
+        index = self._index[field]
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(index)
+        self._codes[field].append(code)
+
+    def append(self, txn_id, date_ordinal, product_id, product_name, quantity, unit_price, customer_id, region):
+        self._intern('TransactionID', txn_id)
+        self._dates.append(date_ordinal)
+        self._intern('ProductID', product_id)
+        self._intern('ProductName', product_name)
+        self._quantity.append(quantity)
+        self._price.append(unit_price)
+        self._intern('CustomerID', customer_id)
+        self._intern('Region', region)
+
+    def build(self):
+        columns = {
+            'TransactionID': np.frombuffer(self._codes['TransactionID'], dtype=np.int32).copy(),
+            'Date': np.frombuffer(self._dates, dtype=np.int32).copy(),
+            'ProductID': np.frombuffer(self._codes['ProductID'], dtype=np.int32).copy(),
+            'ProductName': np.frombuffer(self._codes['ProductName'], dtype=np.int32).copy(),
+            'Quantity': np.frombuffer(self._quantity, dtype=np.int32).copy(),
+            'UnitPrice': np.frombuffer(self._price, dtype=np.float64).copy(),
+            'CustomerID': np.frombuffer(self._codes['CustomerID'], dtype=np.int32).copy(),
+            'Region': np.frombuffer(self._codes['Region'], dtype=np.int32).copy(),
+        }
+        categories = {field: list(self._index[field]) for field in ENCODED_FIELDS}
+        return TransactionTable(columns, categories)
+
+
+def table_from_dicts(transactions):
+    """
+    Builds a TransactionTable from transaction dicts (parsed or enriched).
+    The optional API_* enrichment fields become API_Category/API_Brand codes, API_Rating and API_Match columns.
+    """
+    transactions = list(transactions)
+    builder = TransactionTableBuilder()
+    for trx in transactions:
+        # same rule as the columnar parser: a date that does not parse is kept as NO_DATE
+        date_ordinal = trx.get('DateOrdinal') or date_to_ordinal(trx['Date']) or NO_DATE
+        builder.append(trx['TransactionID'], date_ordinal, trx['ProductID'],
+                       trx['ProductName'], trx['Quantity'], trx['UnitPrice'], trx['CustomerID'], trx['Region'])
+    table = builder.build()
+    if not transactions or 'API_Match' not in transactions[0]:
+        return table
+
+    columns, categories = {}, {}
+    for field in ('API_Category', 'API_Brand'):
+        index = {}
+        columns[field] = np.fromiter(
+            (-1 if trx.get(field) is None else index.setdefault(trx[field], len(index)) for trx in transactions),
+            dtype=np.int32, count=len(transactions))
+        categories[field] = list(index)
+    columns['API_Rating'] = np.fromiter(
+        (np.nan if trx.get('API_Rating') is None else trx['API_Rating'] for trx in transactions),
+        dtype=np.float64, count=len(transactions))
+    columns['API_Match'] = np.fromiter((bool(trx.get('API_Match')) for trx in transactions),
+                                       dtype=bool, count=len(transactions))
+    return table.with_columns(columns, categories)
+
+
+# BINARY COLUMNAR STORAGE #
+
+# Text output has to be parsed again by every downstream job. These files store the typed
+# columns and the dictionary-encoded strings as they are in memory, so loading them back is
+# a straight copy of the arrays with no text parsing at all:
+# - .parquet (needs pyarrow): dictionary columns, date32 dates
+# - .npz (numpy only): one array per column plus one array per dictionary, uncompressed
+
+DATE32_OFFSET = date(1970, 1, 1).toordinal()  # parquet dates count days from 1970-01-01
+
+
+def save_table(table, filename):
+    """
+    Saves a TransactionTable as .parquet or .npz (chosen by the extension).
+    A .parquet target falls back to .npz when pyarrow is not installed. Returns the path written.
+    """
+    filename = str(filename)
+    if filename.lower().endswith('.parquet'):
+        try:
+            import pyarrow  # noqa: F401 - optional dependency
+        except ImportError:
+            filename = filename[:-len('.parquet')] + '.npz'
+            print(f"pyarrow is not installed, saving as {filename} instead")
+        else:
+            _save_parquet(table, filename)
+            return filename
+    if not filename.lower().endswith('.npz'):
+        raise ValueError(f"Unsupported binary format: {filename} (use .parquet or .npz)")
+
+    arrays = {'__columns__': np.asarray(list(table.columns), dtype=str)}
+    for name, column in table.columns.items():
+        arrays[f"col:{name}"] = column
+    for name, values in table.categories.items():
+        arrays[f"cat:{name}"] = np.asarray(["" if v is None else str(v) for v in values], dtype=str)
+    with open(filename, 'wb') as f:
+        np.savez(f, **arrays)
+    return filename
+
+
+def load_table(filename):
+    """
+    Loads a TransactionTable written by save_table().
+    """
+    filename = str(filename)
+    if filename.lower().endswith('.parquet'):
+        return _load_parquet(filename)
+    with np.load(filename, allow_pickle=False) as data:
+        names = data['__columns__'].tolist()
+        columns = {name: data[f"col:{name}"] for name in names}
+        categories = {name: data[f"cat:{name}"].tolist() for name in names if f"cat:{name}" in data.files}
+    return TransactionTable(columns, categories)
+
+
+def _save_parquet(table, filename):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrays = {}
+    for name, column in table.columns.items():
+        if name in table.categories:
+            indices = pa.array(column, type=pa.int32(), mask=column < 0)  # code -1 -> null
+            arrays[name] = pa.DictionaryArray.from_arrays(indices, pa.array(table.categories[name], type=pa.string()))
+        elif name == 'Date':
+            arrays[name] = pa.array(column - DATE32_OFFSET, type=pa.int32(), mask=column == NO_DATE).cast(pa.date32())
+        else:
+            arrays[name] = pa.array(column)
+    pq.write_table(pa.table(arrays), filename)
+
+
+def _load_parquet(filename):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_table = pq.read_table(filename)
+    columns, categories = {}, {}
+    for name in parquet_table.column_names:
+        column = parquet_table.column(name)
+        if pa.types.is_dictionary(column.type):
+            column = column.unify_dictionaries()  # row groups may carry different dictionaries
+        column = column.combine_chunks()
+        if pa.types.is_dictionary(column.type):
+            columns[name] = column.indices.fill_null(-1).to_numpy().astype(np.int32)
+            categories[name] = column.dictionary.to_pylist()
+        elif pa.types.is_date32(column.type):
+            days = column.cast(pa.int32()).fill_null(NO_DATE - DATE32_OFFSET)  # null date -> NO_DATE
+            columns[name] = days.to_numpy().astype(np.int32) + DATE32_OFFSET
+        else:
+            columns[name] = column.to_numpy(zero_copy_only=False)
+    return TransactionTable(columns, categories)